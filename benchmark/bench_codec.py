@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# 微基准：对比原 format_data 字符串解析路径与 can_codec 预编译编解码路径
+# 用法: python bench_codec.py [-n 次数]
+
+import os
+import sys
+import struct
+import timeit
+import argparse
+
+# 添加pcan_cybergear库的路径
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cybergear"))
+from can_codec import compile_format, INDEX_STRUCT, FEATURE_STRUCT
+
+_LEGACY_CODES = {
+    "f": [4, "f"], "u16": [2, "H"], "s16": [2, "h"], "u32": [4, "I"],
+    "s32": [4, "i"], "u8": [1, "B"], "s8": [1, "b"],
+}
+
+
+def legacy_format_data(data=[], format="f f", type="decode"):
+    # 原 CANMotorController.format_data 的实现(逐字节构造列表)，仅作对照
+    format_list = format.split()
+    rdata = []
+    if type == "decode":
+        p = 0
+        for f in format_list:
+            s_f = _LEGACY_CODES.get(f, [])
+            ba = bytearray()
+            if len(s_f) == 2:
+                for i in range(s_f[0]):
+                    ba.append(data[p])
+                    p = p + 1
+                rdata.append(struct.unpack(s_f[1], ba)[0])
+            else:
+                return []
+        return rdata
+    elif type == "encode" and len(format_list) == len(data):
+        for i in range(len(format_list)):
+            f = format_list[i]
+            s_f = _LEGACY_CODES.get(f, [])
+            if f != "f":
+                data[i] = int(data[i])
+            if len(s_f) == 2:
+                bs = struct.pack(s_f[1], data[i])
+                for j in range(s_f[0]):
+                    rdata.append(bs[j])
+            else:
+                return []
+        if len(rdata) < 4:
+            for i in range(4 - len(rdata)):
+                rdata.append(0x00)
+        return rdata
+
+
+def legacy_single_param_data1(index, value, format):
+    encoded_data = legacy_format_data(data=[value], format=format, type="encode")
+    return [b for b in struct.pack("<I", index)] + encoded_data
+
+
+def codec_single_param_data1(index, value, format):
+    return INDEX_STRUCT.pack(index) + compile_format(format).encode(value)
+
+
+def legacy_param_table_data1(feature_code, type_code, value, format):
+    data1 = [b for b in struct.pack("<H", feature_code)]
+    data1.extend([type_code, 0x00])
+    data1.extend(legacy_format_data(data=[value], format=format, type="encode"))
+    return data1
+
+
+def codec_param_table_data1(feature_code, type_code, value, format):
+    return FEATURE_STRUCT.pack(feature_code, type_code, 0x00) + compile_format(format).encode(value)
+
+
+def check_equivalence():
+    # 确认两条路径输出的字节完全一致
+    cases = [(0x7016, 1.25, "f"), (0x7005, 1, "u8"), (0x7017, -3.5, "f")]
+    for index, value, fmt in cases:
+        assert bytes(legacy_single_param_data1(index, value, fmt)) == \
+            codec_single_param_data1(index, value, fmt), (index, value, fmt)
+    for code, tcode, value, fmt in [(0x2019, 0x06, 3.0, "f"), (0x200D, 0x03, 80, "s16")]:
+        assert bytes(legacy_param_table_data1(code, tcode, value, fmt)) == \
+            codec_param_table_data1(code, tcode, value, fmt), (code, value, fmt)
+    raw = bytes(range(1, 9))
+    assert legacy_format_data(raw, "s16 s32", "decode") == list(compile_format("s16 s32").decode(raw))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="format_data vs can_codec micro-benchmark")
+    parser.add_argument("-n", "--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    check_equivalence()
+    raw = bytes(range(1, 9))
+    cases = [
+        ("single_param encode (f)",
+         lambda: legacy_single_param_data1(0x7016, 1.25, "f"),
+         lambda: codec_single_param_data1(0x7016, 1.25, "f")),
+        ("single_param encode (u8)",
+         lambda: legacy_single_param_data1(0x7005, 1, "u8"),
+         lambda: codec_single_param_data1(0x7005, 1, "u8")),
+        ("param_table encode (f)",
+         lambda: legacy_param_table_data1(0x2019, 0x06, 3.0, "f"),
+         lambda: codec_param_table_data1(0x2019, 0x06, 3.0, "f")),
+        ("decode (s16 s32)",
+         lambda: legacy_format_data(raw, "s16 s32", "decode"),
+         lambda: compile_format("s16 s32").decode(raw)),
+    ]
+    print(f"{'case':<28}{'legacy ns/op':>14}{'codec ns/op':>14}{'speed-up':>10}")
+    for name, legacy, codec in cases:
+        t_legacy = min(timeit.repeat(legacy, number=args.number, repeat=3)) / args.number * 1e9
+        t_codec = min(timeit.repeat(codec, number=args.number, repeat=3)) / args.number * 1e9
+        print(f"{name:<28}{t_legacy:>14.0f}{t_codec:>14.0f}{t_legacy / t_codec:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# 驱动基准：在 virtual 总线的模拟电机上测量 write_single_param、write_param_table、
+# send_motor_control_command、parse_received_msg 的 p50/p99 延迟和持续吞吐(ops/s)，
+# 电机数量为 1/4/16/64，结果以 JSON 输出，便于不同版本之间对比
+# 用法: python bench_driver.py [-n 每个电机的次数] [--motors 1,4,16,64] [--latency 秒] [-o 结果.json]
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import numpy as np
+import can
+
+# 添加pcan_cybergear库的路径
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cybergear"))
+from pcan_cybergear import CANMotorController
+from motor_group import MotorGroup
+from can_dispatcher import release_bus
+from simulator import CyberGearSimulator
+
+
+# 各操作返回应答中的电机CAN ID(parse_received_msg 格式的第一项), 超时为 None
+def op_write_single_param(motor, i):
+    # 交替写入两个值, 避免被写直达缓存跳过
+    return motor.write_single_param("loc_ref", 0.5 if i & 1 else -0.5)[0]
+
+
+def op_write_param_table(motor, i):
+    return motor.write_param_table("limit_spd", 2.0, force=True)[0]
+
+
+def op_send_motor_control_command(motor, i):
+    return motor.send_motor_control_command(0.0, 0.1, 0.0, 10.0, 0.5)[0]
+
+
+OPERATIONS = {
+    "write_single_param": op_write_single_param,
+    "write_param_table": op_write_param_table,
+    "send_motor_control_command": op_send_motor_control_command,
+}
+
+
+def summarize(op, n_motors, latencies, elapsed, timeouts):
+    latencies = np.asarray(latencies) * 1e6
+    return {
+        "op": op,
+        "motors": n_motors,
+        "ops": len(latencies),
+        "seconds": elapsed,
+        "ops_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_us": float(np.percentile(latencies, 50)),
+        "p99_us": float(np.percentile(latencies, 99)),
+        "timeouts": timeouts,
+    }
+
+
+def bench_round_trip(motors, op, iterations):
+    """
+    依次对每个电机执行操作, 记录每次调用的延迟。
+    """
+    func = OPERATIONS[op]
+    latencies = []
+    timeouts = 0
+    start = time.perf_counter()
+    for i in range(iterations):
+        for motor in motors:
+            t0 = time.perf_counter()
+            if func(motor, i) is None:
+                timeouts += 1
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    return summarize(op, len(motors), latencies, elapsed, timeouts)
+
+
+def bench_control_all(group, iterations):
+    """
+    MotorGroup 并发下发运控指令, 每次操作为整组一次往返(按电机数计入 ops)。
+    """
+    setpoints = [(0.0, 0.1, 0.0, 10.0, 0.5)] * len(group)
+    latencies = []
+    timeouts = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        replies = group.control_all(setpoints, quiet=True)
+        dt = time.perf_counter() - t0
+        timeouts += sum(reply.timed_out for reply in replies)
+        latencies.extend([dt] * len(group))
+    elapsed = time.perf_counter() - start
+    return summarize("control_all", len(group), latencies, elapsed, timeouts)
+
+
+def bench_parse(motor, iterations):
+    """
+    解码固定反馈帧(不访问总线)。
+    """
+    data = bytes([0x80, 0x00, 0x7F, 0xFF, 0x80, 0x00, 0x01, 0x2C])
+    arbitration_id = (CANMotorController.CmdModes.MOTOR_FEEDBACK << 24) | (motor.MOTOR_ID << 8) | 0xFE
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        motor.parse_received_msg(data, arbitration_id)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    return summarize("parse_received_msg", 1, latencies, elapsed, 0)
+
+
+def run(n_motors, iterations, latency):
+    channel = f"bench_driver_{n_motors}"
+    motor_ids = list(range(1, n_motors + 1))
+    results = []
+    with CyberGearSimulator(motor_ids, channel=channel, latency=latency):
+        bus = can.Bus(interface="virtual", channel=channel)
+        try:
+            motors = [CANMotorController(bus, motor_id=i, main_can_id=254) for i in motor_ids]
+            for motor in motors:
+                motor.enable()
+            for op in OPERATIONS:
+                results.append(bench_round_trip(motors, op, iterations))
+            results.append(bench_control_all(MotorGroup(motors), iterations))
+            if n_motors == 1:
+                results.append(bench_parse(motors[0], iterations * 10))
+        finally:
+            release_bus(bus)
+            bus.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CyberGear driver latency/throughput benchmark")
+    parser.add_argument("-n", "--iterations", type=int, default=500,
+                        help="operations per motor for each measurement")
+    parser.add_argument("--motors", default="1,4,16,64", help="comma separated motor counts")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="simulated reply latency in seconds")
+    parser.add_argument("-o", "--output", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    results = []
+    for n_motors in [int(x) for x in args.motors.split(",")]:
+        results.extend(run(n_motors, args.iterations, args.latency))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "python_can": can.__version__,
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "sim_latency": args.latency,
+        },
+        "results": results,
+    }
+    for r in results:
+        print(f"{r['op']:28s} motors={r['motors']:3d}  p50={r['p50_us']:9.1f}us  "
+              f"p99={r['p99_us']:9.1f}us  {r['ops_per_s']:10.0f} ops/s  timeouts={r['timeouts']}",
+              file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# 吞吐基准：逐帧 decode_feedback 与 NumPy 批量 decode_feedback_batch 的对比，并校验结果逐位一致
+# 用法: python bench_feedback_decode.py [-n 帧数]
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import can
+
+# 添加pcan_cybergear库的路径
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cybergear"))
+from pcan_cybergear import CANMotorController
+from feedback_decoder import decode_feedback_batch, feedback_limits
+from can_dispatcher import release_bus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="feedback frame decode throughput")
+    parser.add_argument("-n", "--frames", type=int, default=1000000)
+    args = parser.parse_args()
+
+    bus = can.Bus(interface="virtual", channel="bench_feedback_decode")
+    motor = CANMotorController(bus, motor_id=101, main_can_id=254)
+    try:
+        rng = np.random.default_rng(0)
+        data = rng.integers(0, 256, size=(args.frames, 8), dtype=np.uint8)
+        motor_ids = rng.integers(101, 105, size=args.frames, dtype=np.uint32)
+        arbitration_ids = (2 << 24) | (motor_ids << 8) | 0xFE
+
+        t0 = time.perf_counter()
+        batch = decode_feedback_batch(data, arbitration_ids, **feedback_limits(motor))
+        t_batch = time.perf_counter() - t0
+
+        rows = data.tolist()
+        ids = arbitration_ids.tolist()
+        t0 = time.perf_counter()
+        scalar = [motor.decode_feedback(d, a) for d, a in zip(rows, ids)]
+        t_scalar = time.perf_counter() - t0
+
+        for column, values in zip(zip(*scalar), batch):
+            if not np.array_equal(np.asarray(column), values):
+                raise SystemExit("batch decode does not match decode_feedback")
+
+        n = args.frames
+        print(f"frames: {n}")
+        print(f"decode_feedback (per frame): {n / t_scalar / 1e6:8.2f} Mframes/s")
+        print(f"decode_feedback_batch:       {n / t_batch / 1e6:8.2f} Mframes/s")
+        print(f"speed-up: {t_scalar / t_batch:.1f}x (results identical)")
+    finally:
+        release_bus(bus)
+        bus.shutdown()
+
+
+if __name__ == "__main__":
+    main()
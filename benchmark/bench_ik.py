@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# 逆运动学基准：对比 IK.getRotationAngle 逐点求解与 IK.getRotationAngleBatch 批量求解的每点耗时，
+# 点数为 10^4/10^5/10^6(工作空间内随机坐标和俯仰角)，并校验两者结果完全一致
+# 用法: python bench_ik.py [--points 10000,100000,1000000] [--scalar-max 20000] [-o 结果.json]
+
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+import numpy as np
+
+# 添加逆运动学模块的路径
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pythonfile"))
+from inverseKinematics import IK
+
+
+def make_points(n, seed=0):
+    # 覆盖可达与不可达区域的随机目标
+    rng = np.random.default_rng(seed)
+    coordinates = rng.uniform([-45, -45, -5], [45, 45, 55], (n, 3))
+    alpha = rng.uniform(-90, 90, n)
+    return coordinates, alpha
+
+
+def solve_scalar(ik, coordinates, alpha):
+    angles = np.full((len(coordinates), 4), np.nan)
+    feasible = np.zeros(len(coordinates), dtype=bool)
+    for i, ((x, y, z), a) in enumerate(zip(coordinates.tolist(), alpha.tolist())):
+        try:
+            result = ik.getRotationAngle((x, y, z), a)
+        except (ValueError, ZeroDivisionError):
+            result = False
+        if result:
+            angles[i] = [result["theta1"], result["theta2"], result["theta3"], result["theta4"]]
+            feasible[i] = True
+    return angles, feasible
+
+
+def run(n, scalar_max):
+    ik = IK()
+    coordinates, alpha = make_points(n)
+    m = min(n, scalar_max)  # 逐点求解太慢, 只对前 m 个点计时和校验
+    # getRotationAngle 在个别无解情况下会 print
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        ref_angles, ref_feasible = solve_scalar(ik, coordinates[:m], alpha[:m])
+        scalar = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        angles, feasible = ik.getRotationAngleBatch(coordinates, alpha)
+        batch = time.perf_counter() - t0
+    identical = bool(np.array_equal(feasible[:m], ref_feasible)
+                     and np.array_equal(angles[:m], ref_angles, equal_nan=True))
+    scalar_us = scalar / m * 1e6
+    batch_us = batch / n * 1e6
+    return {
+        "points": n,
+        "feasible": int(feasible.sum()),
+        "scalar_checked": m,
+        "scalar_us_per_point": scalar_us,
+        "batch_us_per_point": batch_us,
+        "batch_seconds": batch,
+        "speedup": scalar_us / batch_us,
+        "identical": identical,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch inverse kinematics benchmark")
+    parser.add_argument("--points", default="10000,100000,1000000", help="comma separated point counts")
+    parser.add_argument("--scalar-max", type=int, default=20000,
+                        help="points solved one by one for timing and comparison")
+    parser.add_argument("-o", "--output", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    results = [run(int(n), args.scalar_max) for n in args.points.split(",")]
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    for r in results:
+        print(f"points={r['points']:8d}  scalar={r['scalar_us_per_point']:7.2f}us  "
+              f"batch={r['batch_us_per_point']:6.3f}us  speedup={r['speedup']:6.1f}x  "
+              f"identical={r['identical']}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+# 基于 asyncio 的电机控制器：在 python-can 的 Notifier + AsyncBufferedReader 之上实现
+# 一个事件循环即可同时驱动多条总线上的多个电机，无需线程和 sleep/锁 串行化
+import asyncio
+import logging
+import can
+from can_codec import compile_format, INDEX_STRUCT
+from can_dispatcher import TxListeners
+from pcan_cybergear import CANMotorController
+
+
+class AsyncBusDispatcher(TxListeners):
+    # 总线 -> 分发器 的注册表(以 id(bus) 为键)
+    _registry = {}
+
+    def __init__(self, bus, loop):
+        """
+        初始化异步总线分发器(一般通过 AsyncBusDispatcher.for_bus 获取)。
+
+        参数:
+        bus: CAN总线对象。
+        loop: 运行中的 asyncio 事件循环。
+        """
+        self.bus = bus
+        self.loop = loop
+        self.reader = can.AsyncBufferedReader()
+        self.notifier = can.Notifier(bus, [self.reader], loop=loop)
+        self._queues = {}
+        self._task = loop.create_task(self._route())
+
+    @classmethod
+    def for_bus(cls, bus):
+        """
+        获取总线对应的异步分发器, 必须在事件循环中调用。
+
+        参数:
+        bus: CAN总线对象。
+
+        返回:
+        AsyncBusDispatcher 实例。
+        """
+        loop = asyncio.get_running_loop()
+        dispatcher = cls._registry.get(id(bus))
+        if dispatcher is None or dispatcher.bus is not bus or dispatcher.loop is not loop \
+                or dispatcher._task.done():
+            dispatcher = cls(bus, loop)
+            cls._registry[id(bus)] = dispatcher
+        return dispatcher
+
+    def register(self, motor_id, on_frame=None):
+        """
+        为电机注册接收队列, 同一电机ID重复注册时替换旧队列。
+
+        参数:
+        motor_id: 电机的CAN ID。
+        on_frame: 可选回调, 每收到该电机的一帧都会在入队前调用。
+
+        返回:
+        该电机专属的 asyncio.Queue。
+        """
+        rx_queue = asyncio.Queue()
+        self._queues[motor_id] = (rx_queue, on_frame)
+        return rx_queue
+
+    def unregister(self, motor_id):
+        """
+        注销电机的接收队列。
+        """
+        self._queues.pop(motor_id, None)
+
+    async def _route(self):
+        async for msg in self.reader:
+            motor_id = (msg.arbitration_id >> 8) & 0xFF
+            entry = self._queues.get(motor_id)
+            if entry is None:
+                logging.debug(
+                    f"Dropped message with ID {hex(msg.arbitration_id)}: no motor {motor_id}")
+                continue
+            rx_queue, on_frame = entry
+            if on_frame is not None:
+                on_frame(msg)
+            rx_queue.put_nowait(msg)
+
+    def stop(self):
+        """
+        停止 Notifier 和分发任务(应在 bus.shutdown() 之前调用)。
+        """
+        self.notifier.stop()
+        self._task.cancel()
+        if AsyncBusDispatcher._registry.get(id(self.bus)) is self:
+            del AsyncBusDispatcher._registry[id(self.bus)]
+
+
+class AsyncCANMotorController(CANMotorController):
+    """
+    CANMotorController 的 asyncio 版本, 帧的构造与解析沿用同步控制器。
+
+    必须在运行中的事件循环里构造; 同一条总线不能同时被同步控制器和异步控制器使用。
+    """
+
+    def _attach_bus(self):
+        self.dispatcher = AsyncBusDispatcher.for_bus(self.bus)
+        self._rx_queue = self.dispatcher.register(self.MOTOR_ID, on_frame=self._update_state)
+        self._lock = asyncio.Lock()
+
+    def discard_stale(self):
+        """
+        不等待地丢弃接收队列中已有的帧。
+        """
+        while not self._rx_queue.empty():
+            received_msg = self._rx_queue.get_nowait()
+            logging.debug(
+                f"Discarded message with ID {hex(received_msg.arbitration_id)}")
+
+    async def receive_can_message(self, timeout=1, cmd_mode=None, index=None):
+        """
+        等待与请求匹配的应答, 不匹配的旧帧直接跳过。
+
+        参数:
+        timeout: 接收超时时间(秒)。
+        cmd_mode: 请求的命令模式, 用于确定期望的应答类型。
+        index: 期望应答中携带的参数索引。
+
+        返回:
+        一个元组, 包含接收到的消息数据和接收到的消息仲裁ID(超时则为 None)。
+        """
+        expected_mode = self.REPLY_MODES.get(cmd_mode)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                received_msg = await asyncio.wait_for(
+                    self._rx_queue.get(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                return None, None
+            if self._match_reply(received_msg, expected_mode, index):
+                return received_msg.data, received_msg.arbitration_id
+
+    async def send_receive_can_message(self, cmd_mode, data2, data1, timeout=1):
+        """
+        发送CAN消息并等待响应。
+
+        参数:
+        cmd_mode: 命令模式。
+        data2: 数据区2。
+        data1: 要发送的数据字节。
+        timeout: 等待应答的超时时间(秒)。
+
+        返回:
+        一个元组, 包含接收到的消息数据和接收到的消息仲裁ID(如果有)。
+        """
+        index = self._reply_index(cmd_mode, data1)
+        async with self._lock:
+            self.discard_stale()
+            if not self.send_can_message(cmd_mode, data2, data1):
+                return None, None
+            return await self.receive_can_message(
+                timeout=timeout, cmd_mode=cmd_mode, index=index)
+
+    async def clear_can_rx(self, timeout=10):
+        """
+        清除本电机接收队列中的所有现有消息。
+
+        参数:
+        timeout: 等待清除操作的时间（单位：毫秒）。
+        """
+        while True:
+            try:
+                received_msg = await asyncio.wait_for(self._rx_queue.get(), timeout / 1000.0)
+            except asyncio.TimeoutError:
+                break
+            logging.info(
+                f"Cleared message with ID {hex(received_msg.arbitration_id)}")
+
+    async def _write_single_param(self, index, value, format="u32"):
+        data1 = INDEX_STRUCT.pack(index) + compile_format(format).encode(value)
+        # 写入后影子寄存器中的旧值不再可信
+        self.registers.invalidate(self.PARAMETER_NAMES.get(index))
+        received_msg_data, received_msg_arbitration_id = await self.send_receive_can_message(
+            cmd_mode=self.CmdModes.SINGLE_PARAM_WRITE,
+            data2=self.MAIN_CAN_ID,
+            data1=data1,
+        )
+        return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
+
+    async def write_single_param(self, param_name, value, force=False):
+        """
+        通过参数名称写入单个参数; 设备上已确认的值与请求值相同时跳过写入。
+
+        参数:
+        param_name: 参数名称。
+        value: 要设置的值。
+        force: 为 True 时忽略缓存, 总是写入。
+
+        返回:
+        解析后的接收消息(跳过写入时为缓存的最新状态); 参数名称未知时返回 None。
+        """
+        frame = self.single_param_frame(param_name, value)
+        if frame is None:
+            return
+        if self.skip_redundant_write(param_name, value, force=force):
+            return self.cached_feedback()
+        received_msg_data, received_msg_arbitration_id = await self.send_receive_can_message(*frame)
+        self.registers.confirm_write(
+            param_name, value, self.PARAMETERS[param_name]["codec"], received_msg_data is not None)
+        return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
+
+    async def read_single_param(self, param_name, max_age=None):
+        """
+        读取单个参数, 影子寄存器中的值未过期时不访问总线。
+
+        返回:
+        参数值; 参数名称未知或超时返回 None。
+        """
+        return (await self.read_params([param_name], max_age=max_age)).get(param_name)
+
+    async def read_params(self, param_names, max_age=None, timeout=1):
+        """
+        批量读取参数: 先连续发出所有过期参数的读取请求, 再按参数索引匹配应答。
+
+        参数:
+        param_names: 参数名称列表。
+        max_age: 可接受的最大缓存年龄(秒), 为 None 时使用 param_ttl, 为 0 时强制读取。
+        timeout: 等待全部应答的超时时间(秒)。
+
+        返回:
+        参数名称 -> 参数值 的字典; 超时的参数值为 None, 未知的参数名称不包含在内。
+        """
+        values = {}
+        pending = {}  # 参数索引 -> 参数名称
+        for name in param_names:
+            if self.read_param_frame(name) is None:
+                continue
+            hit, value = self.registers.get(name, max_age=max_age)
+            self.registers.record(hit)
+            if hit:
+                values[name] = value
+            else:
+                pending[self.PARAMETERS[name]["index"]] = name
+
+        if pending:
+            loop = asyncio.get_running_loop()
+            async with self._lock:
+                self.discard_stale()
+                for name in list(pending.values()):
+                    self.send_can_message(*self.read_param_frame(name))
+                deadline = loop.time() + timeout
+                while pending:
+                    data, _ = await self.receive_can_message(
+                        timeout=max(deadline - loop.time(), 0),
+                        cmd_mode=self.CmdModes.SINGLE_PARAM_READ,
+                    )
+                    if data is None:
+                        break
+                    name = pending.pop(data[0] | (data[1] << 8), None)
+                    if name is None:
+                        continue
+                    value = self.PARAMETERS[name]["codec"].decode(data, 4)[0]
+                    self.registers.put(name, value)
+                    values[name] = value
+            for name in pending.values():
+                logging.info(f"No reply for parameter {name} within the timeout period.")
+                values[name] = None
+
+        return {name: values[name] for name in param_names if name in values}
+
+    async def write_param_table(self, param_name, value, force=False):
+        """
+        写入参数表; 已确认写入过相同的值时跳过。
+
+        参数:
+        param_name: 参数名称。
+        value: 要设置的值。
+        force: 为 True 时忽略缓存, 总是写入。
+
+        返回:
+        解析后的接收消息, 格式同 parse_received_msg(跳过写入时为缓存的最新状态, 参数名称未知时均为 None)。
+        """
+        frame = self.param_table_frame(param_name, value)
+        if frame is None:
+            return None, None, None, None, None
+        if self.skip_redundant_table_write(param_name, value, force=force):
+            return self.cached_feedback()
+        received_msg_data, received_msg_arbitration_id = await self.send_receive_can_message(*frame)
+        self.table_registers.confirm_write(
+            param_name, value, self.PARAM_TABLE[param_name]["codec"], received_msg_data is not None)
+        return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
+
+    async def set_0_pos(self):
+        """
+        设置电机的机械零点。
+        """
+        self.invalidate_param_cache()  # 零点改变后位置相关的缓存不再有效
+        received_msg_data, received_msg_arbitration_id = await self.send_receive_can_message(
+            cmd_mode=self.CmdModes.SET_MECHANICAL_ZERO, data2=self.MAIN_CAN_ID, data1=[1]
+        )
+        return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
+
+    async def enable(self):
+        """
+        使能运行电机。
+        """
+        received_msg_data, received_msg_arbitration_id = await self.send_receive_can_message(
+            cmd_mode=self.CmdModes.MOTOR_ENABLE, data2=self.MAIN_CAN_ID, data1=[]
+        )
+        return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
+
+    async def disable(self):
+        """
+        停止运行电机。
+        """
+        self.invalidate_param_cache()  # 停止后设备上的参数状态不再可信
+        received_msg_data, received_msg_arbitration_id = await self.send_receive_can_message(
+            cmd_mode=self.CmdModes.MOTOR_STOP,
+            data2=self.MAIN_CAN_ID,
+            data1=[0, 0, 0, 0, 0, 0, 0, 0],
+        )
+        return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
+
+    async def set_run_mode(self, mode):
+        """
+        设置运行模式。
+
+        参数:
+        mode: 运行模式，应为 RunModes 枚举的一个实例。
+        """
+        if not isinstance(mode, self.RunModes):
+            raise ValueError(
+                f"Invalid mode: {mode}. Must be an instance of RunModes enum.")
+        return await self.write_single_param("run_mode", value=mode.value)
+
+    async def set_motor_position_control(self, limit_spd, loc_ref):
+        """
+        位置模式下设置电机的位置控制参数。
+        """
+        await self.write_single_param(param_name="limit_spd", value=limit_spd)
+        await self.write_single_param(param_name="loc_ref", value=loc_ref)
+
+    async def send_motor_control_command(
+        self, torque, target_angle, target_velocity, Kp, Kd
+    ):
+        """
+        运控模式下发送电机控制指令。
+
+        返回:
+        解析后的接收消息。
+        """
+        received_msg_data, received_msg_arbitration_id = await self.send_receive_can_message(
+            *self.motor_control_frame(torque, target_angle, target_velocity, Kp, Kd)
+        )
+        return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
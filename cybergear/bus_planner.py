@@ -0,0 +1,325 @@
+# CAN总线带宽规划：计算电机组各类命令流(运控、参数写入、遥测轮询等)占用的帧预算，
+# 生成按时间片交错各电机的发送计划(TDMA)，拒绝超过目标负载率的配置，并按计划执行收发
+import collections
+import logging
+import math
+import threading
+import time
+from pcan_cybergear import CANMotorController
+from control_loop import LoopStats, wait_until
+
+CmdModes = CANMotorController.CmdModes
+
+# 各命令类型请求帧的数据长度(DLC), 与 CANMotorController 中的帧构造一致; 应答帧均为 8 字节
+REQUEST_DLC = {
+    CmdModes.GET_DEVICE_ID: 0,
+    CmdModes.MOTOR_CONTROL: 8,
+    CmdModes.MOTOR_ENABLE: 0,
+    CmdModes.MOTOR_STOP: 8,
+    CmdModes.SET_MECHANICAL_ZERO: 1,
+    CmdModes.SET_MOTOR_CAN_ID: 8,
+    CmdModes.PARAM_TABLE_WRITE: 8,
+    CmdModes.SINGLE_PARAM_READ: 8,
+    CmdModes.SINGLE_PARAM_WRITE: 8,
+}
+REPLY_DLC = 8
+
+# 一条命令流: 以 rate_hz 的频率向 motor_ids 中的每个电机发送 cmd_mode 命令
+# frame: 可调用对象 frame(motor), 返回 (cmd_mode, data2, data1), 执行计划时使用
+Stream = collections.namedtuple("Stream", ["label", "cmd_mode", "rate_hz", "motor_ids", "frame"])
+
+# 计划中的一个时间片: 相对小周期起点的偏移(秒)、时长(秒)、目标电机和所属命令流
+Slot = collections.namedtuple("Slot", ["offset", "duration", "motor_id", "stream"])
+
+
+def frame_bits(dlc, extended=True, stuffing=True):
+    """
+    计算一帧在总线上占用的位数(含帧间隔)。
+
+    参数:
+    dlc: 数据长度(0 ~ 8)。
+    extended: 是否为29位扩展帧。
+    stuffing: 是否按最坏情况计入位填充。
+
+    返回:
+    位数。
+    """
+    # 参与位填充的部分: SOF、仲裁段、控制段、数据段、CRC
+    stuffed = (54 if extended else 34) + 8 * dlc
+    # 不参与位填充的部分: CRC界定符、ACK、EOF、帧间隔
+    bits = stuffed + 13
+    if stuffing:
+        bits += (stuffed - 1) // 4
+    return bits
+
+
+class Schedule:
+    def __init__(self, minor_period, cycles, bitrate):
+        """
+        时间片发送计划。
+
+        参数:
+        minor_period: 小周期(秒), 即最高频命令流的周期。
+        cycles: 每个小周期的 Slot 列表, 依次循环执行(长度即大周期包含的小周期数)。
+        bitrate: 总线波特率。
+        """
+        self.minor_period = minor_period
+        self.cycles = cycles
+        self.bitrate = bitrate
+
+    @property
+    def major_period(self):
+        return self.minor_period * len(self.cycles)
+
+    def utilization(self):
+        """
+        返回每个小周期内时间片占用的比例。
+        """
+        return [sum(slot.duration for slot in cycle) / self.minor_period for cycle in self.cycles]
+
+    def __repr__(self):
+        util = self.utilization()
+        return (f"Schedule(minor_period={self.minor_period * 1e6:.0f}us, cycles={len(self.cycles)}, "
+                f"slots={sum(len(c) for c in self.cycles)}, max_utilization={max(util):.1%})")
+
+
+class BusPlanner:
+    def __init__(self, bitrate=1000000, max_load=0.7, turnaround=0.0001, stuffing=True):
+        """
+        初始化总线带宽规划器。
+
+        参数:
+        bitrate: 总线波特率(bit/s)。
+        max_load: 允许的最大总线负载率(0 ~ 1), 超过则拒绝该配置。
+        turnaround: 电机收到命令到发出应答的处理时间(秒), 计入每个时间片。
+        stuffing: 是否按最坏情况计入位填充。
+        """
+        if not 0 < max_load <= 1:
+            raise ValueError(f"Invalid max load: {max_load}")
+        self.bitrate = bitrate
+        self.max_load = max_load
+        self.turnaround = turnaround
+        self.stuffing = stuffing
+        self.streams = []
+
+    def add_stream(self, cmd_mode, rate_hz, motor_ids, frame=None, label=None):
+        """
+        添加一条命令流。
+
+        参数:
+        cmd_mode: CmdModes 中的命令类型。
+        rate_hz: 每个电机的命令频率(Hz)。
+        motor_ids: 电机CAN ID列表。
+        frame: 可调用对象 frame(motor), 返回 (cmd_mode, data2, data1); 只做规划时可省略。
+        label: 名称, 默认为命令类型。
+
+        返回:
+        Stream。
+        """
+        if cmd_mode not in REQUEST_DLC:
+            raise ValueError(f"Unsupported command type: {cmd_mode}")
+        if rate_hz <= 0:
+            raise ValueError(f"Invalid rate: {rate_hz} Hz")
+        stream = Stream(label or f"cmd{cmd_mode}", cmd_mode, rate_hz, tuple(motor_ids), frame)
+        self.streams.append(stream)
+        return stream
+
+    def transaction_bits(self, cmd_mode):
+        """
+        一次收发(请求帧 + 应答帧)占用的位数。
+        """
+        return (frame_bits(REQUEST_DLC[cmd_mode], stuffing=self.stuffing)
+                + frame_bits(REPLY_DLC, stuffing=self.stuffing))
+
+    def transaction_time(self, cmd_mode):
+        """
+        一次收发占用的时间片长度(秒), 含电机处理时间。
+        """
+        return self.transaction_bits(cmd_mode) / self.bitrate + self.turnaround
+
+    def budget(self):
+        """
+        计算帧预算。
+
+        返回:
+        dict: streams 为每条命令流的每秒收发次数、每秒位数和负载率;
+        load 为总线负载率(只计总线上的位); utilization 为时间片占用率(含电机处理时间);
+        max_transactions_per_s 为满负载时 8 字节收发的上限。
+        """
+        streams = []
+        total_bits = 0.0
+        total_time = 0.0
+        for stream in self.streams:
+            rate = stream.rate_hz * len(stream.motor_ids)
+            bits = rate * self.transaction_bits(stream.cmd_mode)
+            total_bits += bits
+            total_time += rate * self.transaction_time(stream.cmd_mode)
+            streams.append({
+                "label": stream.label,
+                "transactions_per_s": rate,
+                "bits_per_s": bits,
+                "load": bits / self.bitrate,
+            })
+        return {
+            "streams": streams,
+            "load": total_bits / self.bitrate,
+            "utilization": total_time,
+            "max_load": self.max_load,
+            "max_transactions_per_s": self.bitrate / self.transaction_bits(CmdModes.MOTOR_CONTROL),
+        }
+
+    def check(self):
+        """
+        检查配置是否在目标负载率以内, 超过则抛出 ValueError。
+
+        返回:
+        budget() 的结果。
+        """
+        budget = self.budget()
+        if budget["utilization"] > self.max_load:
+            raise ValueError(
+                f"Bus configuration needs {budget['utilization']:.1%} of the bus time "
+                f"({budget['load']:.1%} on the wire), exceeding the {self.max_load:.0%} limit")
+        return budget
+
+    def schedule(self):
+        """
+        生成时间片发送计划: 小周期为最高频命令流的周期, 低频命令流按其周期分散到不同的小周期中
+        (选择负载最轻的相位), 每个小周期内轮流排列各电机的时间片, 避免同一电机的收发连续堆积。
+
+        返回:
+        Schedule。
+        """
+        if not self.streams:
+            raise ValueError("No streams to schedule")
+        self.check()
+        base_rate = max(stream.rate_hz for stream in self.streams)
+        minor_period = 1.0 / base_rate
+        divisors = {}
+        for stream in self.streams:
+            ratio = base_rate / stream.rate_hz
+            if abs(ratio - round(ratio)) > 1e-9:
+                raise ValueError(
+                    f"Rate of {stream.label} ({stream.rate_hz} Hz) must divide {base_rate} Hz")
+            divisors[stream] = int(round(ratio))
+        n_cycles = 1
+        for k in divisors.values():
+            n_cycles = n_cycles * k // math.gcd(n_cycles, k)
+
+        # 每个小周期中的 (stream, motor_id) 及其时长; 耗时长、频率低的先分配相位
+        load = [0.0] * n_cycles
+        assigned = [[] for _ in range(n_cycles)]
+        jobs = [(stream, motor_id) for stream in self.streams for motor_id in stream.motor_ids]
+        jobs.sort(key=lambda job: (-divisors[job[0]], -self.transaction_time(job[0].cmd_mode)))
+        for stream, motor_id in jobs:
+            k = divisors[stream]
+            duration = self.transaction_time(stream.cmd_mode)
+            phase = min(range(k), key=lambda p: max(load[p::k]))
+            for c in range(phase, n_cycles, k):
+                load[c] += duration
+                assigned[c].append((stream, motor_id, duration))
+
+        budget = minor_period * self.max_load
+        cycles = []
+        for c, jobs in enumerate(assigned):
+            if load[c] > budget + 1e-12:
+                raise ValueError(
+                    f"Minor cycle {c} needs {load[c] * 1e6:.0f}us, exceeding "
+                    f"{budget * 1e6:.0f}us ({self.max_load:.0%} of {minor_period * 1e6:.0f}us)")
+            cycles.append(self._interleave(jobs))
+        return Schedule(minor_period, cycles, self.bitrate)
+
+    @staticmethod
+    def _interleave(jobs):
+        # 按电机轮流取时间片: 电机A、电机B、电机C、电机A、...
+        by_motor = collections.OrderedDict()
+        for job in jobs:
+            by_motor.setdefault(job[1], collections.deque()).append(job)
+        slots = []
+        offset = 0.0
+        while by_motor:
+            for motor_id in list(by_motor):
+                stream, _, duration = by_motor[motor_id].popleft()
+                slots.append(Slot(offset, duration, motor_id, stream))
+                offset += duration
+                if not by_motor[motor_id]:
+                    del by_motor[motor_id]
+        return slots
+
+
+class ScheduleRunner:
+    def __init__(self, schedule, motors, spin=0.0005):
+        """
+        按时间片计划执行收发。
+
+        参数:
+        schedule: BusPlanner.schedule() 生成的计划(每条命令流都需要提供 frame)。
+        motors: CANMotorController 列表或 MotorGroup。
+        spin: 截止时间前改为忙等的时间(秒)。
+        """
+        self.schedule = schedule
+        self.motors = {motor.MOTOR_ID: motor for motor in motors}
+        self.spin = spin
+        for cycle in schedule.cycles:
+            for slot in cycle:
+                if slot.stream.frame is None:
+                    raise ValueError(f"Stream {slot.stream.label} has no frame factory")
+                if slot.motor_id not in self.motors:
+                    raise ValueError(f"No controller for motor {slot.motor_id}")
+        # jitter 为每个时间片实际开始时间与计划时间之差, cycle_time 为每个时间片的收发耗时
+        self.stats = LoopStats(schedule.minor_period)
+        self._stop = threading.Event()
+
+    def stop(self):
+        """
+        请求停止执行(可在其他线程调用)。
+        """
+        self._stop.set()
+
+    def run(self, duration=None, cycles=None):
+        """
+        执行计划, 直到达到时长/小周期数或调用 stop()。应答帧由各控制器更新 motor.state。
+
+        参数:
+        duration: 运行时长(秒)。
+        cycles: 运行的小周期数。
+
+        返回:
+        LoopStats 统计结果。
+        """
+        stats = self.stats
+        period = self.schedule.minor_period
+        self._stop.clear()
+        start = time.perf_counter()
+        n = 0
+        while not self._stop.is_set():
+            if cycles is not None and n >= cycles:
+                break
+            cycle_start = start + n * period
+            if duration is not None and cycle_start - start >= duration:
+                break
+            for slot in self.schedule.cycles[n % len(self.schedule.cycles)]:
+                deadline = cycle_start + slot.offset
+                wait_until(deadline, self.spin)
+                t_begin = time.perf_counter()
+                motor = self.motors[slot.motor_id]
+                # 应答最晚等到本小周期结束
+                data, _ = motor.send_receive_can_message(
+                    *slot.stream.frame(motor),
+                    reply_timeout=max(cycle_start + period - t_begin, slot.duration))
+                t_end = time.perf_counter()
+                stats.jitter.append(t_begin - deadline)
+                stats.cycle_time.append(t_end - t_begin)
+                if data is None:
+                    stats.missed_replies += 1
+            stats.cycles += 1
+            n += 1
+            if time.perf_counter() > start + n * period:
+                stats.overruns += 1
+                behind = int((time.perf_counter() - start - n * period) / period)
+                if behind:
+                    stats.skipped += behind
+                    n += behind
+
+        logging.info(f"Schedule runner finished: {stats.summary()}")
+        return stats
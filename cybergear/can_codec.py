@@ -0,0 +1,84 @@
+# CAN数据区编解码：将 "f"、"u8"、"s16 s32" 等格式描述一次性编译为 struct.Struct 并缓存
+# 供 CANMotorController 的单参数写入、参数表写入复用，避免每次调用都重新解析格式字符串
+import struct
+import functools
+
+# 格式描述符 -> struct 格式字符(统一按小端、无对齐填充打包)
+FORMAT_CODES = {
+    "f": "f",
+    "u8": "B",
+    "s8": "b",
+    "u16": "H",
+    "s16": "h",
+    "u32": "I",
+    "s32": "i",
+}
+
+# 参数索引(写入/读取命令中 data1 的前4字节)
+INDEX_STRUCT = struct.Struct("<I")
+# 参数表特征码 + 类型码 + 保留字节
+FEATURE_STRUCT = struct.Struct("<HBB")
+
+
+class Codec:
+    """
+    预编译的数据区编解码器。
+
+    参数:
+    spec: 格式描述, 以空格分隔, 例如 "f" 或 "s16 s32"。
+    """
+
+    __slots__ = ("spec", "struct", "size", "_casts", "_pad")
+
+    def __init__(self, spec):
+        fields = spec.split()
+        codes = []
+        for f in fields:
+            code = FORMAT_CODES.get(f)
+            if code is None:
+                raise ValueError(f"unknown format in codec: {f}")
+            codes.append(code)
+        self.spec = spec
+        self.struct = struct.Struct("<" + "".join(codes))
+        self.size = self.struct.size
+        # 非浮点字段在打包前需转换为整数(与原 format_data 行为一致)
+        self._casts = tuple(float if f == "f" else int for f in fields)
+        # 不足4字节的数据区需补零
+        self._pad = bytes(max(4 - self.size, 0))
+
+    def encode(self, *values):
+        """
+        编码数据, 不足4字节时补零。
+
+        返回:
+        编码后的 bytes。
+        """
+        if len(values) == 1:
+            return self.struct.pack(self._casts[0](values[0])) + self._pad
+        return self.struct.pack(*[c(v) for c, v in zip(self._casts, values)]) + self._pad
+
+    def decode(self, data, offset=0):
+        """
+        解码数据, 多余的字节会被忽略。
+
+        返回:
+        解码后的元组。
+        """
+        return self.struct.unpack_from(bytes(data), offset)
+
+    def __repr__(self):
+        return f"Codec({self.spec!r})"
+
+
+@functools.lru_cache(maxsize=None)
+def compile_format(spec):
+    """
+    编译并缓存格式描述对应的编解码器。
+
+    参数:
+    spec: 格式描述, 例如 "f"、"u8"、"s16 s32"。
+
+    返回:
+    Codec 实例。
+    """
+    return Codec(spec)
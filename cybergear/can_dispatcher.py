@@ -0,0 +1,208 @@
+# CAN总线接收分发器：每条总线只有一个后台接收线程
+# 按仲裁ID中的电机CAN ID((arbitration_id >> 8) & 0xFF)把收到的帧投递到对应电机的接收队列，
+# 同一总线上的所有 CANMotorController 共享该分发器，避免互相读走对方的应答帧
+import logging
+import queue
+import threading
+
+
+class TxListeners:
+    """
+    发送监听者列表, 同步和异步分发器共用; CANMotorController.send_can_message 每发出一帧都调用 notify_tx。
+    """
+    # 添加/移除时整体替换列表, 发送方遍历时无需加锁
+    _tx_listeners = ()
+
+    def add_tx_listener(self, listener):
+        """
+        添加发送监听者, 本进程的电机控制器每发出一帧都会以 can.Message 为参数调用(在发送方线程中执行)。
+
+        参数:
+        listener: 可调用对象。
+        """
+        self._tx_listeners = self._tx_listeners + (listener,)
+
+    def remove_tx_listener(self, listener):
+        """
+        移除发送监听者。
+        """
+        listeners = list(self._tx_listeners)
+        listeners.remove(listener)
+        self._tx_listeners = tuple(listeners)
+
+    def notify_tx(self, msg):
+        """
+        通知发送监听者已发出一帧。
+        """
+        for listener in self._tx_listeners:
+            listener(msg)
+
+
+class BusDispatcher(TxListeners):
+    # 总线 -> 分发器 的全局注册表(以 id(bus) 为键)
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, bus, poll_timeout=0.1):
+        """
+        初始化总线分发器(一般通过 BusDispatcher.for_bus 获取, 无需直接构造)。
+
+        参数:
+        bus: CAN总线对象。
+        poll_timeout: 后台线程每次 recv 的超时时间(秒), 决定 stop() 的响应速度。
+        """
+        self.bus = bus
+        self.poll_timeout = poll_timeout
+        self._queues = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._rx_thread,
+            name=f"BusDispatcher for {getattr(bus, 'channel_info', bus)}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    @classmethod
+    def for_bus(cls, bus):
+        """
+        获取总线对应的分发器, 不存在则创建并启动后台接收线程。
+
+        参数:
+        bus: CAN总线对象。
+
+        返回:
+        BusDispatcher 实例。
+        """
+        with cls._registry_lock:
+            dispatcher = cls._registry.get(id(bus))
+            if dispatcher is None or dispatcher.bus is not bus or dispatcher.stopped:
+                dispatcher = cls(bus)
+                cls._registry[id(bus)] = dispatcher
+            return dispatcher
+
+    @property
+    def stopped(self):
+        return self._stopped.is_set()
+
+    def register(self, motor_id, on_frame=None):
+        """
+        为电机注册接收队列, 同一电机ID重复注册时替换旧队列。
+
+        参数:
+        motor_id: 电机的CAN ID。
+        on_frame: 可选回调, 每收到该电机的一帧都会在入队前调用(在后台线程中执行)。
+
+        返回:
+        该电机专属的 queue.Queue。
+        """
+        rx_queue = queue.Queue()
+        with self._lock:
+            if motor_id in self._queues:
+                logging.debug(f"Motor {motor_id} re-registered on dispatcher")
+            self._queues[motor_id] = (rx_queue, on_frame)
+        return rx_queue
+
+    def unregister(self, motor_id):
+        """
+        注销电机的接收队列。
+
+        参数:
+        motor_id: 电机的CAN ID。
+        """
+        with self._lock:
+            self._queues.pop(motor_id, None)
+
+    def add_listener(self, listener):
+        """
+        添加监听者, 每收到一帧都会以 can.Message 为参数调用(在后台线程中执行)。
+
+        参数:
+        listener: 可调用对象或 can.Listener。
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        移除监听者。
+
+        参数:
+        listener: 之前添加的监听者。
+        """
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def dispatch(self, msg):
+        """
+        将一帧投递给监听者和对应电机的接收队列。
+
+        参数:
+        msg: 收到的 can.Message。
+        """
+        for listener in self._listeners:
+            listener(msg)
+        motor_id = (msg.arbitration_id >> 8) & 0xFF
+        entry = self._queues.get(motor_id)
+        if entry is None:
+            logging.debug(
+                f"Dropped message with ID {hex(msg.arbitration_id)}: no motor {motor_id}")
+            return
+        rx_queue, on_frame = entry
+        if on_frame is not None:
+            on_frame(msg)
+        rx_queue.put(msg)
+
+    def _rx_thread(self):
+        while not self._stopped.is_set():
+            try:
+                msg = self.bus.recv(timeout=self.poll_timeout)
+            except Exception as e:
+                # 总线被关闭或出错时退出线程
+                if not self._stopped.is_set():
+                    logging.info(f"Bus dispatcher stopped: {e}")
+                break
+            if msg is not None:
+                self.dispatch(msg)
+        self._stopped.set()
+        with BusDispatcher._registry_lock:
+            if BusDispatcher._registry.get(id(self.bus)) is self:
+                del BusDispatcher._registry[id(self.bus)]
+
+    def stop(self, timeout=1.0):
+        """
+        停止后台接收线程(应在 bus.shutdown() 之前调用)。
+
+        参数:
+        timeout: 等待线程退出的时间(秒)。
+        """
+        self._stopped.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+
+def channel_name(bus):
+    """
+    总线的通道名称, 用于区分多个CAN适配器。
+
+    参数:
+    bus: CAN总线对象。
+
+    返回:
+    通道名称字符串。
+    """
+    return str(getattr(bus, "channel_info", None) or getattr(bus, "channel", bus))
+
+
+def release_bus(bus):
+    """
+    停止总线对应的分发器(如果存在)。
+
+    参数:
+    bus: CAN总线对象。
+    """
+    with BusDispatcher._registry_lock:
+        dispatcher = BusDispatcher._registry.pop(id(bus), None)
+    if dispatcher is not None:
+        dispatcher.stop()
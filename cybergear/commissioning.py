@@ -0,0 +1,279 @@
+# 声明式电机调试配置(commissioning)：用字典或 YAML/JSON 文件描述每个电机的参数表、单参数和启动命令序列，
+# 所有电机的配置帧交错连续发出(不逐帧等待应答)，最后批量读回单参数校验
+import copy
+import json
+import logging
+import time
+from motor_group import MotorGroup
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# 各脚本原先 init_motors 中逐个电机执行的配置
+DEFAULT_PROFILE = {
+    "defaults": {
+        "param_table": {
+            "limit_cur": 3,  # 电流限制
+            "loc_kp": 8,  # 位置环比例增益
+            "spd_kp": 2,  # 速度环比例增益
+            "spd_ki": 0.03,  # 速度环积分增益
+        },
+        "params": {
+            "limit_spd": 0.5,  # 最大速度限制
+        },
+    },
+    # 启动命令序列: "disable"、"set_zero"、"enable", 或 {参数名称: 值} (如 {"run_mode": "POSITION_MODE"})
+    "sequence": ["disable", "set_zero", {"run_mode": "POSITION_MODE"}, "enable"],
+}
+
+
+def load_profile(source):
+    """
+    加载调试配置。
+
+    参数:
+    source: 配置字典, 或 .yaml/.yml/.json 文件路径(YAML 需要安装 PyYAML)。
+
+    返回:
+    配置字典, 结构同 DEFAULT_PROFILE, 另可包含 motors: {电机CAN ID: 覆盖 defaults 的配置}。
+    """
+    if isinstance(source, dict):
+        profile = copy.deepcopy(source)
+    elif str(source).endswith((".yaml", ".yml")):
+        if yaml is None:
+            raise ImportError("PyYAML is required to load YAML profiles: pip install pyyaml")
+        with open(source, encoding="utf-8") as f:
+            profile = yaml.safe_load(f) or {}
+    else:
+        with open(source, encoding="utf-8") as f:
+            profile = json.load(f)
+    # JSON 的键只能是字符串
+    profile["motors"] = {int(k): v or {} for k, v in (profile.get("motors") or {}).items()}
+    return profile
+
+
+def motor_config(profile, motor_id):
+    """
+    合并 defaults 与该电机的覆盖配置。
+
+    返回:
+    (param_table, params, sequence) 元组。
+    """
+    defaults = profile.get("defaults") or {}
+    override = profile.get("motors", {}).get(motor_id, {})
+    param_table = dict(defaults.get("param_table") or {})
+    param_table.update(override.get("param_table") or {})
+    params = dict(defaults.get("params") or {})
+    params.update(override.get("params") or {})
+    sequence = override.get("sequence", profile.get("sequence") or [])
+    return param_table, params, sequence
+
+
+def expected_values(motor, params, sequence):
+    """
+    配置完成后应能读回的单参数值(单参数和启动序列中的参数写入)。
+
+    返回:
+    {参数名称: 值} 字典。
+    """
+    expected = dict(params)
+    for step in sequence:
+        if isinstance(step, dict):
+            (name, value), = step.items()
+            if name == "run_mode" and isinstance(value, str):
+                value = motor.RunModes[value].value
+            expected[name] = value
+    return expected
+
+
+class Commissioner:
+    def __init__(self, motors, profile=None, timeout=1.0):
+        """
+        初始化调试配置执行器。
+
+        参数:
+        motors: CANMotorController 列表或 MotorGroup。
+        profile: 配置字典或文件路径, 默认为 DEFAULT_PROFILE。
+        timeout: 等待全部应答的超时时间(秒)。
+        """
+        self.group = motors if isinstance(motors, MotorGroup) else MotorGroup(motors)
+        self.profile = load_profile(DEFAULT_PROFILE if profile is None else profile)
+        self.timeout = timeout
+        unknown = set(self.profile["motors"]) - {m.MOTOR_ID for m in self.group}
+        if unknown:
+            logging.info(f"Commissioning profile has no controller for motors: {sorted(unknown)}")
+
+    def _step(self, motor, step):
+        # 启动命令 -> (帧, 收到应答后对缓存的处理)
+        if step == "disable":
+            frame = (motor.CmdModes.MOTOR_STOP, motor.MAIN_CAN_ID, [0, 0, 0, 0, 0, 0, 0, 0])
+            return frame, lambda ok: motor.invalidate_param_cache()
+        if step == "set_zero":
+            frame = (motor.CmdModes.SET_MECHANICAL_ZERO, motor.MAIN_CAN_ID, [1])
+            return frame, lambda ok: motor.invalidate_param_cache()
+        if step == "enable":
+            return (motor.CmdModes.MOTOR_ENABLE, motor.MAIN_CAN_ID, []), None
+        if isinstance(step, dict) and len(step) == 1:
+            (name, value), = step.items()
+            if name == "run_mode" and isinstance(value, str):
+                value = motor.RunModes[value].value
+            return self._param_write(motor, name, value, force=True)
+        raise ValueError(f"Unknown commissioning step: {step!r}")
+
+    def _param_write(self, motor, name, value, force):
+        if name not in motor.PARAMETERS:
+            raise ValueError(f"Unknown parameter name: {name}")
+        if motor.skip_redundant_write(name, value, force=force):
+            return None, None
+        codec = motor.PARAMETERS[name]["codec"]
+        return (motor.single_param_frame(name, value),
+                lambda ok: motor.registers.confirm_write(name, value, codec, ok))
+
+    def _table_write(self, motor, name, value, force):
+        if name not in motor.PARAM_TABLE:
+            raise ValueError(f"Unknown param table name: {name}")
+        if motor.skip_redundant_table_write(name, value, force=force):
+            return None, None
+        codec = motor.PARAM_TABLE[name]["codec"]
+        return (motor.param_table_frame(name, value),
+                lambda ok: motor.table_registers.confirm_write(name, value, codec, ok))
+
+    def plan(self, motor, force=False, param_table=None, params=None, sequence=None):
+        """
+        生成一个电机的配置帧及期望读回的单参数值。
+
+        参数:
+        motor: CANMotorController 实例。
+        force: 为 True 时忽略写直达缓存, 总是写入。
+        param_table, params, sequence: 覆盖配置中对应的部分(为 None 时使用配置)。
+
+        返回:
+        (帧列表, 收到应答后的缓存处理列表, 期望值字典 {参数名称: 值})。
+        """
+        cfg_table, cfg_params, cfg_sequence = motor_config(self.profile, motor.MOTOR_ID)
+        param_table = cfg_table if param_table is None else param_table
+        params = cfg_params if params is None else params
+        sequence = cfg_sequence if sequence is None else sequence
+        frames, effects = [], []
+        steps = [self._table_write(motor, name, value, force) for name, value in param_table.items()]
+        steps += [self._param_write(motor, name, value, force) for name, value in params.items()]
+        steps += [self._step(motor, step) for step in sequence]
+        for frame, effect in steps:
+            if frame is not None:
+                frames.append(frame)
+                effects.append(effect)
+        return frames, effects, expected_values(motor, params, sequence)
+
+    def run(self, verify=True, force=False, **overrides):
+        """
+        并发配置所有电机: 各电机的全部配置帧交错连续发出, 再批量读回单参数校验。
+
+        参数:
+        verify: 是否读回单参数并与期望值比较。
+        force: 为 True 时忽略写直达缓存, 总是写入。
+        overrides: 传给 plan() 的 param_table/params/sequence。
+
+        返回:
+        电机CAN ID -> {"sent", "acked", "mismatched", "ok"} 的字典,
+        mismatched 为 {参数名称: (期望值, 读回值)}。
+        """
+        plans = [self.plan(motor, force=force, **overrides) for motor in self.group]
+        return self.execute(plans, verify=verify)
+
+    def execute(self, plans, verify=True):
+        """
+        执行 plan() 生成的配置(每个电机可以不同)。
+
+        参数:
+        plans: 与电机组等长的 plan() 结果列表。
+        verify: 是否读回单参数并与期望值比较。
+
+        返回:
+        同 run()。
+        """
+        t0 = time.perf_counter()
+        replies = self.group.pipeline([frames for frames, _, _ in plans], timeout=self.timeout)
+        report = {}
+        for motor, (frames, effects, expected), motor_replies in zip(self.group, plans, replies):
+            acked = 0
+            for effect, (data, _) in zip(effects, motor_replies):
+                acked += data is not None
+                if effect is not None:
+                    effect(data is not None)
+            report[motor.MOTOR_ID] = {
+                "sent": len(frames), "acked": acked, "mismatched": {},
+                "ok": acked == len(frames),
+            }
+
+        if verify:
+            self._verify(plans, report)
+        elapsed = time.perf_counter() - t0
+        failed = [mid for mid, r in report.items() if not r["ok"]]
+        if failed:
+            logging.info(f"Commissioning failed for motors {failed}: {report}")
+        else:
+            logging.info(f"Commissioned {len(report)} motors in {elapsed * 1e3:.1f} ms")
+        return report
+
+    def read_back(self, names_lists):
+        """
+        读回各电机的单参数(各电机的读取请求交错连续发出), 并记入影子寄存器。
+
+        参数:
+        names_lists: 与电机组等长的列表, 每项为该电机要读取的参数名称。
+
+        返回:
+        与电机组等长的列表, 每项为 {参数名称: 值}, 未收到应答的参数不包含在内。
+        """
+        read_lists = [[motor.read_param_frame(name) for name in names]
+                      for motor, names in zip(self.group, names_lists)]
+        replies = self.group.pipeline(read_lists, timeout=self.timeout)
+        result = []
+        for motor, motor_replies in zip(self.group, replies):
+            values = {}
+            for data, _ in motor_replies:
+                if data is None:
+                    continue
+                name = motor.PARAMETER_NAMES.get(data[0] | (data[1] << 8))
+                if name is not None:
+                    values[name] = motor.PARAMETERS[name]["codec"].decode(data, 4)[0]
+                    motor.registers.put(name, values[name])
+            result.append(values)
+        return result
+
+    def _verify(self, plans, report):
+        values_list = self.read_back([list(expected) for _, _, expected in plans])
+        for motor, (_, _, expected), values in zip(self.group, plans, values_list):
+            entry = report[motor.MOTOR_ID]
+            for name, value in expected.items():
+                codec = motor.PARAMETERS[name]["codec"]
+                if name not in values:
+                    entry["mismatched"][name] = (value, None)
+                    continue
+                if codec.encode(values[name]) != codec.encode(value):
+                    entry["mismatched"][name] = (value, values[name])
+            if entry["mismatched"]:
+                entry["ok"] = False
+
+
+def commission(motors, profile=None, verify=True, force=False, timeout=1.0):
+    """
+    按配置并发配置所有电机, 校验失败时抛出 RuntimeError。
+
+    参数:
+    motors: CANMotorController 列表或 MotorGroup。
+    profile: 配置字典或文件路径, 默认为 DEFAULT_PROFILE。
+    verify: 是否读回单参数校验。
+    force: 为 True 时忽略写直达缓存, 总是写入。
+    timeout: 等待全部应答的超时时间(秒)。
+
+    返回:
+    Commissioner.run() 的结果。
+    """
+    report = Commissioner(motors, profile, timeout=timeout).run(verify=verify, force=force)
+    failed = {mid: r for mid, r in report.items() if not r["ok"]}
+    if failed:
+        raise RuntimeError(f"Commissioning failed: {failed}")
+    return report
@@ -0,0 +1,194 @@
+# 电机配置快照与热启动：每次调试配置成功后按通道和电机CAN ID保存写入的配置(不同总线上的电机可以使用相同ID)，
+# 下次启动时读回电机的单参数与快照比较——一致说明电机未断电、配置仍然有效，
+# 只重写与调试配置不同的单参数，不再停止电机和重新设置零点；
+# 读回不一致、没有快照或参数表/启动序列(无法读回, 以指纹比较)已修改的电机完整配置
+import hashlib
+import json
+import logging
+import os
+import time
+from can_dispatcher import channel_name
+from commissioning import Commissioner, motor_config, expected_values
+
+SNAPSHOT_PATH = os.path.join(os.path.expanduser("~"), ".cybergear", "motor_snapshot.json")
+
+# 热启动时跳过的启动命令(电机保持上电时不需要重新停止和设置零点)
+WARM_SKIP_STEPS = ("disable", "set_zero")
+
+
+def fingerprint(param_table, sequence):
+    """
+    配置中无法读回部分的指纹(参数表和启动序列), 用于判断其是否与快照相同;
+    单参数通过读回比较, 不计入指纹。
+    """
+    text = json.dumps([param_table, sequence], sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def motor_key(motor):
+    """
+    电机在快照中的键: "通道名称:电机CAN ID"。
+
+    参数:
+    motor: CANMotorController 实例。
+
+    返回:
+    键字符串。
+    """
+    return f"{channel_name(motor.bus)}:{motor.MOTOR_ID}"
+
+
+class ConfigSnapshot:
+    def __init__(self, path=None):
+        """
+        按通道和电机CAN ID(见 motor_key)保存的配置快照。
+
+        参数:
+        path: 快照文件路径, 默认为 SNAPSHOT_PATH。
+        """
+        self.path = path or SNAPSHOT_PATH
+        self.motors = {}
+        self.load()
+
+    def load(self):
+        """
+        从文件加载快照, 文件不存在或损坏时为空。
+        """
+        self.motors = {}
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.motors = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.info(f"Ignored unreadable snapshot {self.path}: {e}")
+
+    def save(self):
+        """
+        保存快照(先写临时文件再替换, 避免中断时损坏)。
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(self.motors.items())), f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key):
+        """
+        返回电机的快照, 没有时为 None。
+
+        参数:
+        key: motor_key() 返回的键。旧版快照只以电机CAN ID为键, 找不到时按ID查找,
+             读回校验仍会在热启动前确认电机状态。
+        """
+        snap = self.motors.get(key)
+        if snap is None:
+            snap = self.motors.get(key.rpartition(":")[2])
+        return snap
+
+    def record(self, key, param_table, params, sequence, readback):
+        """
+        记录一个电机配置成功后的状态。
+
+        参数:
+        key: motor_key() 返回的键。
+        param_table, params, sequence: 写入的配置。
+        readback: 配置完成后应能读回的单参数值。
+        """
+        self.motors.pop(key.rpartition(":")[2], None)  # 替换旧版以ID为键的记录
+        self.motors[key] = {
+            "fingerprint": fingerprint(param_table, sequence),
+            "param_table": param_table,
+            "params": readback,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def forget(self, *keys):
+        """
+        删除快照(参数为 motor_key() 返回的键), 不指定电机则全部删除(下次启动时完整配置)。
+        """
+        if not keys:
+            self.motors.clear()
+        for key in keys:
+            self.motors.pop(key, None)
+            self.motors.pop(key.rpartition(":")[2], None)
+
+
+def _same(codec, a, b):
+    return a is not None and b is not None and codec.encode(a) == codec.encode(b)
+
+
+def warm_start(motors, profile=None, path=None, full=False, timeout=1.0):
+    """
+    按快照热启动: 读回单参数与快照一致且参数表、启动序列未修改的电机只重写与配置不同的单参数,
+    其余电机(无快照、读回不一致或无应答、参数表或启动序列已修改)完整配置; 成功后更新快照。
+
+    参数:
+    motors: CANMotorController 列表或 MotorGroup。
+    profile: 调试配置, 同 commissioning.commission。
+    path: 快照文件路径, 默认为 SNAPSHOT_PATH。
+    full: 为 True 时忽略快照, 完整重新配置所有电机。
+    timeout: 等待全部应答的超时时间(秒)。
+
+    返回:
+    Commissioner.run() 的结果, 每个电机另有 "start": "warm"/"cold"/"full"。
+    校验失败时抛出 RuntimeError。
+    """
+    t0 = time.perf_counter()
+    commissioner = Commissioner(motors, profile, timeout=timeout)
+    group = commissioner.group
+    snapshot = ConfigSnapshot(path)
+    configs = [motor_config(commissioner.profile, motor.MOTOR_ID) for motor in group]
+
+    if full:
+        starts = ["full"] * len(group)
+        plans = [commissioner.plan(motor, force=True) for motor in group]
+    else:
+        # 读回快照中记录的单参数, 与快照一致说明电机保持上电且配置未被改动
+        snaps = [snapshot.get(motor_key(motor)) or {} for motor in group]
+        values_list = commissioner.read_back([list(snap.get("params", {})) for snap in snaps])
+        starts, plans = [], []
+        for motor, (param_table, params, sequence), snap, values in zip(
+                group, configs, snaps, values_list):
+            # 参数表和启动序列无法读回, 与快照不同时可能需要重新停止和设置零点, 完整配置
+            warm = bool(snap.get("params")) and all(
+                _same(motor.PARAMETERS[name]["codec"], values.get(name), value)
+                for name, value in snap["params"].items()
+            ) and fingerprint(param_table, sequence) == snap.get("fingerprint")
+            if not warm:
+                starts.append("cold")
+                plans.append(commissioner.plan(motor, force=True))
+                continue
+            starts.append("warm")
+            for name, value in param_table.items():
+                motor.table_registers.put(name, value)
+            # 读回的值已在影子寄存器中, 单参数与读回值相同的写入会被写直达缓存跳过
+            expected = expected_values(motor, params, sequence)
+            steps = [
+                step for step in sequence
+                if step not in WARM_SKIP_STEPS and not (isinstance(step, dict) and all(
+                    _same(motor.PARAMETERS[name]["codec"], values.get(name), expected[name])
+                    for name in step))
+            ]
+            frames, effects, _ = commissioner.plan(
+                motor, param_table={}, params=params, sequence=steps)
+            plans.append((frames, effects, expected))
+
+    report = commissioner.execute(plans, verify=True)
+    for motor, (param_table, params, sequence), start, plan in zip(group, configs, starts, plans):
+        entry = report[motor.MOTOR_ID]
+        entry["start"] = start
+        if entry["ok"]:
+            snapshot.record(motor_key(motor), param_table, params, sequence, plan[2])
+        else:
+            snapshot.forget(motor_key(motor))
+    snapshot.save()
+
+    logging.info(f"Started motors in {(time.perf_counter() - t0) * 1e3:.1f} ms: "
+                 f"{dict(zip((m.MOTOR_ID for m in group), starts))}")
+    failed = {mid: r for mid, r in report.items() if not r["ok"]}
+    if failed:
+        raise RuntimeError(f"Commissioning failed: {failed}")
+    return report
@@ -0,0 +1,185 @@
+# 运控模式(RunModes.CONTROL_MODE)固定频率控制循环
+# 按绝对截止时间调度，每个周期向电机组批量下发 扭矩/角度/速度/Kp/Kd 设定值，
+# 并记录每周期的抖动、超时(overrun)和丢失的应答
+import collections
+import logging
+import threading
+import time
+
+
+def wait_until(deadline, spin=0.0005):
+    """
+    等待到截止时间: 先粗略 sleep, 最后 spin 秒忙等, 以降低 time.sleep 的唤醒抖动。
+
+    参数:
+    deadline: time.perf_counter() 时间基准下的截止时间(秒)。
+    spin: 截止时间前改为忙等的时间(秒)。
+    """
+    remaining = deadline - time.perf_counter()
+    if remaining > spin:
+        time.sleep(remaining - spin)
+    while time.perf_counter() < deadline:
+        pass
+
+
+class SampleWindow:
+    def __init__(self, window=10000):
+        """
+        每周期的计时样本: 全部样本的个数、均值和最大值, 以及最近 window 个样本(用于分位数),
+        长时间运行时内存占用固定。
+
+        参数:
+        window: 保留的最近样本数。
+        """
+        self.recent = collections.deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = None
+
+    def append(self, value):
+        self.recent.append(value)
+        self.count += 1
+        self.total += value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def __len__(self):
+        return self.count
+
+
+class LoopStats:
+    def __init__(self, period, window=10000):
+        """
+        控制循环统计。
+
+        参数:
+        period: 控制周期(秒)。
+        window: 计算 p99 时使用的最近周期数。
+        """
+        self.period = period
+        self.cycles = 0
+        self.overruns = 0  # 本周期结束时已超过下一周期的截止时间
+        self.skipped = 0  # 因严重超时被跳过的周期数
+        self.missed_replies = 0  # 未在周期内收到的应答数
+        self.jitter = SampleWindow(window)  # 每周期实际开始时间与截止时间之差(秒)
+        self.cycle_time = SampleWindow(window)  # 每周期发送+接收的耗时(秒)
+
+    def summary(self):
+        """
+        汇总统计结果, 均值和最大值基于全部周期, p99 基于最近 window 个周期。
+
+        返回:
+        dict, 时间单位为微秒。
+        """
+        result = {
+            "period_us": self.period * 1e6,
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "missed_replies": self.missed_replies,
+        }
+        for name, values in (("jitter", self.jitter), ("cycle_time", self.cycle_time)):
+            if not values:
+                continue
+            ordered = sorted(values.recent)
+            result[f"{name}_mean_us"] = values.total / values.count * 1e6
+            result[f"{name}_p99_us"] = ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)] * 1e6
+            result[f"{name}_max_us"] = values.max * 1e6
+        return result
+
+
+class ControlLoop:
+    def __init__(self, group, setpoints, rate_hz=500, reply_timeout=None, spin=0.0005):
+        """
+        初始化运控模式控制循环(电机需已设置为 CONTROL_MODE 并使能)。
+
+        参数:
+        group: MotorGroup 电机组。
+        setpoints: 设定值来源, 二选一:
+                   可调用对象 setpoints(cycle, t, feedback), 返回与电机等长的
+                   (torque, target_angle, target_velocity, Kp, Kd) 列表, feedback 为上一周期的 MotorReply 列表;
+                   或预先计算的数组, 形状为 (周期数, 电机数, 5), 播放完毕后循环结束。
+        rate_hz: 控制频率(Hz), 常用 500 ~ 1000。
+        reply_timeout: 每周期等待应答的时间(秒), 默认为周期的 80%。
+        spin: 截止时间前改为忙等的时间(秒), 用于降低 time.sleep 的唤醒抖动。
+        """
+        if rate_hz <= 0:
+            raise ValueError(f"Invalid rate: {rate_hz} Hz")
+        self.group = group
+        self.setpoints = setpoints
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.reply_timeout = self.period * 0.8 if reply_timeout is None else reply_timeout
+        self.spin = spin
+        self.stats = LoopStats(self.period)
+        self._stop = threading.Event()
+
+    def _setpoints_for(self, cycle, t, feedback):
+        if callable(self.setpoints):
+            return self.setpoints(cycle, t, feedback)
+        if cycle >= len(self.setpoints):
+            return None
+        return self.setpoints[cycle]
+
+    def _send(self, sp, t):
+        # 下发一个周期的设定值并返回应答(子类可改为其他命令)
+        return self.group.control_all(sp, timeout=self.reply_timeout, quiet=True)
+
+    def _wait_until(self, deadline):
+        wait_until(deadline, self.spin)
+
+    def stop(self):
+        """
+        请求停止循环(可在其他线程调用)。
+        """
+        self._stop.set()
+
+    def run(self, duration=None, cycles=None):
+        """
+        运行控制循环, 直到达到时长/周期数、设定值数组播放完毕或调用 stop()。
+
+        参数:
+        duration: 运行时长(秒)。
+        cycles: 运行的周期数。
+
+        返回:
+        LoopStats 统计结果。
+        """
+        stats = self.stats
+        period = self.period
+        feedback = []
+        self._stop.clear()
+        start = time.perf_counter()
+        cycle = 0
+        while not self._stop.is_set():
+            if cycles is not None and cycle >= cycles:
+                break
+            deadline = start + cycle * period
+            if duration is not None and deadline - start >= duration:
+                break
+            self._wait_until(deadline)
+
+            t_begin = time.perf_counter()
+            sp = self._setpoints_for(cycle, deadline - start, feedback)
+            if sp is None:
+                break
+            feedback = self._send(sp, deadline - start)
+            t_end = time.perf_counter()
+
+            stats.cycles += 1
+            stats.jitter.append(t_begin - deadline)
+            stats.cycle_time.append(t_end - t_begin)
+            stats.missed_replies += sum(1 for r in feedback if r is not None and r.timed_out)
+
+            cycle += 1
+            next_deadline = start + cycle * period
+            if t_end > next_deadline:
+                stats.overruns += 1
+                # 落后超过一个周期时跳到下一个未来的截止时间, 不追发过期的设定值
+                behind = int((t_end - next_deadline) / period)
+                if behind:
+                    stats.skipped += behind
+                    cycle += behind
+
+        logging.info(f"Control loop finished: {stats.summary()}")
+        return stats
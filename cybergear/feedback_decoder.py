@@ -0,0 +1,58 @@
+# 电机反馈帧的批量解码(NumPy 向量化)
+# 用于 kHz 级遥测和离线分析录制的数据，结果与 CANMotorController.parse_received_msg 逐位一致
+import numpy as np
+
+TWO_BYTES_SPAN = (1 << 16) - 1
+
+
+def feedback_limits(motor):
+    """
+    读取控制器的位置/速度/力矩量程。
+
+    参数:
+    motor: CANMotorController 实例。
+
+    返回:
+    可直接传给 decode_feedback_batch 的关键字参数字典。
+    """
+    return {
+        "p_min": motor.P_MIN, "p_max": motor.P_MAX,
+        "v_min": motor.V_MIN, "v_max": motor.V_MAX,
+        "t_min": motor.T_MIN, "t_max": motor.T_MAX,
+    }
+
+
+def _uint_to_float(raw, x_min, x_max):
+    # 与 CANMotorController._uint_to_float 相同的运算顺序, 保证浮点结果一致
+    raw = np.clip(raw, 0, TWO_BYTES_SPAN).astype(np.float64)
+    return (x_max - x_min) * raw / TWO_BYTES_SPAN + x_min
+
+
+def decode_feedback_batch(data, arbitration_ids, p_min=-12.5, p_max=12.5,
+                          v_min=-30.0, v_max=30.0, t_min=-12.0, t_max=12.0):
+    """
+    批量解码电机反馈帧。
+
+    参数:
+    data: N×8 的 uint8 数组(每行为一帧的数据区)。
+    arbitration_ids: 长度为 N 的仲裁ID数组。
+    p_min, p_max, v_min, v_max, t_min, t_max: 位置/速度/力矩量程, 默认与 CANMotorController 一致。
+
+    返回:
+    一个元组, 包含电机CAN ID、位置(rad)、速度(rad/s)、力矩(Nm)、温度(摄氏度)五个长度为 N 的数组。
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    if data.ndim != 2 or data.shape[1] < 8:
+        raise ValueError(f"Expected an N×8 uint8 array, got shape {data.shape}")
+    arbitration_ids = np.asarray(arbitration_ids, dtype=np.uint32)
+
+    # 大端 16 位字段: (data[0] << 8) + data[1] 等
+    words = data[:, 0:8].astype(np.uint32)
+    words = (words[:, 0::2] << 8) + words[:, 1::2]
+
+    motor_id = ((arbitration_ids >> 8) & 0xFF).astype(np.uint8)
+    pos = _uint_to_float(words[:, 0], p_min, p_max)
+    vel = _uint_to_float(words[:, 1], v_min, v_max)
+    torque = _uint_to_float(words[:, 2], t_min, t_max)
+    temperature = words[:, 3] / 10.0
+    return motor_id, pos, vel, torque, temperature
@@ -0,0 +1,351 @@
+# 二进制CAN帧日志：记录本进程发出和收到的每一帧(时间戳、仲裁ID、DLC、8字节数据)，
+# 文件为固定头部加定长记录，可以直接用 numpy.memmap 打开按字段切片分析，不需要逐行解析文本；
+# 回放器按原始或缩放后的时间间隔把日志中的帧重新发到总线上
+import argparse
+import logging
+import threading
+import time
+import numpy as np
+import can
+from can_dispatcher import BusDispatcher, release_bus
+from control_loop import wait_until
+
+# 文件头: 魔数、版本、记录长度、开始记录时的墙上时间
+MAGIC = b"CGFRAMES"
+VERSION = 1
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"), ("version", "<u4"), ("record_size", "<u4"), ("created", "<f8"), ("reserved", "u1", 8),
+])
+HEADER_SIZE = HEADER_DTYPE.itemsize  # 32
+
+# 每帧一条记录(24字节)
+FRAME_DTYPE = np.dtype([
+    ("ts", "<f8"),  # 时间戳(秒, time.time() 时基)
+    ("arb", "<u4"),  # 仲裁ID
+    ("dlc", "u1"),  # 数据长度
+    ("flags", "u1"),  # FLAG_* 的组合
+    ("pad", "u1", 2),
+    ("data", "u1", 8),  # 数据, 不足8字节补0
+])
+
+FLAG_TX = 0x01  # 本进程发出的帧(否则为收到的帧)
+FLAG_EXTENDED = 0x02
+FLAG_REMOTE = 0x04
+FLAG_ERROR = 0x08
+
+
+def open_log(path, mode="r"):
+    """
+    以 numpy.memmap 打开帧日志(不读入内存)。
+
+    参数:
+    path: 日志文件路径。
+    mode: memmap 的打开模式, 默认只读。
+
+    返回:
+    dtype 为 FRAME_DTYPE 的一维 memmap; 可按字段访问, 如 log["ts"]、log["data"][:, 0]。
+    """
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) != 1 or header["magic"][0] != MAGIC:
+        raise ValueError(f"Not a CyberGear frame log: {path}")
+    if header["record_size"][0] != FRAME_DTYPE.itemsize:
+        raise ValueError(f"Unsupported record size {header['record_size'][0]} in {path}")
+    return np.memmap(path, dtype=FRAME_DTYPE, mode=mode, offset=HEADER_SIZE)
+
+
+def cmd_modes(log):
+    """
+    每帧的命令模式(仲裁ID的高5位)。
+    """
+    return (log["arb"] >> 24) & 0x1F
+
+
+def motor_ids(log):
+    """
+    每帧对应的电机CAN ID: 发出的帧在仲裁ID低8位, 电机的应答在8~15位。
+    """
+    tx = (log["flags"] & FLAG_TX) != 0
+    return np.where(tx, log["arb"] & 0xFF, (log["arb"] >> 8) & 0xFF)
+
+
+def select(log, motor_id=None, cmd_mode=None, tx=None, start=None, end=None):
+    """
+    按条件筛选帧。
+
+    参数:
+    log: open_log() 的结果或 FRAME_DTYPE 数组。
+    motor_id: 电机CAN ID。
+    cmd_mode: 命令模式(CmdModes 的值)。
+    tx: True 只要发出的帧, False 只要收到的帧。
+    start, end: 时间戳范围(秒)。
+
+    返回:
+    满足条件的记录(副本)。
+    """
+    mask = np.ones(len(log), dtype=bool)
+    if motor_id is not None:
+        mask &= motor_ids(log) == motor_id
+    if cmd_mode is not None:
+        mask &= cmd_modes(log) == int(cmd_mode)
+    if tx is not None:
+        mask &= ((log["flags"] & FLAG_TX) != 0) == tx
+    if start is not None:
+        mask &= log["ts"] >= start
+    if end is not None:
+        mask &= log["ts"] < end
+    return log[mask]
+
+
+def to_message(record):
+    """
+    把一条记录转换为 can.Message。
+    """
+    flags = int(record["flags"])
+    dlc = int(record["dlc"])
+    return can.Message(
+        timestamp=float(record["ts"]),
+        arbitration_id=int(record["arb"]),
+        is_extended_id=bool(flags & FLAG_EXTENDED),
+        is_remote_frame=bool(flags & FLAG_REMOTE),
+        is_error_frame=bool(flags & FLAG_ERROR),
+        dlc=dlc,
+        data=bytes(record["data"][:dlc]),
+    )
+
+
+class FrameRecorder:
+    def __init__(self, path, buffer_size=4096, flush_interval=1.0):
+        """
+        创建帧日志文件(已存在则覆盖)。
+
+        参数:
+        path: 日志文件路径。
+        buffer_size: 内存缓冲的记录数, 满后整块写入文件。
+        flush_interval: 缓冲未满时最长多久写入一次(秒)。
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.frames = 0
+        self._buffer = np.zeros(buffer_size, dtype=FRAME_DTYPE)
+        self._count = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._dispatchers = []
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["record_size"] = FRAME_DTYPE.itemsize
+        header["created"] = time.time()
+        self._file = open(path, "wb")
+        self._file.write(header.tobytes())
+
+    def attach(self, bus):
+        """
+        记录总线上收到的所有帧以及本进程电机控制器发出的帧。
+
+        参数:
+        bus: CAN总线对象(与电机控制器共享其分发器)。
+        """
+        dispatcher = BusDispatcher.for_bus(bus)
+        dispatcher.add_listener(self.on_rx)
+        dispatcher.add_tx_listener(self.on_tx)
+        self._dispatchers.append(dispatcher)
+        return self
+
+    def detach(self):
+        """
+        从所有总线移除监听者。
+        """
+        for dispatcher in self._dispatchers:
+            for remove, listener in ((dispatcher.remove_listener, self.on_rx),
+                                     (dispatcher.remove_tx_listener, self.on_tx)):
+                try:
+                    remove(listener)
+                except ValueError:
+                    pass
+        self._dispatchers = []
+
+    def on_rx(self, msg):
+        self.record(msg, tx=False)
+
+    def on_tx(self, msg):
+        self.record(msg, tx=True)
+
+    def record(self, msg, tx=False):
+        """
+        追加一帧(线程安全; 接收线程和各发送线程都会调用)。
+
+        参数:
+        msg: can.Message。
+        tx: 是否为本进程发出的帧。
+        """
+        # 发送的帧没有时间戳, 使用当前时间
+        ts = msg.timestamp if msg.timestamp else time.time()
+        flags = ((FLAG_TX if tx else 0) | (FLAG_EXTENDED if msg.is_extended_id else 0)
+                 | (FLAG_REMOTE if msg.is_remote_frame else 0) | (FLAG_ERROR if msg.is_error_frame else 0))
+        data = bytes(msg.data)[:8]
+        with self._lock:
+            if self._file is None:
+                return
+            rec = self._buffer[self._count]
+            rec["ts"] = ts
+            rec["arb"] = msg.arbitration_id
+            rec["dlc"] = len(data)
+            rec["flags"] = flags
+            rec["data"] = np.frombuffer(data.ljust(8, b"\0"), dtype=np.uint8)
+            self._count += 1
+            self.frames += 1
+            if (self._count == len(self._buffer)
+                    or time.monotonic() - self._last_flush > self.flush_interval):
+                self._flush_locked()
+
+    def _flush_locked(self):
+        self._file.write(self._buffer[:self._count].tobytes())
+        self._file.flush()
+        self._count = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """
+        把缓冲中的记录写入文件。
+        """
+        with self._lock:
+            if self._file is not None:
+                self._flush_locked()
+
+    def close(self):
+        """
+        移除监听者, 写入剩余记录并关闭文件。
+        """
+        self.detach()
+        with self._lock:
+            if self._file is None:
+                return
+            self._flush_locked()
+            self._file.close()
+            self._file = None
+        logging.info(f"Recorded {self.frames} frames to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class FrameReplayer:
+    def __init__(self, log, bus, speed=1.0, tx_only=True, spin=0.0005):
+        """
+        初始化帧日志回放器。
+
+        参数:
+        log: 日志文件路径, 或 open_log()/select() 的结果。
+        bus: 回放用的CAN总线对象。
+        speed: 时间缩放倍数, 2.0 为两倍速; 为 0 时不等待, 尽快发出。
+        tx_only: 为 True 时只回放本进程发出的帧(重新驱动电机);
+                 为 False 时回放全部帧(例如在虚拟总线上重现电机的应答)。
+        spin: 截止时间前改为忙等的时间(秒)。
+        """
+        self.log = open_log(log) if isinstance(log, str) else log
+        self.bus = bus
+        self.speed = speed
+        self.tx_only = tx_only
+        self.spin = spin
+        self.sent = 0
+        self.late = 0  # 发出时已晚于截止时间超过 1 ms 的帧数
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        """
+        回放日志, 直到全部发完或调用 stop()。
+
+        返回:
+        发出的帧数。
+        """
+        log = self.log
+        if self.tx_only:
+            log = log[(log["flags"] & FLAG_TX) != 0]
+        if len(log) == 0:
+            return 0
+        # 相对第一帧的发送时间, 一次性算好
+        offsets = (log["ts"] - log["ts"][0]) / self.speed if self.speed else np.zeros(len(log))
+        self._stopped.clear()
+        start = time.perf_counter()
+        for i in range(len(log)):
+            if self._stopped.is_set():
+                break
+            deadline = start + offsets[i]
+            wait_until(deadline, self.spin)
+            if self.speed and time.perf_counter() - deadline > 0.001:
+                self.late += 1
+            try:
+                self.bus.send(to_message(log[i]))
+            except can.CanError as e:
+                logging.info(f"Failed to replay frame {i}: {e}")
+                continue
+            self.sent += 1
+        logging.info(f"Replayed {self.sent} frames in {time.perf_counter() - start:.2f} s "
+                     f"({self.late} late)")
+        return self.sent
+
+
+def summary(log):
+    """
+    统计日志: 帧数、时长以及每个(电机, 命令模式, 方向)的帧数。
+    """
+    if len(log) == 0:
+        return {"frames": 0, "duration": 0.0, "counts": {}}
+    keys = np.stack([motor_ids(log), cmd_modes(log), log["flags"] & FLAG_TX], axis=1)
+    unique, counts = np.unique(keys, axis=0, return_counts=True)
+    return {
+        "frames": len(log),
+        "duration": float(log["ts"][-1] - log["ts"][0]),
+        "counts": {(int(m), int(c), "tx" if d else "rx"): int(n) for (m, c, d), n in zip(unique, counts)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CyberGear binary frame log")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="record all frames seen on a bus")
+    rep = sub.add_parser("replay", help="replay a log onto a bus")
+    info = sub.add_parser("info", help="print a summary of a log")
+    for p in (rec, rep):
+        p.add_argument("--interface", default="pcan")
+        p.add_argument("--channel", default="PCAN_USBBUS1")
+        p.add_argument("--bitrate", type=int, default=1000000)
+    for p in (rec, rep, info):
+        p.add_argument("path")
+    rep.add_argument("--speed", type=float, default=1.0, help="time scale, 0 = as fast as possible")
+    rep.add_argument("--all", action="store_true", help="replay received frames too")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == "info":
+        for key, value in summary(open_log(args.path)).items():
+            print(f"{key}: {value}")
+        return
+    bus = can.Bus(interface=args.interface, channel=args.channel, bitrate=args.bitrate)
+    try:
+        if args.command == "record":
+            # 被动监听: 只有收到的帧(其他程序发出的命令也会被总线回读到)
+            with FrameRecorder(args.path).attach(bus) as recorder:
+                logging.info(f"Recording {args.interface}:{args.channel} to {args.path}, Ctrl+C to stop")
+                try:
+                    while True:
+                        time.sleep(1)
+                except KeyboardInterrupt:
+                    pass
+                logging.info(f"{recorder.frames} frames")
+        else:
+            FrameReplayer(args.path, bus, speed=args.speed, tx_only=not args.all).run()
+    finally:
+        release_bus(bus)
+        bus.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# 多电机批量命令：先把所有电机的命令帧连续发到总线上，再统一收集各电机的应答
+# 一次N轴设定的耗时接近一次总线往返，而不是N次
+import collections
+import logging
+import time
+import numpy as np
+
+# 单个电机的批量命令结果
+# feedback: parse_received_msg 的解析结果(电机CAN ID、位置、速度、力矩、温度), 超时则为 None
+MotorReply = collections.namedtuple("MotorReply", ["motor_id", "feedback", "timed_out"])
+
+
+class MotorGroup:
+    def __init__(self, motors):
+        """
+        初始化电机组。
+
+        参数:
+        motors: CANMotorController 列表, 顺序即关节顺序。
+        """
+        self.motors = list(motors)
+        # 按固定顺序加锁, 避免多个电机组同时操作重叠的电机时死锁
+        self._lock_order = sorted(self.motors, key=lambda m: (m.MOTOR_ID, id(m)))
+
+    def __len__(self):
+        return len(self.motors)
+
+    def __iter__(self):
+        return iter(self.motors)
+
+    def __getitem__(self, index):
+        return self.motors[index]
+
+    def snapshot(self):
+        """
+        返回所有关节的最新状态(只读内存, 不访问总线)。
+
+        返回:
+        形状为 (电机数, len(STATE_FIELDS)) 的 float64 数组, 列依次为
+        pos、vel、torque、temp、fault、last_seen; 从未收到反馈的电机为 NaN。
+        """
+        return np.array([motor.state.as_row() for motor in self.motors], dtype=np.float64)
+
+    def fan_out(self, frames, timeout=1.0, quiet=False):
+        """
+        向每个电机发送一帧并并发等待应答。
+
+        参数:
+        frames: 与 motors 等长的列表, 每项为 (cmd_mode, data2, data1), 为 None 则跳过该电机。
+        timeout: 从最后一帧发出起等待全部应答的超时时间(秒)。
+        quiet: 为 True 时不输出逐帧日志(高频控制循环使用)。
+
+        返回:
+        MotorReply 列表, 与 motors 顺序一致; 跳过的电机对应 None。
+        """
+        if len(frames) != len(self.motors):
+            raise ValueError(
+                f"Expected {len(self.motors)} frames, got {len(frames)}")
+        for motor in self._lock_order:
+            motor._lock.acquire()
+        try:
+            sent = []
+            for motor, frame in zip(self.motors, frames):
+                if frame is None:
+                    sent.append(False)
+                    continue
+                motor.discard_stale()  # 丢弃队列中的旧帧(不等待)
+                sent.append(motor.send_can_message(*frame))
+
+            # 各电机的应答并行到达各自的队列, 依次取出即可
+            deadline = time.monotonic() + timeout
+            replies = []
+            for motor, frame, ok in zip(self.motors, frames, sent):
+                if frame is None:
+                    replies.append(None)
+                    continue
+                data, arbitration_id = None, None
+                if ok:
+                    data, arbitration_id = motor.receive_can_message(
+                        timeout=max(deadline - time.monotonic(), 0), cmd_mode=frame[0])
+                if data is None:
+                    replies.append(MotorReply(motor.MOTOR_ID, None, True))
+                elif quiet:
+                    replies.append(MotorReply(
+                        motor.MOTOR_ID, motor.decode_feedback(data, arbitration_id), False))
+                else:
+                    replies.append(MotorReply(
+                        motor.MOTOR_ID, motor.parse_received_msg(data, arbitration_id), False))
+        finally:
+            for motor in self._lock_order:
+                motor._lock.release()
+
+        timed_out = [r.motor_id for r in replies if r is not None and r.timed_out]
+        if timed_out and not quiet:
+            logging.info(f"No reply within the timeout period from motors: {timed_out}")
+        return replies
+
+    def pipeline(self, frame_lists, timeout=1.0):
+        """
+        向每个电机连续发送多帧(各电机的帧交错发出)而不等待逐帧应答, 再按发送顺序收集应答。
+        电机按收到的顺序处理命令, 所以同一电机的命令顺序不变。
+
+        参数:
+        frame_lists: 与 motors 等长的列表, 每项为该电机的 (cmd_mode, data2, data1) 列表。
+        timeout: 从最后一帧发出起等待全部应答的超时时间(秒)。
+
+        返回:
+        与 motors 等长的列表, 每项为与帧一一对应的 (data, arbitration_id) 列表, 超时为 (None, None)。
+        """
+        if len(frame_lists) != len(self.motors):
+            raise ValueError(
+                f"Expected {len(self.motors)} frame lists, got {len(frame_lists)}")
+        for motor in self._lock_order:
+            motor._lock.acquire()
+        try:
+            for motor in self.motors:
+                motor.discard_stale()
+            sent = [[] for _ in self.motors]
+            for i in range(max((len(frames) for frames in frame_lists), default=0)):
+                for motor, frames, ok in zip(self.motors, frame_lists, sent):
+                    if i < len(frames):
+                        ok.append(motor.send_can_message(*frames[i]))
+
+            # 读取应答不按索引匹配: 丢失一帧时不会连带跳过后续的应答, 由调用方检查索引
+            deadline = time.monotonic() + timeout
+            replies = []
+            for motor, frames, ok in zip(self.motors, frame_lists, sent):
+                motor_replies = []
+                for frame, frame_sent in zip(frames, ok):
+                    if not frame_sent:
+                        motor_replies.append((None, None))
+                        continue
+                    motor_replies.append(motor.receive_can_message(
+                        timeout=max(deadline - time.monotonic(), 0), cmd_mode=frame[0]))
+                replies.append(motor_replies)
+        finally:
+            for motor in self._lock_order:
+                motor._lock.release()
+        return replies
+
+    def write_all(self, param_name, values, timeout=1.0, force=False, quiet=False):
+        """
+        为每个电机写入同一参数的不同值(例如各关节的 loc_ref); 与设备上已确认的值相同的电机跳过。
+
+        参数:
+        param_name: 参数名称。
+        values: 与 motors 等长的值列表, 为 None 的项跳过。
+        timeout: 等待全部应答的超时时间(秒)。
+        force: 为 True 时忽略写直达缓存, 总是写入。
+        quiet: 为 True 时不输出逐帧日志(高频循环使用)。
+
+        返回:
+        MotorReply 列表; 因缓存跳过的电机返回其缓存的最新状态。
+        """
+        if len(values) != len(self.motors):
+            raise ValueError(
+                f"Expected {len(self.motors)} values, got {len(values)}")
+        if param_name not in self.motors[0].PARAMETERS:
+            logging.info(f"Unknown parameter name: {param_name}")
+            return [None] * len(self.motors)
+        frames = []
+        cached = {}
+        for i, (motor, value) in enumerate(zip(self.motors, values)):
+            if value is None:
+                frames.append(None)
+            elif motor.skip_redundant_write(param_name, value, force=force):
+                frames.append(None)
+                cached[i] = MotorReply(motor.MOTOR_ID, motor.cached_feedback(), False)
+            else:
+                frames.append(motor.single_param_frame(param_name, value))
+        replies = self.fan_out(frames, timeout=timeout, quiet=quiet)
+        for i, (motor, value, reply) in enumerate(zip(self.motors, values, replies)):
+            if reply is not None:
+                codec = motor.PARAMETERS[param_name]["codec"]
+                motor.registers.confirm_write(param_name, value, codec, not reply.timed_out)
+            elif i in cached:
+                replies[i] = cached[i]
+        return replies
+
+    def set_run_mode_all(self, mode, timeout=1.0):
+        """
+        将所有电机设置为同一运行模式。
+
+        参数:
+        mode: RunModes 枚举的一个实例。
+        """
+        if not isinstance(mode, self.motors[0].RunModes):
+            raise ValueError(
+                f"Invalid mode: {mode}. Must be an instance of RunModes enum.")
+        return self.write_all("run_mode", [mode.value] * len(self.motors), timeout=timeout)
+
+    def cache_stats(self):
+        """
+        返回每个电机参数缓存的命中统计。
+
+        返回:
+        电机CAN ID -> ShadowRegisters.stats() 的字典。
+        """
+        return {m.MOTOR_ID: m.registers.stats() for m in self.motors}
+
+    def enable_all(self, timeout=1.0):
+        """
+        使能所有电机。
+        """
+        frames = [(m.CmdModes.MOTOR_ENABLE, m.MAIN_CAN_ID, []) for m in self.motors]
+        return self.fan_out(frames, timeout=timeout)
+
+    def disable_all(self, timeout=1.0):
+        """
+        停止所有电机。
+        """
+        for m in self.motors:
+            m.invalidate_param_cache()  # 停止后设备上的参数状态不再可信
+        frames = [
+            (m.CmdModes.MOTOR_STOP, m.MAIN_CAN_ID, [0, 0, 0, 0, 0, 0, 0, 0])
+            for m in self.motors
+        ]
+        return self.fan_out(frames, timeout=timeout)
+
+    def control_all(self, setpoints, timeout=1.0, quiet=False):
+        """
+        运控模式下向每个电机发送控制指令。
+
+        参数:
+        setpoints: 与 motors 等长的列表, 每项为 (torque, target_angle, target_velocity, Kp, Kd),
+                   为 None 的项跳过。
+        timeout: 等待全部应答的超时时间(秒)。
+        quiet: 为 True 时不输出逐帧日志。
+
+        返回:
+        MotorReply 列表。
+        """
+        if len(setpoints) != len(self.motors):
+            raise ValueError(
+                f"Expected {len(self.motors)} setpoints, got {len(setpoints)}")
+        frames = [
+            None if sp is None else motor.motor_control_frame(*sp)
+            for motor, sp in zip(self.motors, setpoints)
+        ]
+        return self.fan_out(frames, timeout=timeout, quiet=quiet)
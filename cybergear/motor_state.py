@@ -0,0 +1,71 @@
+# 电机实时状态缓存：每收到一帧反馈就生成一条带时间戳的 MotorState 记录
+# 读取状态只访问内存，不占用总线
+import time
+
+# MotorGroup.snapshot() 返回数组的列顺序
+STATE_FIELDS = ("pos", "vel", "torque", "temp", "fault", "last_seen")
+
+# 反馈帧仲裁ID中的故障位(bit16 ~ bit21)和模式状态(bit22 ~ bit23)
+FAULT_UNDERVOLTAGE = 1 << 0
+FAULT_OVERCURRENT = 1 << 1
+FAULT_OVERTEMP = 1 << 2
+FAULT_ENCODER = 1 << 3
+FAULT_HALL = 1 << 4
+FAULT_UNCALIBRATED = 1 << 5
+
+
+class MotorState:
+    """
+    一帧反馈对应的电机状态, 生成后不再修改(更新时整体替换), 读取方拿到的总是一致的记录。
+    """
+
+    __slots__ = ("motor_id", "pos", "vel", "torque", "temp", "fault", "mode", "last_seen")
+
+    def __init__(self, motor_id, pos=None, vel=None, torque=None, temp=None,
+                 fault=0, mode=0, last_seen=None):
+        self.motor_id = motor_id
+        self.pos = pos  # 位置(rad)
+        self.vel = vel  # 速度(rad/s)
+        self.torque = torque  # 力矩(Nm)
+        self.temp = temp  # 温度(摄氏度)
+        self.fault = fault  # 故障位, 见 FAULT_* 常量
+        self.mode = mode  # 模式状态: 0 复位, 1 标定, 2 运行
+        self.last_seen = last_seen  # 收到该帧时的 time.monotonic(), 从未收到为 None
+
+    @classmethod
+    def from_feedback(cls, arbitration_id, motor_can_id, pos, vel, torque, temp):
+        """
+        由解码后的反馈帧生成状态记录。
+
+        参数:
+        arbitration_id: 反馈帧的仲裁ID(用于提取故障位和模式状态)。
+        其余参数为 decode_feedback 的返回值。
+        """
+        return cls(
+            motor_can_id, pos, vel, torque, temp,
+            fault=(arbitration_id >> 16) & 0x3F,
+            mode=(arbitration_id >> 22) & 0x03,
+            last_seen=time.monotonic(),
+        )
+
+    @property
+    def age(self):
+        """
+        距离最后一次收到反馈的时间(秒), 从未收到为 None。
+        """
+        if self.last_seen is None:
+            return None
+        return time.monotonic() - self.last_seen
+
+    def as_row(self):
+        """
+        按 STATE_FIELDS 的顺序返回数值(未收到反馈的字段为 NaN)。
+        """
+        nan = float("nan")
+        return tuple(nan if v is None else float(v) for v in (
+            self.pos, self.vel, self.torque, self.temp, self.fault, self.last_seen))
+
+    def __repr__(self):
+        return (f"MotorState(motor_id={self.motor_id}, pos={self.pos}, vel={self.vel}, "
+                f"torque={self.torque}, temp={self.temp}, fault={self.fault:#x}, "
+                f"mode={self.mode}, last_seen={self.last_seen})")
@@ -0,0 +1,188 @@
+# 跨多个CAN适配器(通道)的电机组：按电机所在的总线分成若干 MotorGroup，每个通道一个发送线程并行下发，
+# 接收仍由各总线自己的分发器线程完成；对调用方呈现一个统一的关节向量，并统计每个通道的负载
+import concurrent.futures
+import threading
+import time
+import numpy as np
+from motor_group import MotorGroup
+from bus_planner import frame_bits
+from can_dispatcher import channel_name
+
+
+class ChannelStats:
+    def __init__(self, name, bitrate):
+        """
+        单个通道的负载统计。
+
+        参数:
+        name: 通道名称。
+        bitrate: 总线波特率(bit/s)。
+        """
+        self.name = name
+        self.bitrate = bitrate
+        self.tx_frames = 0
+        self.rx_frames = 0
+        self.bits = 0  # 收发帧占用的总线位数(按最坏情况位填充估算)
+        self.busy_time = 0.0  # 发送线程执行命令的累计时间(秒)
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def on_rx(self, msg):
+        # 作为分发器的监听者, 在接收线程中调用
+        with self._lock:
+            self.rx_frames += 1
+            self.bits += frame_bits(len(msg.data))
+
+    def on_tx(self, msg):
+        # 作为分发器的发送监听者, 在发送线程中调用; 只统计实际发出的帧, 被写缓存跳过的写入不计入
+        with self._lock:
+            self.tx_frames += 1
+            self.bits += frame_bits(len(msg.data))
+
+    def on_busy(self, busy_time):
+        with self._lock:
+            self.busy_time += busy_time
+
+    def summary(self):
+        """
+        返回统计结果。
+
+        返回:
+        dict, load 为总线负载率估算值, busy 为发送线程的忙碌比例。
+        """
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "channel": self.name,
+            "tx_frames": self.tx_frames,
+            "rx_frames": self.rx_frames,
+            "frames_per_s": (self.tx_frames + self.rx_frames) / elapsed,
+            "load": self.bits / (self.bitrate * elapsed),
+            "busy": self.busy_time / elapsed,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.tx_frames = self.rx_frames = self.bits = 0
+            self.busy_time = 0.0
+            self.started = time.monotonic()
+
+
+class MultiBusGroup:
+    def __init__(self, motors, bitrate=1000000):
+        """
+        初始化跨通道电机组。
+
+        参数:
+        motors: CANMotorController 列表, 顺序即关节顺序, 可分布在多条总线上。
+        bitrate: 各总线的波特率(bit/s), 用于估算负载。
+        """
+        self.motors = list(motors)
+        self.channels = []  # [(MotorGroup, 关节下标列表, ChannelStats, 发送线程池)]
+        by_bus = {}
+        for joint, motor in enumerate(self.motors):
+            by_bus.setdefault(id(motor.bus), []).append(joint)
+        for joints in by_bus.values():
+            bus = self.motors[joints[0]].bus
+            name = channel_name(bus)
+            stats = ChannelStats(name, bitrate)
+            dispatcher = self.motors[joints[0]].dispatcher
+            dispatcher.add_listener(stats.on_rx)
+            dispatcher.add_tx_listener(stats.on_tx)
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"MultiBusGroup TX {name}")
+            self.channels.append(
+                (MotorGroup([self.motors[j] for j in joints]), joints, stats, executor))
+
+    def __len__(self):
+        return len(self.motors)
+
+    def __iter__(self):
+        return iter(self.motors)
+
+    def __getitem__(self, index):
+        return self.motors[index]
+
+    def _run(self, method, per_joint=None, per_joint_arg=None, **kwargs):
+        # 把关节向量(作为 per_joint_arg 参数)按通道拆分, 各通道的发送线程并行执行 MotorGroup 的方法,
+        # 结果按关节顺序合并
+        def task(group, joints, stats):
+            args = dict(kwargs)
+            if per_joint is not None:
+                args[per_joint_arg] = [per_joint[j] for j in joints]
+            t0 = time.perf_counter()
+            replies = getattr(group, method)(**args)
+            stats.on_busy(time.perf_counter() - t0)
+            return replies
+
+        if per_joint is not None and len(per_joint) != len(self.motors):
+            raise ValueError(f"Expected {len(self.motors)} values, got {len(per_joint)}")
+        futures = [executor.submit(task, group, joints, stats)
+                   for group, joints, stats, executor in self.channels]
+        result = [None] * len(self.motors)
+        for (_, joints, _, _), future in zip(self.channels, futures):
+            for joint, reply in zip(joints, future.result()):
+                result[joint] = reply
+        return result
+
+    def write_all(self, param_name, values, timeout=1.0, force=False):
+        """
+        为每个关节写入同一参数的不同值, 见 MotorGroup.write_all。
+        """
+        return self._run("write_all", values, "values", param_name=param_name,
+                         timeout=timeout, force=force)
+
+    def control_all(self, setpoints, timeout=1.0, quiet=False):
+        """
+        运控模式下向每个关节发送控制指令, 见 MotorGroup.control_all。
+        """
+        return self._run("control_all", setpoints, "setpoints", timeout=timeout, quiet=quiet)
+
+    def set_run_mode_all(self, mode, timeout=1.0):
+        """
+        将所有电机设置为同一运行模式。
+        """
+        return self._run("set_run_mode_all", mode=mode, timeout=timeout)
+
+    def enable_all(self, timeout=1.0):
+        """
+        使能所有电机。
+        """
+        return self._run("enable_all", timeout=timeout)
+
+    def disable_all(self, timeout=1.0):
+        """
+        停止所有电机。
+        """
+        return self._run("disable_all", timeout=timeout)
+
+    def snapshot(self):
+        """
+        返回所有关节的最新状态, 见 MotorGroup.snapshot。
+        """
+        return np.array([motor.state.as_row() for motor in self.motors], dtype=np.float64)
+
+    def channel_stats(self):
+        """
+        返回每个通道的负载统计。
+
+        返回:
+        ChannelStats.summary() 的列表。
+        """
+        return [stats.summary() for _, _, stats, _ in self.channels]
+
+    def reset_stats(self):
+        for _, _, stats, _ in self.channels:
+            stats.reset()
+
+    def close(self):
+        """
+        停止各通道的发送线程并移除负载统计的监听者(应在 release_bus 之前调用)。
+        """
+        for group, _, stats, executor in self.channels:
+            executor.shutdown(wait=True)
+            for remove, listener in ((group[0].dispatcher.remove_listener, stats.on_rx),
+                                     (group[0].dispatcher.remove_tx_listener, stats.on_tx)):
+                try:
+                    remove(listener)
+                except ValueError:
+                    pass
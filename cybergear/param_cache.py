@@ -0,0 +1,127 @@
+# 参数影子寄存器：按参数名缓存从电机读回(或确认写入)的值及时间戳
+# 在有效期内重复读取 run_mode、limit_spd 等参数时直接返回本地值，不再访问总线；
+# 写入时若设备上已确认的值与请求值一致，则跳过该帧(写直达缓存)
+import threading
+import time
+
+
+class ShadowRegisters:
+    def __init__(self, ttl=None):
+        """
+        初始化影子寄存器。
+
+        参数:
+        ttl: 缓存有效期(秒), 为 None 表示缓存值一直有效(直到被失效)。
+        """
+        self.ttl = ttl
+        self.hits = 0  # 无需访问总线的读取/写入次数
+        self.misses = 0  # 需要访问总线的读取/写入次数
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def record(self, hit):
+        """
+        记录一次缓存命中或未命中。
+        """
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self):
+        """
+        返回命中统计。
+
+        返回:
+        包含 hits、misses、hit_rate 的字典。
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def get(self, name, max_age=None):
+        """
+        读取缓存值。
+
+        参数:
+        name: 参数名称。
+        max_age: 可接受的最大缓存年龄(秒), 为 None 时使用 ttl。
+
+        返回:
+        (命中与否, 值) 元组; 未命中或已过期时为 (False, None)。
+        """
+        if max_age is None:
+            max_age = self.ttl
+        entry = self._values.get(name)
+        if entry is None:
+            return False, None
+        value, timestamp = entry
+        if max_age is not None and time.monotonic() - timestamp > max_age:
+            return False, None
+        return True, value
+
+    def put(self, name, value):
+        """
+        写入缓存值并记录当前时间。
+
+        参数:
+        name: 参数名称。
+        value: 参数值。
+        """
+        with self._lock:
+            self._values[name] = (value, time.monotonic())
+
+    def timestamp(self, name):
+        """
+        返回缓存值的时间戳(time.monotonic()), 无缓存为 None。
+        """
+        entry = self._values.get(name)
+        return None if entry is None else entry[1]
+
+    def invalidate(self, *names):
+        """
+        使缓存失效。
+
+        参数:
+        names: 要失效的参数名称, 不指定则清空全部缓存。
+        """
+        with self._lock:
+            if not names:
+                self._values.clear()
+            for name in names:
+                self._values.pop(name, None)
+
+    def check_write(self, name, value, codec):
+        """
+        判断写入是否多余(设备上已确认的值编码后与请求值完全一致), 并记录命中统计。
+
+        参数:
+        name: 参数名称。
+        value: 请求写入的值。
+        codec: 参数的编解码器(按编码后的字节比较, 避免浮点精度差异)。
+
+        返回:
+        多余返回 True, 需要写入返回 False。
+        """
+        hit, cached = self.get(name)
+        redundant = hit and codec.encode(cached) == codec.encode(value)
+        self.record(redundant)
+        return redundant
+
+    def confirm_write(self, name, value, codec, confirmed):
+        """
+        根据写入结果更新缓存: 收到应答则记录设备上的值, 否则使缓存失效。
+
+        参数:
+        name: 参数名称。
+        value: 写入的值。
+        codec: 参数的编解码器。
+        confirmed: 是否收到应答。
+        """
+        if confirmed:
+            self.put(name, codec.decode(codec.encode(value))[0])
+        else:
+            self.invalidate(name)
@@ -5,38 +5,68 @@ import can
 import logging
 import enum
 import math
+import queue
+import threading
+import time
+from can_codec import compile_format, INDEX_STRUCT, FEATURE_STRUCT
+from can_dispatcher import BusDispatcher
+from motor_state import MotorState
+from param_cache import ShadowRegisters
+
+# 参数表类型码: 类型 -> (类型码, 格式描述)
+PARAM_TABLE_TYPES = {
+    "float": (0x06, "f"),
+    "int16": (0x03, "s16"),
+    "int32": (0x04, "s32"),
+}
+
+
+def _param_table_entry(feature_code, type):
+    type_code, format = PARAM_TABLE_TYPES[type]
+    return {
+        "feature_code": feature_code,
+        "type": type,
+        "type_code": type_code,
+        "codec": compile_format(format),
+    }
+
+
+def _param_entry(index, format):
+    return {"index": index, "format": format, "codec": compile_format(format)}
 
 
 class CANMotorController:
     PARAM_TABLE = {
-        "motorOverTemp": {"feature_code": 0x200D, "type": "int16"},
-        "overTempTime": {"feature_code": 0x200E, "type": "int32"},
-        "limit_torque": {"feature_code": 0x2007, "type": "float"},
-        "cur_kp": {"feature_code": 0x2012, "type": "float"},
-        "cur_ki": {"feature_code": 0x2013, "type": "float"},
-        "spd_kp": {"feature_code": 0x2014, "type": "float"},
-        "spd_ki": {"feature_code": 0x2015, "type": "float"},
-        "loc_kp": {"feature_code": 0x2016, "type": "float"},
-        "spd_filt_gain": {"feature_code": 0x2017, "type": "float"},
-        "limit_spd": {"feature_code": 0x2018, "type": "float"},
-        "limit_cur": {"feature_code": 0x2019, "type": "float"},
+        "motorOverTemp": _param_table_entry(0x200D, "int16"),
+        "overTempTime": _param_table_entry(0x200E, "int32"),
+        "limit_torque": _param_table_entry(0x2007, "float"),
+        "cur_kp": _param_table_entry(0x2012, "float"),
+        "cur_ki": _param_table_entry(0x2013, "float"),
+        "spd_kp": _param_table_entry(0x2014, "float"),
+        "spd_ki": _param_table_entry(0x2015, "float"),
+        "loc_kp": _param_table_entry(0x2016, "float"),
+        "spd_filt_gain": _param_table_entry(0x2017, "float"),
+        "limit_spd": _param_table_entry(0x2018, "float"),
+        "limit_cur": _param_table_entry(0x2019, "float"),
     }
 
     PARAMETERS = {
-        "run_mode": {"index": 0x7005, "format": "u8"},
-        "iq_ref": {"index": 0x7006, "format": "f"},
-        "spd_ref": {"index": 0x700A, "format": "f"},
-        "limit_torque": {"index": 0x700B, "format": "f"},
-        "cur_kp": {"index": 0x7010, "format": "f"},
-        "cur_ki": {"index": 0x7011, "format": "f"},
-        "cur_filt_gain": {"index": 0x7014, "format": "f"},
-        "loc_ref": {"index": 0x7016, "format": "f"},
-        "limit_spd": {"index": 0x7017, "format": "f"},
-        "limit_cur": {"index": 0x7018, "format": "f"},
+        "run_mode": _param_entry(0x7005, "u8"),
+        "iq_ref": _param_entry(0x7006, "f"),
+        "spd_ref": _param_entry(0x700A, "f"),
+        "limit_torque": _param_entry(0x700B, "f"),
+        "cur_kp": _param_entry(0x7010, "f"),
+        "cur_ki": _param_entry(0x7011, "f"),
+        "cur_filt_gain": _param_entry(0x7014, "f"),
+        "loc_ref": _param_entry(0x7016, "f"),
+        "limit_spd": _param_entry(0x7017, "f"),
+        "limit_cur": _param_entry(0x7018, "f"),
     }
+    # 参数索引 -> 参数名称
+    PARAMETER_NAMES = {info["index"]: name for name, info in PARAMETERS.items()}
     TWO_BYTES_BITS = 16
 
-    def __init__(self, bus, motor_id=127, main_can_id=254):
+    def __init__(self, bus, motor_id=127, main_can_id=254, param_ttl=None):
         """
         初始化CAN电机控制器。
 
@@ -44,6 +74,7 @@ class CANMotorController:
         bus: CAN总线对象。
         motor_id: 电机的CAN ID。
         main_can_id: 主CAN ID。
+        param_ttl: 参数影子寄存器的缓存有效期(秒), 为 None 表示一直有效。
         """
         self.bus = bus
         self.MOTOR_ID = motor_id
@@ -56,6 +87,23 @@ class CANMotorController:
         self.T_MAX = 12.0
         self.KP_MIN, self.KP_MAX = 0.0, 500.0  # 0.0 ~ 500.0
         self.KD_MIN, self.KD_MAX = 0.0, 5.0  # 0.0 ~ 5.0
+        # 最新的电机状态, 每收到一帧反馈整体替换
+        self._state = MotorState(motor_id)
+        # 参数影子寄存器, 重复读取参数时优先返回本地值, 写入与设备上已确认的值相同时跳过
+        self.registers = ShadowRegisters(ttl=param_ttl)
+        # 参数表的写直达缓存(参数表无法读回, 只记录确认写入的值)
+        self.table_registers = ShadowRegisters(ttl=param_ttl)
+        self._attach_bus()
+
+    def _attach_bus(self):
+        """
+        接入总线的接收分发器(异步控制器会覆盖此方法)。
+        """
+        # 同一总线上的电机共享一个后台接收线程, 应答帧按电机CAN ID投递到各自的队列
+        self.dispatcher = BusDispatcher.for_bus(self.bus)
+        self._rx_queue = self.dispatcher.register(self.MOTOR_ID, on_frame=self._update_state)
+        # 同一电机的收发事务串行执行, 不同电机之间互不阻塞
+        self._lock = threading.Lock()
 
     # 通信类型
     class CmdModes:
@@ -70,7 +118,19 @@ class CANMotorController:
         SINGLE_PARAM_READ = 17
         SINGLE_PARAM_WRITE = 18
         FAULT_FEEDBACK = 21
-    
+
+    # 命令类型 -> 期望的应答类型(None 表示接受该电机的任意应答)
+    REPLY_MODES = {
+        CmdModes.GET_DEVICE_ID: CmdModes.GET_DEVICE_ID,
+        CmdModes.MOTOR_CONTROL: CmdModes.MOTOR_FEEDBACK,
+        CmdModes.MOTOR_ENABLE: CmdModes.MOTOR_FEEDBACK,
+        CmdModes.MOTOR_STOP: CmdModes.MOTOR_FEEDBACK,
+        CmdModes.SET_MECHANICAL_ZERO: CmdModes.MOTOR_FEEDBACK,
+        CmdModes.PARAM_TABLE_WRITE: None,
+        CmdModes.SINGLE_PARAM_READ: CmdModes.SINGLE_PARAM_READ,
+        CmdModes.SINGLE_PARAM_WRITE: CmdModes.MOTOR_FEEDBACK,
+    }
+
     # 控制模式
     class RunModes(enum.Enum):
         CONTROL_MODE = 0 # 运控模式
@@ -78,6 +138,25 @@ class CANMotorController:
         SPEED_MODE = 2 # 速度模式
         CURRENT_MODE = 3 # 电流模式
 
+    def _update_state(self, msg):
+        """
+        收到本电机的帧时更新状态缓存(由分发器调用, 只处理反馈帧)。
+
+        参数:
+        msg: 收到的 can.Message。
+        """
+        if (msg.arbitration_id >> 24) & 0x1F != self.CmdModes.MOTOR_FEEDBACK or len(msg.data) < 8:
+            return
+        self._state = MotorState.from_feedback(
+            msg.arbitration_id, *self.decode_feedback(msg.data, msg.arbitration_id))
+
+    @property
+    def state(self):
+        """
+        最新的电机状态(MotorState), 只读内存, 不访问总线。
+        """
+        return self._state
+
     def _float_to_uint(self, x, x_min, x_max, bits):
         """
         将浮点数转换为无符号整数。
@@ -138,7 +217,7 @@ class CANMotorController:
 
     def format_data(self, data=[], format="f f", type="decode"):
         """
-        对数据进行编码或解码。
+        对数据进行编码或解码(基于 can_codec 中预编译并缓存的编解码器)。
 
         参数:
         data: 输入的数据列表。
@@ -148,67 +227,15 @@ class CANMotorController:
         返回:
         编码或解码后的数据。
         """
-        format_list = format.split()
-        rdata = []
+        try:
+            codec = compile_format(format)
+        except ValueError as e:
+            logging.info(str(e))
+            return []
         if type == "decode":
-            p = 0
-            for f in format_list:
-                s_f = []
-                if f == "f":
-                    s_f = [4, "f"]
-                elif f == "u16":
-                    s_f = [2, "H"]
-                elif f == "s16":
-                    s_f = [2, "h"]
-                elif f == "u32":
-                    s_f = [4, "I"]
-                elif f == "s32":
-                    s_f = [4, "i"]
-                elif f == "u8":
-                    s_f = [1, "B"]
-                elif f == "s8":
-                    s_f = [1, "b"]
-                ba = bytearray()
-                if len(s_f) == 2:
-                    for i in range(s_f[0]):
-                        ba.append(data[p])
-                        p = p + 1
-                    rdata.append(struct.unpack(s_f[1], ba)[0])
-                else:
-                    logging.info("unknown format in format_data(): " + f)
-                    return []
-            return rdata
-        elif type == "encode" and len(format_list) == len(data):
-            for i in range(len(format_list)):
-                f = format_list[i]
-                s_f = []
-                if f == "f":
-                    s_f = [4, "f"]
-                elif f == "u16":
-                    s_f = [2, "H"]
-                elif f == "s16":
-                    s_f = [2, "h"]
-                elif f == "u32":
-                    s_f = [4, "I"]
-                elif f == "s32":
-                    s_f = [4, "i"]
-                elif f == "u8":
-                    s_f = [1, "B"]
-                elif f == "s8":
-                    s_f = [1, "b"]
-                if f != "f":
-                    data[i] = int(data[i])
-                if len(s_f) == 2:
-                    bs = struct.pack(s_f[1], data[i])
-                    for j in range(s_f[0]):
-                        rdata.append(bs[j])
-                else:
-                    logging.info("unkown format in format_data(): " + f)
-                    return []
-            if len(rdata) < 4:
-                for i in range(4 - len(rdata)):
-                    rdata.append(0x00)
-            return rdata
+            return list(codec.decode(data))
+        elif type == "encode" and len(format.split()) == len(data):
+            return list(codec.encode(*data))
 
     def pack_to_8bytes(self, target_angle, target_velocity, Kp, Kd):
         """
@@ -240,18 +267,17 @@ class CANMotorController:
         data1 = [b for b in data1_bytes]
         return data1
 
-    def send_receive_can_message(self, cmd_mode, data2, data1, timeout=200):
+    def send_can_message(self, cmd_mode, data2, data1):
         """
-        发送CAN消息并接收响应。
+        只发送CAN消息, 不等待响应(调用方需自行持有 self._lock)。
 
         参数:
         cmd_mode: 命令模式。
         data2: 数据区2。
         data1: 要发送的数据字节。
-        timeout: 发送消息的超时时间(默认为200ms)。
 
         返回:
-        一个元组, 包含接收到的消息数据和接收到的消息仲裁ID(如果有)。
+        发送成功返回 True, 否则返回 False。
         """
         # Calculate the arbitration ID
         arbitration_id = (cmd_mode << 24) | (data2 << 8) | self.MOTOR_ID
@@ -264,19 +290,98 @@ class CANMotorController:
             self.bus.send(message)
         except:
             logging.info("Failed to send the message.")
-            return None, None
+            return False
+        self.dispatcher.notify_tx(message)
 
         # Output details of the sent message
         logging.debug(
             f"Sent message with ID {hex(arbitration_id)}, data: {data1}")
+        return True
 
-        # Receive a CAN message with a 1-second timeout
-        # 1-second timeout for receiving
-        received_msg = self.bus.recv(timeout=1)
-        if received_msg:
-            return received_msg.data, received_msg.arbitration_id
-        else:
-            return None, None
+    def receive_can_message(self, timeout=1, cmd_mode=None, index=None):
+        """
+        从本电机的接收队列中取出与请求匹配的应答, 不匹配的旧帧直接跳过。
+
+        参数:
+        timeout: 接收超时时间(秒)。
+        cmd_mode: 请求的命令模式, 用于确定期望的应答类型(为 None 则接受任意帧)。
+        index: 期望应答中携带的参数索引(仅单参数读取的应答包含索引)。
+
+        返回:
+        一个元组, 包含接收到的消息数据和接收到的消息仲裁ID(超时则为 None)。
+        """
+        expected_mode = self.REPLY_MODES.get(cmd_mode)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                received_msg = self._rx_queue.get(
+                    timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                return None, None
+            if self._match_reply(received_msg, expected_mode, index):
+                return received_msg.data, received_msg.arbitration_id
+
+    def _match_reply(self, msg, expected_mode, index=None):
+        """
+        判断收到的帧是否为期望的应答, 不匹配时记录并跳过。
+
+        参数:
+        msg: 收到的 can.Message。
+        expected_mode: 期望的应答类型(None 表示任意类型)。
+        index: 期望的参数索引(None 表示不检查)。
+
+        返回:
+        匹配返回 True, 否则返回 False。
+        """
+        reply_mode = (msg.arbitration_id >> 24) & 0x1F
+        matched = expected_mode is None or reply_mode == expected_mode
+        if matched and index is not None:
+            matched = len(msg.data) >= 2 and msg.data[0] | (msg.data[1] << 8) == index
+        if not matched:
+            logging.debug(f"Skipped message with ID {hex(msg.arbitration_id)}")
+        return matched
+
+    def _reply_index(self, cmd_mode, data1):
+        """
+        返回应答中应携带的参数索引(仅单参数读取的应答包含索引)。
+        """
+        if cmd_mode == self.CmdModes.SINGLE_PARAM_READ:
+            return data1[0] | (data1[1] << 8)
+        return None
+
+    def discard_stale(self):
+        """
+        不等待地丢弃接收队列中已有的帧(它们不可能是本次请求的应答)。
+        """
+        while True:
+            try:
+                received_msg = self._rx_queue.get_nowait()
+            except queue.Empty:
+                return
+            logging.debug(
+                f"Discarded message with ID {hex(received_msg.arbitration_id)}")
+
+    def send_receive_can_message(self, cmd_mode, data2, data1, timeout=200, reply_timeout=1):
+        """
+        发送CAN消息并接收响应。
+
+        参数:
+        cmd_mode: 命令模式。
+        data2: 数据区2。
+        data1: 要发送的数据字节。
+        timeout: 发送消息的超时时间(默认为200ms)。
+        reply_timeout: 等待应答的超时时间(秒)。
+
+        返回:
+        一个元组, 包含接收到的消息数据和接收到的消息仲裁ID(如果有)。
+        """
+        index = self._reply_index(cmd_mode, data1)
+        with self._lock:
+            self.discard_stale()
+            if not self.send_can_message(cmd_mode, data2, data1):
+                return None, None
+            # Receive the matching reply (1-second timeout by default)
+            return self.receive_can_message(timeout=reply_timeout, cmd_mode=cmd_mode, index=index)
 
     def parse_received_msg(self, data, arbitration_id):
         """
@@ -291,22 +396,9 @@ class CANMotorController:
         """
         if data is not None:
             logging.debug(f"Received message with ID {hex(arbitration_id)}")
-            # 解析电机CAN ID
-            motor_can_id = (arbitration_id >> 8) & 0xFF
+            motor_can_id, pos, vel, torque, temperature_celsius = self.decode_feedback(
+                data, arbitration_id)
 
-            pos = self._uint_to_float(
-                (data[0] << 8) + data[1], self.P_MIN, self.P_MAX, self.TWO_BYTES_BITS
-            )
-            vel = self._uint_to_float(
-                (data[2] << 8) + data[3], self.V_MIN, self.V_MAX, self.TWO_BYTES_BITS
-            )
-            torque = self._uint_to_float(
-                (data[4] << 8) + data[5], self.T_MIN, self.T_MAX, self.TWO_BYTES_BITS
-            )
-            # 解析温度数据
-            temperature_raw = (data[6] << 8) + data[7]
-            temperature_celsius = temperature_raw / 10.0
-            
             logging.info(
                 f"Motor CAN ID: {motor_can_id}, pos: {pos:.2f} rad, vel: {vel:.2f} rad/s, "
                 f"torque: {torque:.2f} Nm, temperature: {temperature_celsius:.1f} °C"
@@ -317,21 +409,94 @@ class CANMotorController:
             logging.info("No message received within the timeout period.")
             return None, None, None, None, None
 
+    def decode_feedback(self, data, arbitration_id):
+        """
+        解码电机反馈帧(不输出日志, 供高频控制循环使用)。
+
+        参数:
+        data: 接收到的数据。
+        arbitration_id: 接收到的消息的仲裁ID。
+
+        返回:
+        一个元组, 包含电机的CAN ID、位置(rad)、速度(rad/s)、力矩(Nm)、温度(摄氏度)。
+        """
+        # 解析电机CAN ID
+        motor_can_id = (arbitration_id >> 8) & 0xFF
+
+        pos = self._uint_to_float(
+            (data[0] << 8) + data[1], self.P_MIN, self.P_MAX, self.TWO_BYTES_BITS
+        )
+        vel = self._uint_to_float(
+            (data[2] << 8) + data[3], self.V_MIN, self.V_MAX, self.TWO_BYTES_BITS
+        )
+        torque = self._uint_to_float(
+            (data[4] << 8) + data[5], self.T_MIN, self.T_MAX, self.TWO_BYTES_BITS
+        )
+        # 解析温度数据
+        temperature_raw = (data[6] << 8) + data[7]
+        temperature_celsius = temperature_raw / 10.0
+        return motor_can_id, pos, vel, torque, temperature_celsius
+
     def clear_can_rx(self, timeout=10):
         """
-        清除接收缓冲区中的所有现有消息。
+        清除本电机接收队列中的所有现有消息。
 
         参数:
         timeout: 等待清除操作的时间（单位：毫秒）。
         """
         timeout_seconds = timeout / 1000.0  # Convert to seconds
         while True:
-            received_msg = self.bus.recv(timeout=timeout_seconds)
-            if received_msg is None:
+            try:
+                received_msg = self._rx_queue.get(timeout=timeout_seconds)
+            except queue.Empty:
                 break
             logging.info(
                 f"Cleared message with ID {hex(received_msg.arbitration_id)}")
 
+    def single_param_frame(self, param_name, value):
+        """
+        构造单参数写入帧, 供 MotorGroup 等批量发送使用。
+
+        参数:
+        param_name: 参数名称。
+        value: 要设置的值。
+
+        返回:
+        (cmd_mode, data2, data1) 元组; 参数名称未知时返回 None。
+        """
+        param_info = self.PARAMETERS.get(param_name)
+        if param_info is None:
+            logging.info(f"Unknown parameter name: {param_name}")
+            return None
+        return (
+            self.CmdModes.SINGLE_PARAM_WRITE,
+            self.MAIN_CAN_ID,
+            INDEX_STRUCT.pack(param_info["index"]) + param_info["codec"].encode(value),
+        )
+
+    def param_table_frame(self, param_name, value):
+        """
+        构造参数表写入帧。
+
+        参数:
+        param_name: 参数名称。
+        value: 要设置的值。
+
+        返回:
+        (cmd_mode, data2, data1) 元组; 参数名称未知时返回 None。
+        """
+        # Get the parameter info from PARAM_TABLE
+        param_info = self.PARAM_TABLE.get(param_name)
+        if param_info is None:
+            logging.info(f"Unknown parameter name: {param_name}")
+            return None
+
+        # Construct data1: feature code, type code, reserved byte, encoded value
+        data1 = FEATURE_STRUCT.pack(
+            param_info["feature_code"], param_info["type_code"], 0x00
+        ) + param_info["codec"].encode(value)
+        return self.CmdModes.PARAM_TABLE_WRITE, self.MAIN_CAN_ID, data1
+
     def _write_single_param(self, index, value, format="u32"):
         """
         写入单个参数。
@@ -344,11 +509,9 @@ class CANMotorController:
         返回:
         解析后的接收消息。
         """
-        encoded_data = self.format_data(
-            data=[value], format=format, type="encode")
-        data1 = [b for b in struct.pack("<I", index)] + encoded_data
-
-        self.clear_can_rx()  # 空CAN接收缓存, 避免读到老数据
+        data1 = INDEX_STRUCT.pack(index) + compile_format(format).encode(value)
+        # 写入后影子寄存器中的旧值不再可信
+        self.registers.invalidate(self.PARAMETER_NAMES.get(index))
 
         received_msg_data, received_msg_arbitration_id = self.send_receive_can_message(
             cmd_mode=self.CmdModes.SINGLE_PARAM_WRITE,
@@ -357,87 +520,201 @@ class CANMotorController:
         )
         return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
 
-    def write_single_param(self, param_name, value):
+    def write_single_param(self, param_name, value, force=False):
         """
-        通过参数名称写入单个参数。
+        通过参数名称写入单个参数; 设备上已确认的值与请求值相同时跳过写入。
 
         参数:
         param_name: 参数名称。
         value: 要设置的值。
+        force: 为 True 时忽略缓存, 总是写入。
 
         返回:
-        写入操作的结果。
+        写入操作的结果(跳过写入时为缓存的最新状态)。
         """
         param_info = self.PARAMETERS.get(param_name)
         if param_info is None:
             logging.info(f"Unknown parameter name: {param_name}")
             return
 
-        index = param_info["index"]
-        format = param_info["format"]
+        if self.skip_redundant_write(param_name, value, force=force):
+            return self.cached_feedback()
 
-        return self._write_single_param(index=index, value=value, format=format)
+        received_msg_data, received_msg_arbitration_id = self.send_receive_can_message(
+            *self.single_param_frame(param_name, value))
+        self.registers.confirm_write(
+            param_name, value, param_info["codec"], received_msg_data is not None)
+        return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
 
-    def write_param_table(self, param_name, value):
+    def skip_redundant_write(self, param_name, value, force=False):
         """
-        写入参数表。
+        判断单参数写入能否跳过; 需要写入且为运行模式切换时, 使其余参数的缓存失效。
 
         参数:
         param_name: 参数名称。
         value: 要设置的值。
+        force: 为 True 时总是需要写入。
 
         返回:
-        接收到的消息数据和仲裁ID。
+        可以跳过返回 True。
+        """
+        codec = self.PARAMETERS[param_name]["codec"]
+        if not force and self.registers.check_write(param_name, value, codec):
+            logging.debug(f"Skipped redundant write of {param_name}={value}")
+            return True
+        if force:
+            self.registers.record(False)
+        if param_name == "run_mode":
+            self.registers.invalidate()
+        else:
+            self.registers.invalidate(param_name)
+        return False
+
+    def cached_feedback(self):
         """
-        # Get the parameter info from PARAM_TABLE
-        param_info = self.PARAM_TABLE.get(param_name)
+        以 parse_received_msg 的格式返回缓存的最新状态(不访问总线);
+        尚未收到过反馈帧时除电机ID外均为 None。
+        """
+        state = self._state
+        return state.motor_id, state.pos, state.vel, state.torque, state.temp
+
+    def read_param_frame(self, param_name):
+        """
+        构造单参数读取帧。
+
+        参数:
+        param_name: 参数名称。
+
+        返回:
+        (cmd_mode, data2, data1) 元组; 参数名称未知时返回 None。
+        """
+        param_info = self.PARAMETERS.get(param_name)
         if param_info is None:
             logging.info(f"Unknown parameter name: {param_name}")
-            return None, None, None
-
-        feature_code = param_info["feature_code"]
-        param_type = param_info["type"]
-
-        # Type code mapping
-        type_code_mapping = {
-            "float": 0x06,
-            "int16": 0x03,
-            "int32": 0x04,
-        }
-
-        type_code = type_code_mapping.get(param_type)
-        if type_code is None:
-            logging.info(f"Unknown parameter type: {param_type}")
-            return None, None, None
-
-        # Encode the value based on the type
-        format_mapping = {
-            "float": "f",
-            "int16": "s16",
-            "int32": "s32",
-        }
-
-        format = format_mapping.get(param_type)
-        encoded_value = self.format_data(
-            data=[value], format=format, type="encode")
-
-        # Construct data1
-        data1 = [b for b in struct.pack("<H", feature_code)]
-        data1.extend([type_code, 0x00])
-        data1.extend(encoded_value)
-
-        # Clear the CAN receive buffer
-        self.clear_can_rx()
+            return None
+        return (
+            self.CmdModes.SINGLE_PARAM_READ,
+            self.MAIN_CAN_ID,
+            INDEX_STRUCT.pack(param_info["index"]) + bytes(4),
+        )
+
+    def read_single_param(self, param_name, max_age=None):
+        """
+        读取单个参数, 影子寄存器中的值未过期时不访问总线。
+
+        参数:
+        param_name: 参数名称。
+        max_age: 可接受的最大缓存年龄(秒), 为 None 时使用 param_ttl, 为 0 时强制读取。
+
+        返回:
+        参数值; 参数名称未知或超时返回 None。
+        """
+        return self.read_params([param_name], max_age=max_age).get(param_name)
+
+    def read_params(self, param_names, max_age=None, timeout=1):
+        """
+        批量读取参数: 先连续发出所有过期参数的读取请求, 再按参数索引匹配应答。
+
+        参数:
+        param_names: 参数名称列表。
+        max_age: 可接受的最大缓存年龄(秒), 为 None 时使用 param_ttl, 为 0 时强制读取。
+        timeout: 等待全部应答的超时时间(秒)。
+
+        返回:
+        参数名称 -> 参数值 的字典; 超时的参数值为 None, 未知的参数名称不包含在内。
+        """
+        values = {}
+        pending = {}  # 参数索引 -> 参数名称
+        for name in param_names:
+            frame = self.read_param_frame(name)
+            if frame is None:
+                continue
+            hit, value = self.registers.get(name, max_age=max_age)
+            self.registers.record(hit)
+            if hit:
+                values[name] = value
+            else:
+                pending[self.PARAMETERS[name]["index"]] = name
+
+        if pending:
+            with self._lock:
+                self.discard_stale()
+                for name in list(pending.values()):
+                    self.send_can_message(*self.read_param_frame(name))
+                deadline = time.monotonic() + timeout
+                while pending:
+                    data, _ = self.receive_can_message(
+                        timeout=max(deadline - time.monotonic(), 0),
+                        cmd_mode=self.CmdModes.SINGLE_PARAM_READ,
+                    )
+                    if data is None:
+                        break
+                    name = pending.pop(data[0] | (data[1] << 8), None)
+                    if name is None:
+                        continue
+                    value = self.PARAMETERS[name]["codec"].decode(data, 4)[0]
+                    self.registers.put(name, value)
+                    values[name] = value
+            for name in pending.values():
+                logging.info(f"No reply for parameter {name} within the timeout period.")
+                values[name] = None
+
+        return {name: values[name] for name in param_names if name in values}
+
+    def write_param_table(self, param_name, value, force=False):
+        """
+        写入参数表; 已确认写入过相同的值时跳过。
+
+        参数:
+        param_name: 参数名称。
+        value: 要设置的值。
+        force: 为 True 时忽略缓存, 总是写入。
+
+        返回:
+        与 write_single_param 相同, 为 parse_received_msg 格式的 5 元组 (电机ID, 位置, 速度, 力矩, 温度);
+        以前返回原始的 (数据, 仲裁ID)。超时或参数名称未知时均为 None; 跳过写入时为缓存的最新状态
+        (cached_feedback, 尚未收到过反馈帧时除电机ID外均为 None)。
+        """
+        frame = self.param_table_frame(param_name, value)
+        if frame is None:
+            return None, None, None, None, None
+
+        if self.skip_redundant_table_write(param_name, value, force=force):
+            return self.cached_feedback()
 
         # Send the CAN message
-        cmd_mode = self.CmdModes.PARAM_TABLE_WRITE
-        received_msg_data, received_msg_arbitration_id = self.send_receive_can_message(
-            cmd_mode=cmd_mode,
-            data2=self.MAIN_CAN_ID,
-            data1=data1,
-        )
+        received_msg_data, received_msg_arbitration_id = self.send_receive_can_message(*frame)
+        self.table_registers.confirm_write(
+            param_name, value, self.PARAM_TABLE[param_name]["codec"], received_msg_data is not None)
+
+        return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
+
+    def skip_redundant_table_write(self, param_name, value, force=False):
+        """
+        判断参数表写入能否跳过(已确认写入过相同的值)。
+
+        参数:
+        param_name: 参数名称。
+        value: 要设置的值。
+        force: 为 True 时总是需要写入。
+
+        返回:
+        可以跳过返回 True。
+        """
+        codec = self.PARAM_TABLE[param_name]["codec"]
+        if not force and self.table_registers.check_write(param_name, value, codec):
+            logging.debug(f"Skipped redundant param table write of {param_name}={value}")
+            return True
+        if force:
+            self.table_registers.record(False)
+        return False
 
-        return received_msg_data, received_msg_arbitration_id
+    def invalidate_param_cache(self):
+        """
+        清空参数影子寄存器和参数表缓存, 之后的读取/写入都会访问总线。
+        """
+        self.registers.invalidate()
+        self.table_registers.invalidate()
 
     def set_0_pos(self):
         """
@@ -446,8 +723,7 @@ class CANMotorController:
         返回:
         解析后的接收消息。
         """
-        self.clear_can_rx()  # 清空CAN接收缓存, 避免读到老数据
-
+        self.invalidate_param_cache()  # 零点改变后位置相关的缓存不再有效
         received_msg_data, received_msg_arbitration_id = self.send_receive_can_message(
             cmd_mode=self.CmdModes.SET_MECHANICAL_ZERO,
             data2=self.MAIN_CAN_ID,
@@ -463,8 +739,6 @@ class CANMotorController:
         返回:
         解析后的接收消息。
         """
-        self.clear_can_rx(0)  # 清空CAN接收缓存, 避免读到老数据
-
         received_msg_data, received_msg_arbitration_id = self.send_receive_can_message(
             cmd_mode=self.CmdModes.MOTOR_ENABLE, data2=self.MAIN_CAN_ID, data1=[]
         )
@@ -477,8 +751,7 @@ class CANMotorController:
         返回:
         解析后的接收消息。
         """
-        self.clear_can_rx(0)  # 空CAN接收缓存, 避免读到老数据
-
+        self.invalidate_param_cache()  # 停止后设备上的参数状态不再可信
         received_msg_data, received_msg_arbitration_id = self.send_receive_can_message(
             cmd_mode=self.CmdModes.MOTOR_STOP,
             data2=self.MAIN_CAN_ID,
@@ -533,7 +806,27 @@ class CANMotorController:
         返回:
         解析后的接收消息。
         """
+        # 使用send_receive_can_message方法发送消息并接收响应
+        received_msg_data, received_msg_arbitration_id = self.send_receive_can_message(
+            *self.motor_control_frame(torque, target_angle, target_velocity, Kp, Kd)
+        )
+
+        return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
+
+    def motor_control_frame(self, torque, target_angle, target_velocity, Kp, Kd):
+        """
+        构造运控模式的控制帧。
 
+        参数:
+        torque: 扭矩。
+        target_angle: 目标角度。
+        target_velocity: 目标速度。
+        Kp: 比例增益。
+        Kd: 导数增益。
+
+        返回:
+        (cmd_mode, data2, data1) 元组。
+        """
         # 生成29位的仲裁ID的组成部分
         cmd_mode = self.CmdModes.MOTOR_CONTROL
         torque_mapped = self._linear_mapping(
@@ -549,16 +842,7 @@ class CANMotorController:
         Kd_mapped = self._linear_mapping(Kd, 0.0, 5.0)
 
         # 创建8字节的数据区
-        data1_bytes = struct.pack(
+        data1 = struct.pack(
             "HHHH", target_angle_mapped, target_velocity_mapped, Kp_mapped, Kd_mapped
         )
-        data1 = [b for b in data1_bytes]
-
-        # 使用send_receive_can_message方法发送消息并接收响应
-        received_msg_data, received_msg_arbitration_id = self.send_receive_can_message(
-            cmd_mode=cmd_mode,
-            data2=data2,
-            data1=data1
-        )
-
-        return self.parse_received_msg(received_msg_data, received_msg_arbitration_id)
+        return cmd_mode, data2, data1
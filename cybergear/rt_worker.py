@@ -0,0 +1,369 @@
+# 独立进程的实时控制工作器：总线收发和控制循环运行在单独的进程中，不受 Web 服务、日志等占用 GIL 的影响
+# 关节状态和设定值通过 multiprocessing.shared_memory 中的双缓冲交换，用序号判断读取是否一致(无锁)，
+# Web 界面、Notebook 和逆运动学脚本作为客户端直接读写共享内存；使能、切换模式等非实时命令通过队列发送
+import logging
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+import numpy as np
+import can
+from control_loop import wait_until
+from motor_state import STATE_FIELDS
+
+# 共享内存头部的计数器(uint64)
+HEADER_FIELDS = (
+    "state_begin", "state_end",  # 状态: 开始写入的序号、写完的序号
+    "setpoint_begin", "setpoint_end",  # 设定值: 同上
+    "cycles", "overruns", "missed_replies",  # 工作进程的循环统计
+    "stop",  # 非 0 时工作进程退出
+)
+_H = {name: i for i, name in enumerate(HEADER_FIELDS)}
+# 每个关节的设定值: 运控模式为 (torque, target_angle, target_velocity, Kp, Kd);
+# 参数模式(如 loc_ref)只使用第一列; NaN 表示该关节不下发
+SETPOINT_WIDTH = 5
+
+
+class SharedControlBlock:
+    def __init__(self, n_joints, name=None, create=False):
+        """
+        共享内存中的状态和设定值块, 各有两个缓冲区。
+        写入方(每块只允许一个)先递增 begin, 写入 begin 对应的缓冲区, 再将 end 设为 begin;
+        读取方按 end 选择缓冲区, 复制后检查 begin - end <= 1 (写入方没有开始覆盖该缓冲区)。
+
+        参数:
+        n_joints: 关节数。
+        name: 共享内存名称, 连接已有的块时必须提供。
+        create: 为 True 时创建新的共享内存块。
+        """
+        self.n_joints = n_joints
+        shapes = [(len(HEADER_FIELDS),), (2, n_joints, len(STATE_FIELDS)), (2, n_joints, SETPOINT_WIDTH)]
+        sizes = [8 * int(np.prod(shape)) for shape in shapes]
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=sum(sizes))
+        offsets = np.cumsum([0] + sizes[:-1])
+        self.header = np.ndarray(shapes[0], np.uint64, self.shm.buf, offsets[0])
+        self._state = np.ndarray(shapes[1], np.float64, self.shm.buf, offsets[1])
+        self._setpoints = np.ndarray(shapes[2], np.float64, self.shm.buf, offsets[2])
+        if create:
+            self.header[:] = 0
+            self._state[:] = np.nan
+            self._setpoints[:] = np.nan
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _publish(self, prefix, buffers, values):
+        seq = int(self.header[_H[prefix + "_begin"]]) + 1
+        self.header[_H[prefix + "_begin"]] = seq
+        buffers[seq & 1] = values
+        self.header[_H[prefix + "_end"]] = seq
+        return seq
+
+    def _read(self, prefix, buffers, out):
+        while True:
+            seq = int(self.header[_H[prefix + "_end"]])
+            np.copyto(out, buffers[seq & 1])
+            if int(self.header[_H[prefix + "_begin"]]) - seq <= 1:
+                return seq, out
+
+    def publish_state(self, state):
+        """
+        写入关节状态(形状为 (关节数, len(STATE_FIELDS)))。
+        """
+        return self._publish("state", self._state, state)
+
+    def read_state(self, out=None):
+        """
+        读取一致的关节状态。
+
+        参数:
+        out: 可选的预分配数组, 避免每次读取分配内存。
+
+        返回:
+        (序号, 状态数组); 序号为 0 表示尚未写入过。
+        """
+        if out is None:
+            out = np.empty(self._state.shape[1:])
+        return self._read("state", self._state, out)
+
+    def publish_setpoints(self, setpoints):
+        """
+        写入设定值(形状为 (关节数, SETPOINT_WIDTH))。
+        """
+        return self._publish("setpoint", self._setpoints, setpoints)
+
+    def read_setpoints(self, out=None):
+        """
+        读取一致的设定值, 返回 (序号, 设定值数组)。
+        """
+        if out is None:
+            out = np.empty(self._setpoints.shape[1:])
+        return self._read("setpoint", self._setpoints, out)
+
+    def counter(self, name):
+        return int(self.header[_H[name]])
+
+    def add(self, name, value=1):
+        self.header[_H[name]] += np.uint64(value)
+
+    def close(self):
+        # 先释放 numpy 视图, 否则共享内存无法关闭
+        del self.header, self._state, self._setpoints
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class RtClient:
+    def __init__(self, name, n_joints):
+        """
+        连接工作进程的共享内存块(同一时间只应有一个客户端写入设定值)。
+
+        参数:
+        name: 共享内存名称(RtWorker.name)。
+        n_joints: 关节数。
+        """
+        self.block = SharedControlBlock(n_joints, name=name)
+        self.n_joints = n_joints
+        self._setpoints = np.full((n_joints, SETPOINT_WIDTH), np.nan)
+
+    def state(self, out=None):
+        """
+        读取最新的关节状态, 返回 (序号, 数组), 列见 motor_state.STATE_FIELDS。
+        """
+        return self.block.read_state(out)
+
+    def positions(self):
+        """
+        返回各关节的最新位置(rad)。
+        """
+        return self.block.read_state()[1][:, 0].copy()
+
+    def set_setpoints(self, setpoints):
+        """
+        写入设定值。
+
+        参数:
+        setpoints: 运控模式为 (关节数, 5) 的数组; 参数模式为长度为关节数的值列表。
+                   NaN 或 None 表示该关节不下发。
+        """
+        values = np.asarray([np.nan if v is None else v for v in setpoints], dtype=np.float64)
+        self._setpoints[:] = np.nan
+        if values.ndim == 1:
+            self._setpoints[:, 0] = values
+        else:
+            self._setpoints[:, :values.shape[1]] = values
+        return self.block.publish_setpoints(self._setpoints)
+
+    def clear_setpoints(self):
+        """
+        清除设定值, 工作进程停止下发(只刷新状态)。
+        """
+        self._setpoints[:] = np.nan
+        return self.block.publish_setpoints(self._setpoints)
+
+    def stats(self):
+        return {name: self.block.counter(name) for name in ("cycles", "overruns", "missed_replies")}
+
+    def close(self):
+        self.block.close()
+
+
+class RtWorker:
+    def __init__(self, bus_kwargs, motor_ids, main_can_id=254, rate_hz=200,
+                 setpoint="control", profile=None, full=False, spin=0.0005):
+        """
+        初始化实时控制工作器。
+
+        参数:
+        bus_kwargs: 在工作进程中打开总线的参数, 如 dict(interface="pcan", channel="PCAN_USBBUS1", bitrate=1000000)。
+        motor_ids: 电机CAN ID列表, 顺序即关节顺序。
+        main_can_id: 主CAN ID。
+        rate_hz: 控制频率(Hz)。
+        setpoint: "control" 表示设定值为运控指令, 或参数名称(如 "loc_ref"、"spd_ref")。
+        profile: 可选的调试配置, 工作进程启动时执行热启动(config_snapshot.warm_start)。
+        full: 为 True 时忽略配置快照, 完整重新配置所有电机。
+        spin: 截止时间前改为忙等的时间(秒)。
+        """
+        self.config = {
+            "bus": dict(bus_kwargs),
+            "motor_ids": list(motor_ids),
+            "main_can_id": main_can_id,
+            "rate_hz": rate_hz,
+            "setpoint": setpoint,
+            "profile": profile,
+            "full": full,
+            "spin": spin,
+        }
+        self.block = None
+        self.process = None
+        self._commands = None
+        self._results = None
+
+    @property
+    def name(self):
+        return self.block.name
+
+    def start(self, timeout=10.0):
+        """
+        创建共享内存并启动工作进程, 等待其完成总线和电机的初始化。
+        """
+        n = len(self.config["motor_ids"])
+        self.block = SharedControlBlock(n, create=True)
+        self._commands = multiprocessing.Queue()
+        self._results = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=_worker_main,
+            args=(self.block.name, self.config, self._commands, self._results),
+            name="CyberGear RT worker",
+            daemon=True,
+        )
+        self.process.start()
+        try:
+            self._result(timeout)
+        except Exception:
+            self.stop()
+            raise
+        return self
+
+    def _result(self, timeout):
+        try:
+            status, value = self._results.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("RT worker did not respond")
+        if status != "ok":
+            raise RuntimeError(f"RT worker error: {value}")
+        return value
+
+    def call(self, method, *args, timeout=5.0, **kwargs):
+        """
+        在工作进程中调用 MotorGroup 的方法(如 "enable_all"、"set_run_mode_all"), 在两个控制周期之间执行。
+        特殊方法 "set_setpoint" 切换设定值的含义(参数同 __init__ 的 setpoint),
+        切换之前写入的设定值不再下发, 直到客户端写入新的设定值。
+
+        返回:
+        方法的返回值。
+        """
+        self._commands.put((method, args, kwargs))
+        return self._result(timeout)
+
+    def client(self):
+        """
+        返回连接本工作器共享内存的客户端。
+        """
+        return RtClient(self.block.name, len(self.config["motor_ids"]))
+
+    def stop(self, timeout=2.0):
+        """
+        停止工作进程并释放共享内存。
+        """
+        if self.block is None:
+            return
+        self.block.header[_H["stop"]] = 1
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        self.block.close()
+        self.block.unlink()
+        self.block = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def _worker_main(block_name, config, commands, results):
+    # 工作进程入口: 打开总线、初始化电机, 然后按固定频率下发设定值并发布状态
+    from pcan_cybergear import CANMotorController
+    from motor_group import MotorGroup
+    from can_dispatcher import release_bus
+
+    motor_ids = config["motor_ids"]
+    block = SharedControlBlock(len(motor_ids), name=block_name)
+    try:
+        bus = can.Bus(**config["bus"])
+    except Exception as e:
+        results.put(("error", repr(e)))
+        block.close()
+        return
+    try:
+        motors = [CANMotorController(bus, motor_id=i, main_can_id=config["main_can_id"])
+                  for i in motor_ids]
+        group = MotorGroup(motors)
+        if config["profile"] is not None:
+            from config_snapshot import warm_start
+            warm_start(group, config["profile"], full=config["full"])
+        block.publish_state(group.snapshot())
+        results.put(("ok", None))
+    except Exception as e:
+        results.put(("error", repr(e)))
+        release_bus(bus)
+        bus.shutdown()
+        block.close()
+        return
+
+    setpoint = config["setpoint"]
+    period = 1.0 / config["rate_hz"]
+    reply_timeout = period * 0.8
+    spin = config["spin"]
+    sp = np.empty((len(motor_ids), SETPOINT_WIDTH))
+    stale_seq = 0  # 不超过该序号的设定值是切换含义之前写入的
+    start = time.perf_counter()
+    cycle = 0
+    try:
+        while not block.counter("stop"):
+            wait_until(start + cycle * period, spin)
+
+            try:
+                method, args, kwargs = commands.get_nowait()
+            except queue.Empty:
+                method = None
+            if method is not None:
+                try:
+                    if method == "set_setpoint":
+                        setpoint = args[0]
+                        # 共享内存中的设定值仍是切换前的含义(例如速度值被当作位置下发), 忽略到客户端重新写入为止
+                        stale_seq = block.counter("setpoint_end")
+                        value = None
+                    else:
+                        value = getattr(group, method)(*args, **kwargs)
+                    results.put(("ok", value))
+                except Exception as e:
+                    results.put(("error", repr(e)))
+
+            seq, _ = block.read_setpoints(sp)
+            # 运控模式需要5个值都有效, 参数模式只看第一列
+            active = np.isfinite(sp).all(axis=1) if setpoint == "control" else np.isfinite(sp[:, 0])
+            if seq <= stale_seq:
+                active[:] = False
+            if active.any():
+                if setpoint == "control":
+                    replies = group.control_all(
+                        [tuple(row) if ok else None for row, ok in zip(sp.tolist(), active)],
+                        timeout=reply_timeout, quiet=True)
+                else:
+                    # 每周期都写入(忽略写直达缓存), 应答帧同时用于刷新状态
+                    replies = group.write_all(
+                        setpoint, [v if ok else None for v, ok in zip(sp[:, 0].tolist(), active)],
+                        timeout=reply_timeout, force=True, quiet=True)
+                block.add("missed_replies", sum(1 for r in replies if r is not None and r.timed_out))
+            block.publish_state(group.snapshot())
+            block.add("cycles")
+
+            cycle += 1
+            behind = time.perf_counter() - (start + cycle * period)
+            if behind > 0:
+                block.add("overruns")
+                cycle += int(behind / period)
+    except Exception as e:
+        logging.error(f"RT worker stopped: {e}")
+    finally:
+        release_bus(bus)
+        bus.shutdown()
+        block.close()
@@ -0,0 +1,330 @@
+# CyberGear 电机模拟器：在 python-can 的 virtual 总线上应答 CANMotorController 使用的协议
+# (使能、停止、设置零点、单参数读写、参数表写入、运控模式及反馈帧)，带一阶关节动力学、
+# 可配置的应答延迟和丢帧率，可在同一进程中模拟多个电机，用于无硬件的功能验证和压力测试
+import argparse
+import heapq
+import logging
+import math
+import random
+import struct
+import threading
+import time
+import can
+from pcan_cybergear import CANMotorController
+
+CmdModes = CANMotorController.CmdModes
+RunModes = CANMotorController.RunModes
+
+# 反馈帧的量程(与 CANMotorController 解码时使用的量程一致)
+P_MIN, P_MAX = -12.5, 12.5
+V_MIN, V_MAX = -30.0, 30.0
+T_MIN, T_MAX = -12.0, 12.0
+# 运控模式命令的量程(与 CANMotorController.motor_control_frame 一致)
+CTRL_P_MIN, CTRL_P_MAX = -4 * math.pi, 4 * math.pi
+CTRL_V_MIN, CTRL_V_MAX = -30.0, 30.0
+CTRL_T_MIN, CTRL_T_MAX = -12.0, 12.0
+CTRL_KP_MAX, CTRL_KD_MAX = 500.0, 5.0
+
+# 参数索引 -> 编解码器
+PARAM_CODECS = {info["index"]: info["codec"] for info in CANMotorController.PARAMETERS.values()}
+PARAM_INDEX = {name: info["index"] for name, info in CANMotorController.PARAMETERS.items()}
+
+
+def _to_uint16(x, x_min, x_max):
+    x = max(min(x, x_max), x_min)
+    return int((x - x_min) * 65535 / (x_max - x_min))
+
+
+def _from_uint16(x, x_min, x_max):
+    return x * (x_max - x_min) / 65535 + x_min
+
+
+class SimulatedMotor:
+    # 一阶动力学参数
+    POSITION_TAU = 0.05  # 位置模式下 目标速度 = 位置误差 / POSITION_TAU
+    VELOCITY_TAU = 0.02  # 实际速度跟随目标速度的时间常数(秒)
+    INERTIA = 0.01  # 运控模式下的等效转动惯量(kg·m²)
+    DAMPING = 0.05  # 粘滞阻尼(Nm·s/rad)
+    MAX_STEP = 0.001  # 积分步长上限(秒)
+
+    def __init__(self, motor_id, host_id=254):
+        """
+        初始化一个模拟电机。
+
+        参数:
+        motor_id: 电机的CAN ID。
+        host_id: 主CAN ID, 应答帧的低8位。
+        """
+        self.motor_id = motor_id
+        self.host_id = host_id
+        self.pos = 0.0
+        self.vel = 0.0
+        self.torque = 0.0
+        self.temp = 30.0
+        self.enabled = False
+        self.fault = 0
+        self.params = {
+            PARAM_INDEX["run_mode"]: RunModes.CONTROL_MODE.value,
+            PARAM_INDEX["iq_ref"]: 0.0,
+            PARAM_INDEX["spd_ref"]: 0.0,
+            PARAM_INDEX["limit_torque"]: 12.0,
+            PARAM_INDEX["cur_kp"]: 0.125,
+            PARAM_INDEX["cur_ki"]: 0.0158,
+            PARAM_INDEX["cur_filt_gain"]: 0.1,
+            PARAM_INDEX["loc_ref"]: 0.0,
+            PARAM_INDEX["limit_spd"]: 2.0,
+            PARAM_INDEX["limit_cur"]: 23.0,
+        }
+        self.param_table = {}
+        # 运控模式设定值: (torque, angle, velocity, Kp, Kd)
+        self.control = (0.0, 0.0, 0.0, 0.0, 0.0)
+        self._last_step = time.monotonic()
+
+    def param(self, name):
+        return self.params[PARAM_INDEX[name]]
+
+    def advance(self, now=None):
+        """
+        将关节状态积分到当前时刻。
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._last_step
+        self._last_step = now
+        while elapsed > 0:
+            dt = min(elapsed, self.MAX_STEP)
+            self._step(dt)
+            elapsed -= dt
+
+    def _step(self, dt):
+        limit_spd = abs(self.param("limit_spd"))
+        mode = self.param("run_mode")
+        if not self.enabled:
+            target_vel = 0.0
+            self.torque = 0.0
+        elif mode == RunModes.POSITION_MODE.value:
+            target_vel = (self.param("loc_ref") - self.pos) / self.POSITION_TAU
+            target_vel = max(min(target_vel, limit_spd), -limit_spd)
+        elif mode == RunModes.SPEED_MODE.value:
+            target_vel = max(min(self.param("spd_ref"), limit_spd), -limit_spd)
+        elif mode == RunModes.CURRENT_MODE.value:
+            self.torque = self.param("iq_ref") * 0.87  # 近似力矩常数 Nm/A
+            target_vel = self.vel + (self.torque - self.DAMPING * self.vel) / self.INERTIA * dt
+        else:
+            t_ff, p_ref, v_ref, kp, kd = self.control
+            self.torque = max(min(kp * (p_ref - self.pos) + kd * (v_ref - self.vel) + t_ff,
+                                  T_MAX), T_MIN)
+            target_vel = self.vel + (self.torque - self.DAMPING * self.vel) / self.INERTIA * dt
+
+        if not self.enabled or mode in (RunModes.POSITION_MODE.value, RunModes.SPEED_MODE.value):
+            alpha = min(dt / self.VELOCITY_TAU, 1.0)
+            new_vel = self.vel + (target_vel - self.vel) * alpha
+            if self.enabled:
+                self.torque = self.INERTIA * (new_vel - self.vel) / dt + self.DAMPING * new_vel
+        else:
+            new_vel = target_vel
+        self.vel = max(min(new_vel, V_MAX), V_MIN)
+        self.pos += self.vel * dt
+
+    def feedback_frame(self):
+        """
+        生成反馈帧(通信类型2)。
+        """
+        mode_state = 2 if self.enabled else 0
+        arbitration_id = (CmdModes.MOTOR_FEEDBACK << 24) | (mode_state << 22) | \
+            (self.fault << 16) | (self.motor_id << 8) | self.host_id
+        data = struct.pack(
+            ">HHHH",
+            _to_uint16(self.pos, P_MIN, P_MAX),
+            _to_uint16(self.vel, V_MIN, V_MAX),
+            _to_uint16(self.torque, T_MIN, T_MAX),
+            int(self.temp * 10),
+        )
+        return can.Message(arbitration_id=arbitration_id, data=data, is_extended_id=True)
+
+    def handle(self, msg):
+        """
+        处理一帧发给本电机的命令。
+
+        参数:
+        msg: 收到的 can.Message。
+
+        返回:
+        应答帧, 不需要应答时为 None。
+        """
+        self.advance()
+        cmd_mode = (msg.arbitration_id >> 24) & 0x1F
+        data2 = (msg.arbitration_id >> 8) & 0xFFFF
+        data = bytes(msg.data)
+
+        if cmd_mode == CmdModes.MOTOR_CONTROL:
+            angle, velocity, kp, kd = struct.unpack("<HHHH", data[:8])
+            self.control = (
+                _from_uint16(data2, CTRL_T_MIN, CTRL_T_MAX),
+                _from_uint16(angle, CTRL_P_MIN, CTRL_P_MAX),
+                _from_uint16(velocity, CTRL_V_MIN, CTRL_V_MAX),
+                _from_uint16(kp, 0.0, CTRL_KP_MAX),
+                _from_uint16(kd, 0.0, CTRL_KD_MAX),
+            )
+        elif cmd_mode == CmdModes.MOTOR_ENABLE:
+            self.enabled = True
+        elif cmd_mode == CmdModes.MOTOR_STOP:
+            self.enabled = False
+            self.vel = 0.0
+        elif cmd_mode == CmdModes.SET_MECHANICAL_ZERO:
+            self.pos = 0.0
+        elif cmd_mode == CmdModes.PARAM_TABLE_WRITE:
+            self.param_table[data[0] | (data[1] << 8)] = data[4:8]
+        elif cmd_mode == CmdModes.SINGLE_PARAM_WRITE:
+            index = data[0] | (data[1] << 8)
+            codec = PARAM_CODECS.get(index)
+            if codec is None:
+                return None
+            self.params[index] = codec.decode(data, 4)[0]
+        elif cmd_mode == CmdModes.SINGLE_PARAM_READ:
+            index = data[0] | (data[1] << 8)
+            codec = PARAM_CODECS.get(index)
+            if codec is None:
+                return None
+            arbitration_id = (CmdModes.SINGLE_PARAM_READ << 24) | (self.motor_id << 8) | self.host_id
+            return can.Message(
+                arbitration_id=arbitration_id,
+                data=data[:4] + codec.encode(self.params[index])[:4].ljust(4, b"\x00"),
+                is_extended_id=True,
+            )
+        elif cmd_mode == CmdModes.GET_DEVICE_ID:
+            arbitration_id = (CmdModes.GET_DEVICE_ID << 24) | (self.motor_id << 8) | 0xFE
+            return can.Message(
+                arbitration_id=arbitration_id,
+                data=struct.pack("<Q", 0xC0BE6EA4_00000000 | self.motor_id),
+                is_extended_id=True,
+            )
+        else:
+            return None
+        return self.feedback_frame()
+
+
+class CyberGearSimulator:
+    def __init__(self, motor_ids, channel="cybergear_sim", interface="virtual",
+                 latency=0.0, jitter=0.0, loss=0.0, host_id=254, seed=None):
+        """
+        初始化总线级模拟器, 一个后台线程应答总线上所有模拟电机的命令。
+
+        参数:
+        motor_ids: 模拟电机的CAN ID列表。
+        channel: 总线通道, 驱动端需使用相同的 interface 和 channel 打开总线。
+        interface: python-can 接口, 默认为进程内的 virtual 总线。
+        latency: 应答延迟(秒)。
+        jitter: 应答延迟的随机抖动上限(秒)。
+        loss: 应答丢失的概率(0 ~ 1)。
+        host_id: 主CAN ID。
+        seed: 随机数种子。
+        """
+        self.motors = {mid: SimulatedMotor(mid, host_id) for mid in motor_ids}
+        self.channel = channel
+        self.interface = interface
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.frames_received = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self._random = random.Random(seed)
+        self._pending = []  # (发送时刻, 序号, 应答帧) 小根堆
+        self._seq = 0
+        self._stopped = threading.Event()
+        self._thread = None
+        self.bus = None
+
+    def start(self):
+        """
+        打开总线并启动应答线程。
+        """
+        self.bus = can.Bus(interface=self.interface, channel=self.channel)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="CyberGearSimulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        停止应答线程并关闭总线。
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        if self.bus is not None:
+            self.bus.shutdown()
+            self.bus = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _schedule(self, reply):
+        if self.loss and self._random.random() < self.loss:
+            self.frames_dropped += 1
+            return
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(0, self.jitter)
+        if delay <= 0:
+            self.bus.send(reply)
+            self.frames_sent += 1
+            return
+        self._seq += 1
+        heapq.heappush(self._pending, (time.monotonic() + delay, self._seq, reply))
+
+    def _flush_due(self):
+        now = time.monotonic()
+        while self._pending and self._pending[0][0] <= now:
+            _, _, reply = heapq.heappop(self._pending)
+            self.bus.send(reply)
+            self.frames_sent += 1
+
+    def _run(self):
+        while not self._stopped.is_set():
+            timeout = 0.05
+            if self._pending:
+                timeout = max(min(self._pending[0][0] - time.monotonic(), timeout), 0)
+            try:
+                msg = self.bus.recv(timeout=timeout)
+            except Exception as e:
+                logging.info(f"Simulator stopped: {e}")
+                break
+            if msg is not None and msg.is_extended_id:
+                motor = self.motors.get(msg.arbitration_id & 0xFF)
+                if motor is not None:
+                    self.frames_received += 1
+                    reply = motor.handle(msg)
+                    if reply is not None:
+                        self._schedule(reply)
+            self._flush_due()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CyberGear motor simulator")
+    parser.add_argument("--interface", default="socketcan",
+                        help="python-can interface (virtual only works in-process)")
+    parser.add_argument("--channel", default="vcan0")
+    parser.add_argument("--ids", default="101,102,103,104", help="comma separated motor CAN IDs")
+    parser.add_argument("--latency", type=float, default=0.0002, help="reply latency in seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="reply loss probability")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    motor_ids = [int(x) for x in args.ids.split(",")]
+    with CyberGearSimulator(motor_ids, channel=args.channel, interface=args.interface,
+                            latency=args.latency, loss=args.loss):
+        logging.info(f"Simulating motors {motor_ids} on {args.interface}:{args.channel}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
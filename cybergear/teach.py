@@ -0,0 +1,253 @@
+# 连续示教与轨迹回放：电机停止(可手动拖动)时按固定频率(100~500 Hz)采样所有关节位置并流式写入文件，
+# 回放时按各电机的最大速度(limit_spd)对轨迹重新分配时间，再插值成固定频率的 loc_ref 设定值流，
+# 回放速度可调，周期由速度限制决定而不是固定的等待时间
+import logging
+import threading
+import time
+import numpy as np
+from control_loop import ControlLoop
+
+# 文件头: 魔数、关节数、采样频率、开始记录时的墙上时间; 之后每个采样一行 float64: (t, 各关节位置)
+MAGIC = b"CGTEACH1"
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"), ("n_joints", "<u4"), ("reserved", "<u4"), ("rate_hz", "<f8"), ("created", "<f8"),
+])
+HEADER_SIZE = HEADER_DTYPE.itemsize  # 32
+
+
+def load_trajectory(path):
+    """
+    加载示教轨迹(memmap, 不读入内存)。
+
+    返回:
+    (t, positions): t 为相对记录开始的时间(秒), positions 形状为 (采样数, 关节数);
+    未收到应答的采样为 NaN。
+    """
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) != 1 or header["magic"][0] != MAGIC:
+        raise ValueError(f"Not a teach trajectory: {path}")
+    width = int(header["n_joints"][0]) + 1
+    data = np.memmap(path, dtype=np.float64, mode="r", offset=HEADER_SIZE)
+    # 记录中断时最后一行可能不完整
+    rows = data[:len(data) // width * width].reshape(-1, width)
+    return rows[:, 0], rows[:, 1:]
+
+
+def waypoints(poses, dwell=0.0):
+    """
+    把离散点位(如按键示教的 positions.csv)转换为轨迹, 点位之间的时间由回放时的速度限制决定。
+
+    参数:
+    poses: 形状为 (点位数, 关节数) 的点位列表。
+    dwell: 每个点位的停留时间(秒)。
+
+    返回:
+    (t, positions), 同 load_trajectory。
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    positions = np.repeat(poses, 2, axis=0)
+    steps = np.zeros(len(positions))
+    steps[1::2] = dwell
+    return np.cumsum(steps), positions
+
+
+def time_parameterize(t, positions, limit_spd, speed=1.0):
+    """
+    按回放速度缩放时间, 并拉长超过速度限制的段。
+
+    参数:
+    t: 采样时间(秒)。
+    positions: 形状为 (采样数, 关节数) 的位置。
+    limit_spd: 各关节的速度限制(rad/s), 标量或长度为关节数的列表, 必须大于 0。
+    speed: 回放速度倍数, 2.0 为两倍速。
+
+    返回:
+    新的时间序列(从 0 开始)。
+    """
+    if speed <= 0:
+        raise ValueError(f"Invalid playback speed: {speed}")
+    limit = np.broadcast_to(np.asarray(limit_spd, dtype=np.float64), positions.shape[1:])
+    if not (limit > 0).all():
+        raise ValueError(f"Invalid limit_spd: {limit_spd}")
+    dt = np.diff(t) / speed
+    # 每段所有关节都不超过速度限制所需的最短时间
+    required = (np.abs(np.diff(positions, axis=0)) / limit).max(axis=1)
+    return np.concatenate(([0.0], np.cumsum(np.maximum(dt, required))))
+
+
+def resample(t, positions, rate_hz):
+    """
+    把轨迹线性插值到固定频率。
+
+    返回:
+    形状为 (周期数, 关节数) 的位置, 最后一行为轨迹终点。
+    """
+    grid = np.arange(0.0, t[-1], 1.0 / rate_hz)
+    grid = np.append(grid, t[-1])
+    return np.column_stack([np.interp(grid, t, positions[:, j]) for j in range(positions.shape[1])])
+
+
+class TeachRecorder(ControlLoop):
+    def __init__(self, group, path, rate_hz=200, reply_timeout=None, spin=0.0005):
+        """
+        初始化示教记录器。每个周期向所有电机发送停止帧(保持停止, 可手动拖动),
+        电机应答的反馈帧中的位置即为采样值。
+
+        参数:
+        group: MotorGroup 电机组。
+        path: 轨迹文件路径(已存在则覆盖)。
+        rate_hz: 采样频率(Hz), 常用 100 ~ 500。
+        reply_timeout: 每周期等待应答的时间(秒), 默认为周期的 80%。
+        spin: 截止时间前改为忙等的时间(秒)。
+        """
+        frames = [(m.CmdModes.MOTOR_STOP, m.MAIN_CAN_ID, [0, 0, 0, 0, 0, 0, 0, 0]) for m in group]
+        super().__init__(group, lambda cycle, t, feedback: frames, rate_hz, reply_timeout, spin)
+        self.path = path
+        self.samples = 0
+        self._rows = np.empty((max(int(rate_hz), 1), len(group) + 1))
+        self._count = 0
+        self._thread = None
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = MAGIC
+        header["n_joints"] = len(group)
+        header["rate_hz"] = rate_hz
+        header["created"] = time.time()
+        self._file = open(path, "wb")
+        self._file.write(header.tobytes())
+
+    def _send(self, sp, t):
+        replies = self.group.fan_out(sp, timeout=self.reply_timeout, quiet=True)
+        row = self._rows[self._count]
+        row[0] = t
+        row[1:] = [np.nan if r.timed_out else r.feedback[1] for r in replies]
+        self._count += 1
+        self.samples += 1
+        # 约每秒写入一次文件
+        if self._count == len(self._rows):
+            self.flush()
+        return replies
+
+    def flush(self):
+        self._file.write(self._rows[:self._count].tobytes())
+        self._file.flush()
+        self._count = 0
+
+    def run(self, duration=None, cycles=None):
+        """
+        开始记录, 直到达到时长/周期数或调用 stop()。
+
+        返回:
+        LoopStats 统计结果。
+        """
+        try:
+            return super().run(duration=duration, cycles=cycles)
+        finally:
+            self.flush()
+
+    def start(self):
+        """
+        在后台线程中开始记录(例如在 Notebook 中等待按键时), 用 stop() 结束。
+        """
+        self._thread = threading.Thread(target=self.run, name="TeachRecorder", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        super().stop()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """
+        停止记录并关闭文件。
+        """
+        self.stop()
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+            logging.info(f"Recorded {self.samples} samples to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TrajectoryPlayer(ControlLoop):
+    def __init__(self, group, t, positions, rate_hz=100, speed=1.0, limit_spd=None,
+                 margin=0.9, approach=True, reply_timeout=None, spin=0.0005):
+        """
+        初始化轨迹回放(电机需已设置为 POSITION_MODE 并使能)。
+
+        参数:
+        group: MotorGroup 电机组。
+        t, positions: 轨迹, 见 load_trajectory/waypoints; 含 NaN 的采样被忽略。
+        rate_hz: loc_ref 设定值的下发频率(Hz)。
+        speed: 回放速度倍数, 受速度限制约束。
+        limit_spd: 各关节的速度限制(rad/s), 标量或列表; 为 None 时使用电机缓存的 limit_spd 参数。
+        margin: 规划速度与 limit_spd 之比, 留出余量使电机能跟上设定值。
+        approach: 为 True 时从各关节的当前位置(最新反馈)开始, 先以限速移动到轨迹起点。
+        reply_timeout: 每周期等待应答的时间(秒), 默认为周期的 80%。
+        spin: 截止时间前改为忙等的时间(秒)。
+        """
+        t = np.asarray(t, dtype=np.float64)
+        positions = np.asarray(positions, dtype=np.float64)
+        valid = np.isfinite(positions).all(axis=1)
+        t, positions = t[valid], positions[valid]
+        if len(t) == 0:
+            raise ValueError("Trajectory has no valid samples")
+        if positions.shape[1] != len(group):
+            raise ValueError(f"Expected {len(group)} joints, got {positions.shape[1]}")
+        if approach:
+            current = group.snapshot()[:, 0]
+            if np.isfinite(current).all():
+                t = np.concatenate(([t[0]], t))
+                positions = np.vstack((current, positions))
+        self.limit_spd = self._limits(group, limit_spd) * margin
+        self.times = time_parameterize(t, positions, self.limit_spd, speed)
+        self.trajectory = resample(self.times, positions, rate_hz)
+        super().__init__(group, self.trajectory, rate_hz, reply_timeout, spin)
+
+    @staticmethod
+    def _limits(group, limit_spd):
+        if limit_spd is not None:
+            return np.broadcast_to(np.asarray(limit_spd, dtype=np.float64), (len(group),)).copy()
+        limits = []
+        for motor in group:
+            hit, value = motor.registers.get("limit_spd")
+            if not hit or not value:
+                raise ValueError(
+                    f"limit_spd of motor {motor.MOTOR_ID} is unknown, pass limit_spd explicitly")
+            limits.append(abs(value))
+        return np.array(limits)
+
+    @property
+    def duration(self):
+        """
+        回放时长(秒)。
+        """
+        return float(self.times[-1])
+
+    def _setpoints_for(self, cycle, t, feedback):
+        # 落后时跳过的周期不补发, 但终点总要下发
+        last = len(self.trajectory) - 1
+        if cycle > last and self._last_cycle < last:
+            cycle = last
+        self._last_cycle = cycle
+        return super()._setpoints_for(cycle, t, feedback)
+
+    def _send(self, sp, t):
+        return self.group.write_all("loc_ref", sp.tolist(), timeout=self.reply_timeout, quiet=True)
+
+    def run(self, duration=None, cycles=None):
+        """
+        回放轨迹, 直到播放完毕或调用 stop()。
+
+        返回:
+        LoopStats 统计结果。
+        """
+        self._last_cycle = -1
+        logging.info(f"Playing {len(self.trajectory)} setpoints over {self.duration:.2f} s")
+        return super().run(duration=duration, cycles=cycles)
@@ -0,0 +1,296 @@
+# 最新值优先的发送调度器：每条总线一个发送线程，按 (电机, 参数) 合并尚未发出的设定值
+# 界面或手柄发送 loc_ref/spd_ref 的速度超过总线应答速度时，旧的设定值被新的替换而不是排队，
+# 电机总是追随最新的目标；使能、停止、设置零点等控制命令按提交顺序执行，从不丢弃
+import collections
+import concurrent.futures
+import logging
+import threading
+from motor_group import MotorGroup
+
+
+class _Entry:
+    __slots__ = ("key", "motor", "value", "func", "args", "kwargs", "future")
+
+    def __init__(self, key=None, motor=None, value=None, func=None, args=(), kwargs=None):
+        self.key = key  # (电机CAN ID, 参数名称), 控制命令为 None
+        self.motor = motor
+        self.value = value
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.future = concurrent.futures.Future()
+
+
+class TxScheduler:
+    # 总线 -> 调度器 的全局注册表(以 id(bus) 为键)
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, bus, timeout=1.0):
+        """
+        初始化发送调度器(一般通过 TxScheduler.for_bus 获取, 无需直接构造)。
+
+        参数:
+        bus: CAN总线对象。
+        timeout: 每批设定值等待应答的超时时间(秒)。
+        """
+        self.bus = bus
+        self.timeout = timeout
+        self.submitted = 0  # 提交的设定值和控制命令总数
+        self.sent = 0  # 实际执行的设定值和控制命令数
+        self.coalesced = 0  # 被更新的设定值替换而未发送的设定值数
+        self.discarded = 0  # discard_setpoints 或 stop(drain=False) 丢弃的设定值数
+        self._queue = collections.deque()
+        # 最后一个控制命令之后、尚未发出的设定值: key -> _Entry
+        self._open = {}
+        self._busy = False
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._tx_thread,
+            name=f"TxScheduler for {getattr(bus, 'channel_info', bus)}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    @classmethod
+    def for_bus(cls, bus):
+        """
+        获取总线对应的调度器, 不存在则创建并启动发送线程。
+
+        参数:
+        bus: CAN总线对象。
+
+        返回:
+        TxScheduler 实例。
+        """
+        with cls._registry_lock:
+            scheduler = cls._registry.get(id(bus))
+            if scheduler is None or scheduler.bus is not bus or scheduler._stopping:
+                scheduler = cls(bus)
+                cls._registry[id(bus)] = scheduler
+            return scheduler
+
+    @property
+    def pending(self):
+        """
+        等待发送的设定值和控制命令数。
+        """
+        return len(self._queue)
+
+    def stats(self):
+        """
+        返回调度统计。
+
+        返回:
+        包含 submitted、sent、coalesced、discarded、pending 的字典。
+        """
+        return {
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "discarded": self.discarded,
+            "pending": self.pending,
+        }
+
+    def submit_setpoint(self, motor, param_name, value):
+        """
+        提交一个设定值(单参数写入); 同一电机同一参数尚未发出的旧设定值被替换。
+
+        参数:
+        motor: CANMotorController 实例。
+        param_name: 参数名称, 如 "loc_ref"、"spd_ref"。
+        value: 设定值。
+
+        返回:
+        concurrent.futures.Future, 结果为写入时的 MotorReply;
+        被合并的设定值与替换它的设定值共享同一个 Future。
+        """
+        key = (motor.MOTOR_ID, param_name)
+        with self._cond:
+            self._check_running()
+            self.submitted += 1
+            entry = self._open.get(key)
+            if entry is not None:
+                entry.value = value
+                self.coalesced += 1
+                return entry.future
+            entry = _Entry(key=key, motor=motor, value=value)
+            self._open[key] = entry
+            self._queue.append(entry)
+            self._cond.notify()
+            return entry.future
+
+    def submit_setpoints(self, motors, param_name, values):
+        """
+        为一组电机提交同一参数的设定值。
+
+        参数:
+        motors: CANMotorController 列表或 MotorGroup。
+        param_name: 参数名称。
+        values: 与 motors 等长的值列表, 为 None 的项跳过。
+
+        返回:
+        Future 列表, 跳过的电机对应 None。
+        """
+        return [
+            None if value is None else self.submit_setpoint(motor, param_name, value)
+            for motor, value in zip(motors, values)
+        ]
+
+    def submit(self, func, *args, **kwargs):
+        """
+        提交一个控制命令(如 motor.enable、group.disable_all), 按顺序执行, 从不丢弃或合并。
+        在它之前提交的设定值先于它发出, 之后提交的设定值不会与之前的合并。
+
+        参数:
+        func: 可调用对象。
+        args, kwargs: 调用参数。
+
+        返回:
+        concurrent.futures.Future, 结果为 func 的返回值。
+        """
+        with self._cond:
+            self._check_running()
+            self.submitted += 1
+            entry = _Entry(func=func, args=args, kwargs=kwargs)
+            self._open.clear()
+            self._queue.append(entry)
+            self._cond.notify()
+            return entry.future
+
+    def discard_setpoints(self):
+        """
+        丢弃尚未发出的设定值(其 Future 被取消), 控制命令仍按顺序执行;
+        例如切换运行模式前调用, 上一种模式的设定值不会在切换之后发出。
+
+        返回:
+        丢弃的设定值数。
+        """
+        with self._cond:
+            return self._discard_setpoints()
+
+    def _discard_setpoints(self):
+        kept = collections.deque()
+        discarded = 0
+        for entry in self._queue:
+            if entry.key is None:
+                kept.append(entry)
+            else:
+                discarded += 1
+                entry.future.cancel()
+        self._queue = kept
+        self._open.clear()
+        self.discarded += discarded
+        return discarded
+
+    def flush(self, timeout=None):
+        """
+        等待队列中的设定值和控制命令全部执行完。
+
+        参数:
+        timeout: 最长等待时间(秒), 为 None 则一直等待。
+
+        返回:
+        全部执行完返回 True, 超时返回 False。
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def stop(self, drain=True, timeout=1.0):
+        """
+        停止发送线程(应在 release_bus / bus.shutdown() 之前调用)。
+
+        参数:
+        drain: 为 True 时先发送队列中的全部内容; 为 False 时丢弃尚未发出的设定值,
+               控制命令仍会执行。
+        timeout: 等待线程退出的时间(秒)。
+        """
+        with self._cond:
+            self._stopping = True
+            if not drain:
+                self._discard_setpoints()
+            self._cond.notify_all()
+        with TxScheduler._registry_lock:
+            if TxScheduler._registry.get(id(self.bus)) is self:
+                del TxScheduler._registry[id(self.bus)]
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _check_running(self):
+        if self._stopping:
+            raise RuntimeError("TxScheduler has been stopped")
+
+    def _next_batch(self):
+        # 取出队首的控制命令, 或连续的一批设定值(直到下一个控制命令)
+        with self._cond:
+            self._cond.wait_for(lambda: self._queue or self._stopping)
+            if not self._queue:
+                return None
+            batch = [self._queue.popleft()]
+            if batch[0].key is not None:
+                while self._queue and self._queue[0].key is not None:
+                    batch.append(self._queue.popleft())
+            for entry in batch:
+                if entry.key is not None and self._open.get(entry.key) is entry:
+                    # 已取出的设定值不再接受合并, 之后的同键设定值重新排队
+                    del self._open[entry.key]
+            self._busy = True
+            return batch
+
+    def _tx_thread(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            try:
+                if batch[0].key is None:
+                    self._run_command(batch[0])
+                else:
+                    self._write_setpoints(batch)
+            finally:
+                with self._cond:
+                    self.sent += len(batch)
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _run_command(self, entry):
+        if not entry.future.set_running_or_notify_cancel():
+            return
+        try:
+            entry.future.set_result(entry.func(*entry.args, **entry.kwargs))
+        except Exception as e:
+            logging.info(f"TxScheduler command failed: {e}")
+            entry.future.set_exception(e)
+
+    def _write_setpoints(self, batch):
+        # 同一参数的设定值并发下发(每个键在一批中只出现一次, 每个电机也只出现一次)
+        by_param = collections.OrderedDict()
+        for entry in batch:
+            if entry.future.set_running_or_notify_cancel():
+                by_param.setdefault(entry.key[1], []).append(entry)
+        for param_name, entries in by_param.items():
+            try:
+                replies = MotorGroup([e.motor for e in entries]).write_all(
+                    param_name, [e.value for e in entries], timeout=self.timeout)
+            except Exception as e:
+                logging.info(f"TxScheduler failed to write {param_name}: {e}")
+                for entry in entries:
+                    entry.future.set_exception(e)
+                continue
+            for entry, reply in zip(entries, replies):
+                entry.future.set_result(reply)
+
+
+def release_scheduler(bus, drain=True):
+    """
+    停止总线对应的调度器(如果存在)。
+
+    参数:
+    bus: CAN总线对象。
+    drain: 见 TxScheduler.stop。
+    """
+    with TxScheduler._registry_lock:
+        scheduler = TxScheduler._registry.get(id(bus))
+    if scheduler is not None:
+        scheduler.stop(drain=drain)
@@ -10,13 +10,30 @@ import time
 import can
 import numpy as np
 from inverseKinematics import IK
+from reachIndex import INDEX_PATH, ReachIndex
 
 # 添加pcan_cybergear库的路径
 sys.path.append(os.path.join("..", "cybergear"))
 # noinspection PyUnresolvedReferences
 from pcan_cybergear import CANMotorController
+# noinspection PyUnresolvedReferences
+from can_dispatcher import release_bus
+# noinspection PyUnresolvedReferences
+from motor_group import MotorGroup
+# noinspection PyUnresolvedReferences
+from commissioning import DEFAULT_PROFILE
+# noinspection PyUnresolvedReferences
+from config_snapshot import warm_start
 
 ik = IK()
+ik.setCache(4096)  # 重复的目标点(往返抓取、示教回放)直接返回缓存的解
+reach = None    # 可达空间索引, 先运行 python reachIndex.py build 生成; 无解时据此给出最近的可达点
+if os.path.exists(INDEX_PATH):
+    try:
+        reach = ReachIndex(INDEX_PATH, ik)
+    except (OSError, ValueError) as e:  # 缺少 .json 元数据、文件损坏或版本/连杆长度不一致
+        logging.warning(f"可达空间索引不可用, 请重新生成: {e}")
+FULL_COMMISSION = False  # 为 True 时忽略配置快照，完整重新配置所有电机并设置零点
 
 def init_motors():
     """
@@ -40,22 +57,10 @@ def init_motors():
         motors = [motor1, motor2,motor3, motor4]
         logging.info("电机控制器初始化完成")
 
-        # 配置电机参数（符合CANopen SDO参数配置规范）
-        for motor in motors:
-            motor.write_param_table("limit_cur", 3)  # 电流限制
-            motor.write_param_table("loc_kp", 8)  # 位置环比例增益
-            motor.write_param_table("spd_kp", 2)  # 速度环比例增益
-            motor.write_param_table("spd_ki", 0.03)  # 速度环积分增益
-            motor.write_single_param("limit_spd", value=0.5)  # 最大速度限制
-            motor.disable()  # 进入SWITCH_ON_DISABLED状态
-            motor.set_0_pos()  # 设置机械零点
-        logging.info("电机参数配置完成并设置零点")
-
-        # 设置为位置控制模式（符合DSP402运动控制协议）
-        for motor in motors:
-            motor.set_run_mode(motor.RunModes.POSITION_MODE)
-            motor.enable()  # 进入OPERATION_ENABLED状态
-        logging.info("位置控制模式已启用")
+        # 按调试配置并发配置所有电机（参数表、最大速度、停止、设置零点、位置模式、使能），并读回校验
+        # 电机保持上电且配置与上次一致时只重写有差异的参数，不再停止和重新设置零点
+        warm_start(motors, DEFAULT_PROFILE, full=FULL_COMMISSION)
+        logging.info("电机参数配置完成并设置零点，位置控制模式已启用")
 
         return bus, motors
 
@@ -64,9 +69,19 @@ def init_motors():
         raise
 
 
+def motorAngles(result):
+    # 把 IK.getRotationAngle 的结果转换为各电机的目标位置(弧度)
+    theta1 = round(float(np.radians(result['theta1'])), 4)
+    theta2 = round(float(1.5708- np.radians(result['theta2'])), 4)  # motor2实际旋转角度是90-原角度（因为初始状态为竖直向上）
+    theta3 = - round(float(np.radians(result['theta3'])), 4)    # motor3反向
+    theta4 = round(float(np.radians(result['theta4'])), 4)
+    return [theta1, theta2, theta3, theta4]
+
+
 class ArmIK:
     def __init__(self):
         self.bus, self.motors = init_motors()  # 实例初始化时连接硬件
+        self.group = MotorGroup(self.motors)  # 各关节的设定值一次性批量下发
 
     def motorsMove(self, angles, movetime=None):
         # 驱动1234号电机转动，如果没有指定运动时间，自动计算最长时间
@@ -74,37 +89,36 @@ class ArmIK:
         if movetime is None:
             movetime = int(max(angles[0:4]))  # 切片，包含angle[0]到[3]
 
-        for i, motor in enumerate(self.motors):
-            motor.write_single_param("loc_ref", angles[i])
+        self.group.write_all("loc_ref", angles[0:len(self.motors)])
         time.sleep(movetime)
 
         return movetime
 
-    def setPitchRange(self, coordinate_data, alpha1, alpha2, da=1):
-        # 给定坐标coordinate_data和俯仰角的范围alpha1，alpha2, 自动在范围内寻找到的合适的解
+    def setPitchRange(self, coordinate_data, alpha1, alpha2, da=None):
+        # 给定坐标coordinate_data和俯仰角的范围alpha1，alpha2, 在范围内寻找最接近alpha1的解
         # 如果无解返回False,否则返回对应舵机角度,俯仰角
         # 坐标单位cm， 以元组形式传入，例如(0, 5, 10)
-        # da为俯仰角遍历时每次增加的角度
+        # 可行的俯仰角区间由 IK.getClosestPitch 解析求出，精度约0.001度，不再逐度遍历
+        # da不为None时仍在 np.arange(alpha1, alpha2 + da, da) 上取第一个可行点（与原先逐步遍历的结果相同，网格上的点批量求解）
         x, y, z = coordinate_data
-
-        if (alpha1 < alpha2 and da < 0) or (alpha1 > alpha2 and da > 0):    # 调整步长方向（确保方向与范围一致）
-            da = -da  # 反转步长方向
-        # 遍历搜索，使用np.arange创建角度序列（左闭右开）
-        for alpha in np.arange(alpha1, alpha2 + da, da):
-            result = ik.getRotationAngle((x, y, z), alpha)
-            if result:
-                # 转换为Python原生类型
-                theta1 = round(float(np.radians(result['theta1'])), 4)
-                theta2 = round(float(1.5708- np.radians(result['theta2'])), 4)  # motor2实际旋转角度是90-原角度（因为初始状态为竖直向上）
-                theta3 = - round(float(np.radians(result['theta3'])), 4)    # motor3反向
-                theta4 = round(float(np.radians(result['theta4'])), 4)
-                angles = [
-                    theta1,theta2,theta3,theta4
-                ]
-                logging.info('angles: %s', angles)  # 使用%格式符
-                logging.info('alpha: %s', alpha)  # 自动类型转换
-                return angles, alpha
-        return False    # 无解时返回False
+        if da:
+            if (alpha1 < alpha2 and da < 0) or (alpha1 > alpha2 and da > 0):    # 调整步长方向（确保方向与范围一致）
+                da = -da  # 反转步长方向
+            grid = np.arange(alpha1, alpha2 + da, da)
+            _, feasible = ik.getRotationAngleBatch(np.tile((x, y, z), (len(grid), 1)), grid)
+            found = False
+            if feasible.any():
+                alpha = grid[np.argmax(feasible)]
+                found = alpha, ik.getRotationAngle((x, y, z), alpha)
+        else:
+            found = ik.getClosestPitch((x, y, z), alpha1, alpha1, alpha2)
+        if not found:
+            return False    # 无解时返回False
+        alpha, result = found
+        angles = motorAngles(result)
+        logging.info('angles: %s', angles)  # 使用%格式符
+        logging.info('alpha: %s', alpha)  # 自动类型转换
+        return angles, alpha
 
     def setPitchRangeMoving(self, coordinate_data, alpha, alpha1, alpha2, movetime=None):
         # 给定坐标coordinate_data和俯仰角alpha,以及俯仰角范围的范围alpha1, alpha2，自动寻找最接近给定俯仰角的解，并转到目标位置
@@ -114,21 +128,19 @@ class ArmIK:
         # alpha1和alpha2为俯仰角的取值范围
         # movetime为舵机转动时间，单位ms, 如果不给出时间，则自动计算
         x, y, z = coordinate_data
-        result1 = self.setPitchRange((x, y, z), alpha, alpha1)  # 从alpha出发向两边找
-        result2 = self.setPitchRange((x, y, z), alpha, alpha2)
-        if result1:    # 在(alpha1,alpha)和(alpha,alpha2)两个区间中找到距离alpha最近的解
-            data = result1
-            if result2 and abs(result2[1] - alpha) < abs(result1[1] - alpha):
-                data = result2
-        else:
-            if result2:
-                data = result2
+        # (alpha1,alpha)和(alpha,alpha2)两个区间合起来即为包含三者的区间, 一次求出距离alpha最近的解
+        found = ik.getClosestPitch((x, y, z), alpha, min(alpha, alpha1, alpha2), max(alpha, alpha1, alpha2))
+        if not found:
+            if reach is not None:
+                logging.info('找不到合适解, 最近的可达点: %s', reach.getNearestReachable((x, y, z)))
             else:
                 logging.info('找不到合适解')
-                return False
-        if data:
-            angles, alpha = data[0], data[1]
-            movetime = self.motorsMove(angles, movetime)
+            return False
+        alpha, result = found
+        angles = motorAngles(result)
+        logging.info('angles: %s', angles)
+        logging.info('alpha: %s', alpha)
+        movetime = self.motorsMove(angles, movetime)
         return angles, alpha, movetime
 
 def main():
@@ -151,6 +163,7 @@ def main():
         for motor in AK.motors:
             motor.disable()
         logging.info("运动序列完成，电机已停止")
+        logging.info(f"逆运动学缓存: {ik.getCacheStats()}")
 
     except Exception as e:
         logging.error(f"程序执行出错: {str(e)}")
@@ -159,6 +172,7 @@ def main():
         if AK and hasattr(AK, 'motors'):  # 确保AK已初始化
             for motor in AK.motors:
                 motor.disable()
+        release_bus(AK.bus)  # 先停止后台接收线程
         AK.bus.shutdown()  # 正确关闭总线
         logging.info("CAN总线已关闭")
 
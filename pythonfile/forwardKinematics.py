@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# 4自由度机械臂正运动学和雅可比矩阵：由各关节角度计算夹持器末端坐标（X,Y,Z）和俯仰角，
+# 连杆参数和角度定义与 inverseKinematics.IK 相同，可直接由电机位置(parse_received_msg 的反馈)计算；
+# 以 N×4 数组批量计算，适合在控制循环中每周期调用和检查整条轨迹
+
+import logging
+from math import *
+import numpy as np
+from inverseKinematics import IK
+
+# 电机位置与关节角度的换算(同 armMoveIK.motorAngles): motor2 = 1.5708 - theta2(初始状态竖直向上), motor3 与 theta3 反向
+MOTOR2_OFFSET = 1.5708
+# d(关节角度)/d(电机位置)
+MOTOR_SIGN = np.array([1.0, -1.0, -1.0, 1.0])
+
+
+def jointAngles(motors):
+    # 电机位置(弧度, N×4 或长度为4) 转换为关节角度 theta1~theta4(度)
+    motors = np.asarray(motors, dtype=np.float64)
+    joints = np.degrees(motors * MOTOR_SIGN)
+    joints[..., 1] += degrees(MOTOR2_OFFSET)
+    return joints
+
+
+def motorPositions(joints):
+    # 关节角度 theta1~theta4(度, N×4 或长度为4) 转换为电机位置(弧度), 不做 motorAngles 中的4位小数舍入
+    joints = np.radians(np.asarray(joints, dtype=np.float64))
+    joints[..., 1] -= MOTOR2_OFFSET
+    return joints * MOTOR_SIGN
+
+
+class FK:
+    # 连杆参数与 IK 相同
+    l1 = IK.l1
+    l2 = IK.l2
+    l3 = IK.l3
+    l4 = IK.l4
+
+    def setLinkLength(self, L1=l1, L2=l2, L3=l3, L4=l4):
+        # 更改机械臂的连杆长度，需与逆运动学使用的长度一致
+        self.l1 = L1
+        self.l2 = L2
+        self.l3 = L3
+        self.l4 = L4
+
+    def getLinkLength(self):
+        # 获取当前设置的连杆长度
+        return {"L1": self.l1, "L2": self.l2, "L3": self.l3, "L4": self.l4}
+
+    def getPosition(self, angles):
+        # 给定各关节角度(getRotationAngle 返回的字典, 单位度)，返回 ((X, Y, Z), Alpha)，坐标单位cm，Alpha为俯仰角(度)
+        # theta2 为连杆l2与水平面的夹角, 肘关节向下弯曲 theta3, 连杆l3与水平面的夹角为 theta2 - theta3;
+        # 俯仰角沿用 IK 的约定(IK 中 theta4 = Alpha - theta2 - theta3), 即 Alpha = theta2 + theta3 + theta4
+        theta1 = radians(angles["theta1"])
+        a2 = radians(angles["theta2"])
+        a3 = a2 - radians(angles["theta3"])
+        a4 = a2 + radians(angles["theta3"]) + radians(angles["theta4"])
+        r = self.l2 * cos(a2) + self.l3 * cos(a3) + self.l4 * cos(a4)   # 末端到底座转轴的水平距离
+        Z = self.l1 + self.l2 * sin(a2) + self.l3 * sin(a3) + self.l4 * sin(a4)
+        return (r * cos(theta1), r * sin(theta1), Z), degrees(a4)
+
+    def getPositionBatch(self, joints):
+        # 批量计算: joints 为 N×4 的关节角度数组(theta1~theta4, 度)
+        # 返回 (coordinates, Alpha): coordinates 为 N×3 的末端坐标(cm), Alpha 为 N 个俯仰角(度)
+        joints = np.radians(np.asarray(joints, dtype=np.float64).reshape(-1, 4))
+        theta1 = joints[:, 0]
+        a2 = joints[:, 1]
+        a3 = a2 - joints[:, 2]
+        a4 = a2 + joints[:, 2] + joints[:, 3]
+        r = self.l2 * np.cos(a2) + self.l3 * np.cos(a3) + self.l4 * np.cos(a4)
+        Z = self.l1 + self.l2 * np.sin(a2) + self.l3 * np.sin(a3) + self.l4 * np.sin(a4)
+        return np.column_stack((r * np.cos(theta1), r * np.sin(theta1), Z)), np.degrees(a4)
+
+    def getJacobianBatch(self, joints):
+        # 批量计算雅可比矩阵: joints 为 N×4 的关节角度数组(度)
+        # 返回 N×4×4 数组, 行依次为 X, Y, Z(cm) 和俯仰角(弧度), 列为 theta1~theta4(弧度) 的偏导数,
+        # 即 [dX, dY, dZ, dAlpha] = J @ [dtheta1, dtheta2, dtheta3, dtheta4]
+        joints = np.radians(np.asarray(joints, dtype=np.float64).reshape(-1, 4))
+        theta1 = joints[:, 0]
+        a2 = joints[:, 1]
+        a3 = a2 - joints[:, 2]
+        a4 = a2 + joints[:, 2] + joints[:, 3]
+        c2, c3, c4 = self.l2 * np.cos(a2), self.l3 * np.cos(a3), self.l4 * np.cos(a4)
+        s2, s3, s4 = self.l2 * np.sin(a2), self.l3 * np.sin(a3), self.l4 * np.sin(a4)
+        r = c2 + c3 + c4
+        # 水平距离 r 和高度 Z 对 theta2~theta4 的偏导数(theta3 使 l3 向下、l4 向上转动)
+        dr = np.column_stack((-(s2 + s3 + s4), s3 - s4, -s4))
+        dz = np.column_stack((r, c4 - c3, c4))
+        cos1, sin1 = np.cos(theta1), np.sin(theta1)
+        J = np.zeros((len(joints), 4, 4))
+        J[:, 0, 0] = -r * sin1
+        J[:, 1, 0] = r * cos1
+        J[:, 0, 1:] = cos1[:, None] * dr
+        J[:, 1, 1:] = sin1[:, None] * dr
+        J[:, 2, 1:] = dz
+        J[:, 3, 1:] = 1.0
+        return J
+
+    def getJacobian(self, angles):
+        # 给定各关节角度(getRotationAngle 返回的字典)，返回 4×4 雅可比矩阵，定义同 getJacobianBatch
+        return self.getJacobianBatch(
+            [angles["theta1"], angles["theta2"], angles["theta3"], angles["theta4"]])[0]
+
+    def getMotorPositionBatch(self, motors):
+        # 由电机位置(弧度, N×4, 例如各电机反馈的位置)计算末端坐标和俯仰角, 返回值同 getPositionBatch
+        return self.getPositionBatch(jointAngles(motors))
+
+    def getMotorJacobianBatch(self, motors):
+        # 对电机位置(弧度)的雅可比矩阵, N×4×4; 笛卡尔速度控制时由末端速度求各电机速度:
+        # np.linalg.solve(J, [vx, vy, vz, 俯仰角速度])
+        return self.getJacobianBatch(jointAngles(motors)) * MOTOR_SIGN
+
+
+def main():
+    # 初始化日志系统
+    logging.basicConfig(
+        level=logging.INFO,  # CRITICAL, ERROR, WARNING, INFO, DEBUG
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    fk = FK()
+    ik = IK()
+    print('连杆长度：', fk.getLinkLength())
+    for coordinate_data, alpha in (((0, 0, ik.l1 + ik.l2 + ik.l3 + ik.l4), 90), ((0, 33.775, 33.2), 30),
+                                   ((10, 20, 15), -20)):
+        angles = ik.getRotationAngle(coordinate_data, alpha)
+        print(coordinate_data, alpha, '->', angles, '->', fk.getPosition(angles))
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,88 @@
 # 仅求解给定的一组坐标和俯仰角对应的数据，无解则返回False
 
 import logging
+import threading
+from collections import OrderedDict
 from math import *
+import numpy as np
+
+# 批量求解时, 与标量求解结果可能不同的判定阈值:
+# 保留4位小数前的值距离舍入边界(第4位小数的 0.5)小于 TIE_TOL 个单位, 或 acos 的参数距离 ±1 小于 ACOS_EDGE 时,
+# 浮点误差可能改变结果, 这些点改用标量求解
+TIE_TOL = 1e-6
+ACOS_EDGE = 1e-6
+# 保留4位小数后的余弦值只有 20001 种, 查表可与 math.acos 的结果完全一致
+_ACOS_TABLE = np.array([acos(k / 10000) for k in range(-10000, 10001)])
+# getRotationAngle 先把 AC、CF 保留4位小数再判断, 可行集比几何约束略大(最多半个单位 0.00005);
+# 解析求俯仰角区间时约束放宽 PITCH_SLACK(cm), 略小于该余量, 使连杆恰好伸直等只有一个可行俯仰角的目标也能求出区间
+PITCH_SLACK = 4e-5
+
+
+def _round4(values):
+    # 与 round(x, 4) 相同(非舍入边界附近时)
+    return np.rint(values * 1e4) / 1e4
+
+
+def _near_tie(values):
+    scaled = np.abs(values) * 1e4
+    return np.abs(scaled - np.floor(scaled) - 0.5) < TIE_TOL
+
+
+def _table_acos(rounded):
+    # rounded 为 _round4 的结果且在 [-1, 1] 内
+    return _ACOS_TABLE[np.rint(rounded * 1e4).astype(np.int64) + 10000]
+
+class IKCache:
+    # 逆运动学结果的LRU缓存：键为量化后的(求解类型, 坐标, 俯仰角等参数, 连杆长度)，超过容量时淘汰最久未使用的项
+    # 量化分辨率 resolution 与求解结果保留的4位小数相当，差异小于分辨率的目标视为同一目标
+    def __init__(self, maxsize=4096, resolution=1e-4):
+        self.maxsize = maxsize
+        self.resolution = resolution
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, kind, values, links):
+        # 各数值按分辨率量化为整数; 连杆长度原样作为键的一部分
+        scale = 1.0 / self.resolution
+        return kind, tuple([round(v * scale) for v in values]), links
+
+    def get(self, key):
+        # 返回 (命中与否, 缓存的结果)，命中时把该项移到最近使用的一端
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return True, self._items[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        # 返回命中统计
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
 
 class IK:
     # 电机从下往上数
@@ -13,6 +94,7 @@ class IK:
     l2 = 14.5   # 第二个电机到第三个电机的距离14.5cm
     l3 = 14.5    #第三个电机到第四个电机的距离14.5cm
     l4 = 10    # 第四个电机到手爪末端距离10cm
+    cache = None    # IKCache, 由 setCache 启用
 
     def setLinkLength(self, L1=l1, L2=l2, L3=l3, L4=l4):
         # 更改机械臂的连杆长度，为了适配相同结构不同长度的机械臂
@@ -20,13 +102,35 @@ class IK:
         self.l2 = L2
         self.l3 = L3
         self.l4 = L4
+        if self.cache is not None:
+            self.cache.clear()  # 几何参数改变, 缓存的解全部失效
 
     def getLinkLength(self):
         # 获取当前设置的连杆长度
             return {"L1":self.l1, "L2":self.l2, "L3":self.l3, "L4":self.l4}
 
+    def setCache(self, maxsize=4096, resolution=1e-4):
+        # 启用逆运动学结果缓存(getRotationAngle 和 getClosestPitch)，maxsize为0时关闭
+        # resolution为坐标(cm)和角度(度)的量化分辨率
+        self.cache = IKCache(maxsize, resolution) if maxsize else None
+
+    def getCacheStats(self):
+        # 获取缓存的命中统计，未启用缓存时返回None
+        return None if self.cache is None else self.cache.stats()
+
     def getRotationAngle(self, coordinate_data, Alpha):
-        # 给定指定坐标和俯仰角，返回每个关节应该旋转的角度，如果无解返回False
+        # 给定指定坐标和俯仰角，返回每个关节应该旋转的角度，如果无解返回False，启用缓存时先查缓存
+        if self.cache is None:
+            return self._getRotationAngle(coordinate_data, Alpha)
+        key = self.cache.key("angle", (*coordinate_data, Alpha), (self.l1, self.l2, self.l3, self.l4))
+        hit, result = self.cache.get(key)
+        if not hit:
+            result = self._getRotationAngle(coordinate_data, Alpha)  # 无解的False也缓存
+            self.cache.put(key, result)
+        return dict(result) if result else result  # 返回副本, 调用方修改不影响缓存
+
+    def _getRotationAngle(self, coordinate_data, Alpha):
+        # 求解本身(不经过缓存)，参数和返回值同 getRotationAngle
         # coordinate_data为夹持器末端坐标（即目标点坐标），坐标单位cm， 以元组形式传入，例如(0, 5, 10)
         # Alpha为夹持器与水平面的夹角，单位度
 
@@ -77,6 +181,151 @@ class IK:
 
         return {"theta4": theta4, "theta3": theta3, "theta2": theta2, "theta1": theta1}  # 有解时返回角度字典
 
+    def getRotationAngleBatch(self, coordinates, Alpha):
+        # 批量求解: coordinates 为 N×3 的坐标数组(cm), Alpha 为俯仰角(度), 标量或长度为 N 的数组
+        # 返回 (angles, feasible): angles 为 N×4 数组, 列依次为 theta1~theta4, 无解的行为 NaN;
+        # feasible 为 N 个布尔值。结果与逐点调用 getRotationAngle(不启用缓存时)完全相同
+        # (标量求解中除零或 acos 越界抛出异常的点视为无解)
+        coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+        X, Y, Z = coordinates[:, 0], coordinates[:, 1], coordinates[:, 2]
+        Alpha = np.broadcast_to(np.asarray(Alpha, dtype=np.float64), X.shape)
+        l1, l2, l3, l4 = self.l1, self.l2, self.l3, self.l4
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            theta1_raw = np.degrees(np.arctan2(Y, X))
+            P_O = np.sqrt(X * X + Y * Y)
+            CD = l4 * np.cos(np.radians(Alpha))
+            PD = l4 * np.sin(np.radians(Alpha))
+            AF = P_O - CD
+            CF = Z - l1 - PD
+            AC = np.sqrt(AF * AF + CF * CF)
+            CF_r = _round4(CF)
+            AC_r = _round4(AC)
+            cos_ABC_raw = (-AC * AC + pow(l2, 2) + pow(l3, 2)) / (2 * l2 * l3)
+            cos_ABC = _round4(cos_ABC_raw)
+            AF_AC = AF / AC
+            cos_BAC_raw = (AC * AC + pow(l2, 2) - pow(l3, 2)) / (2 * l2 * AC)
+            cos_BAC = _round4(cos_BAC_raw)
+
+            feasible = ~(CF_r < -l1) & ~(l2 + l3 < AC_r) & (np.abs(cos_ABC) <= 1) \
+                & (np.abs(cos_BAC) <= 1) & np.isfinite(AF_AC) & (np.abs(AF_AC) <= 1)
+            ABC = np.where(feasible, cos_ABC, 0.0)
+            theta3 = 180.0 - np.degrees(_table_acos(ABC))
+            CAF = np.arccos(np.where(feasible, AF_AC, 0.0))
+            BAC = _table_acos(np.where(feasible, cos_BAC, 0.0))
+            zf_flag = np.where(CF < 0, -1.0, 1.0)
+            theta2_raw = np.degrees(CAF * zf_flag + BAC)
+            theta2 = _round4(theta2_raw)
+            theta4_raw = Alpha - theta2 - theta3
+            theta4 = _round4(theta4_raw)
+
+        # 浮点误差可能改变结果的点改用标量求解
+        fallback = _near_tie(theta1_raw) | _near_tie(CF) | _near_tie(AC) | _near_tie(cos_ABC_raw) \
+            | ((np.abs(CF) < TIE_TOL) | ~np.isfinite(AF_AC) | (np.abs(np.abs(AF_AC) - 1) < ACOS_EDGE)
+               | _near_tie(cos_BAC_raw) | _near_tie(theta2_raw))
+        # theta4 的输入已与标量求解一致, 只需按 round() 处理舍入边界
+        for i in np.flatnonzero(_near_tie(theta4_raw) & feasible & ~fallback):
+            theta4[i] = round(theta4_raw[i], 4)
+
+        angles = np.column_stack((_round4(theta1_raw), theta2, theta3, theta4))
+        angles[~feasible] = np.nan
+        for i in np.flatnonzero(fallback):
+            try:
+                result = self._getRotationAngle((float(X[i]), float(Y[i]), float(Z[i])), float(Alpha[i]))
+            except (ValueError, ZeroDivisionError):
+                result = False
+            feasible[i] = result is not False
+            angles[i] = [result["theta1"], result["theta2"], result["theta3"], result["theta4"]] \
+                if result else np.nan
+        return angles, feasible
+
+    def _pitchFeasible(self, r, h, alpha):
+        # 解析判断俯仰角 alpha(度) 是否可行: 腕关节C不低于地面, 且肩关节A到C的距离在 [|l2-l3|, l2+l3] 内
+        a = radians(alpha)
+        AF = r - self.l4 * cos(a)
+        CF = h - self.l4 * sin(a)
+        AC = sqrt(AF * AF + CF * CF)
+        return CF >= -self.l1 - PITCH_SLACK and \
+            abs(self.l2 - self.l3) - PITCH_SLACK <= AC <= self.l2 + self.l3 + PITCH_SLACK
+
+    def getPitchIntervals(self, coordinate_data, alpha1=-180.0, alpha2=180.0):
+        # 解析求出给定坐标在俯仰角范围 [alpha1, alpha2] 内的可行区间, 返回 [(起点, 终点), ...](度), 无解返回空列表
+        # 腕关节C在以 Q(P_O, Z - l1) 为圆心、l4 为半径的圆上, AC 的约束对应 alpha 与 Q 的方向角之差的余弦范围,
+        # 地面约束对应 sin(alpha) 的上限; 区间端点与 getRotationAngle 的舍入判断可能相差约 0.001 度
+        X, Y, Z = coordinate_data
+        lo, hi = min(alpha1, alpha2), max(alpha1, alpha2)
+        r = sqrt(X * X + Y * Y)
+        h = Z - self.l1
+        Q = sqrt(r * r + h * h)
+        phi = degrees(atan2(h, r))
+        critical = []
+        if Q > 0:
+            for R in (max(abs(self.l2 - self.l3) - PITCH_SLACK, 0.0), self.l2 + self.l3 + PITCH_SLACK):
+                c = (Q * Q + self.l4 * self.l4 - R * R) / (2 * self.l4 * Q)
+                if -1 < c < 1:
+                    critical += [phi + degrees(acos(c)), phi - degrees(acos(c))]
+        s = (Z + PITCH_SLACK) / self.l4
+        if -1 < s < 1:
+            critical += [degrees(asin(s)), 180.0 - degrees(asin(s))]
+        # 端点按 360 度周期展开到范围内, 相邻端点之间可行性不变, 取中点判断
+        points = {lo, hi}
+        for c in critical:
+            k = ceil((lo - c) / 360.0)
+            while c + k * 360.0 <= hi:
+                points.add(c + k * 360.0)
+                k += 1
+        points = sorted(points)
+        intervals = []
+        for a, b in zip(points[:-1], points[1:]):
+            if not self._pitchFeasible(r, h, (a + b) / 2):
+                continue
+            if intervals and intervals[-1][1] == a:
+                intervals[-1] = (intervals[-1][0], b)
+            else:
+                intervals.append((a, b))
+        if not intervals and lo == hi and self._pitchFeasible(r, h, lo):
+            intervals.append((lo, hi))
+        return intervals
+
+    def getClosestPitch(self, coordinate_data, alpha, alpha1, alpha2, tol=0.001):
+        # 在俯仰角范围 [alpha1, alpha2] 内寻找最接近 alpha 的可行俯仰角, 返回 (俯仰角, getRotationAngle 的结果), 无解返回False
+        # 启用缓存时先查缓存
+        if self.cache is None:
+            return self._getClosestPitch(coordinate_data, alpha, alpha1, alpha2, tol)
+        key = self.cache.key("pitch", (*coordinate_data, alpha, alpha1, alpha2, tol),
+                             (self.l1, self.l2, self.l3, self.l4))
+        hit, result = self.cache.get(key)
+        if not hit:
+            result = self._getClosestPitch(coordinate_data, alpha, alpha1, alpha2, tol)
+            self.cache.put(key, result)
+        return (result[0], dict(result[1])) if result else result
+
+    def _getClosestPitch(self, coordinate_data, alpha, alpha1, alpha2, tol=0.001):
+        # 先解析求可行区间, 再用 getRotationAngle 确认; 落在区间端点时在端点和区间内部之间二分, 精度为 tol 度
+        candidates = []
+        for a, b in self.getPitchIntervals(coordinate_data, alpha1, alpha2):
+            nearest = min(max(alpha, a), b)
+            # 端点处的舍入判断可能不同, 以区间内部的点作为二分的可行一侧
+            inner = min(max(alpha, a + min(1.0, (b - a) / 2)), b - min(1.0, (b - a) / 2))
+            candidates.append((abs(nearest - alpha), nearest, inner))
+        for _, nearest, inner in sorted(candidates):
+            result = self._getRotationAngle(coordinate_data, nearest)
+            if result:
+                return nearest, result
+            good = self._getRotationAngle(coordinate_data, inner)
+            if not good:
+                continue
+            bad = nearest
+            while abs(inner - bad) > tol:
+                mid = (inner + bad) / 2
+                result = self._getRotationAngle(coordinate_data, mid)
+                if result:
+                    inner, good = mid, result
+                else:
+                    bad = mid
+            return inner, good
+        return False
+
 def main():
     # 初始化日志系统
     logging.basicConfig(
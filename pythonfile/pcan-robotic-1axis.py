@@ -10,6 +10,7 @@ import can
 # 添加pcan_cybergear库的路径
 sys.path.append(os.path.join("..", "cybergear"))
 from pcan_cybergear import CANMotorController
+from can_dispatcher import release_bus
 
 
 def main():
@@ -80,6 +81,7 @@ def main():
     finally:
         # 确保关闭CAN总线连接
         if 'bus' in locals():
+            release_bus(bus)  # 先停止后台接收线程
             bus.shutdown()
             logging.info("CAN总线已关闭")
 
@@ -10,6 +10,9 @@ import can
 # 添加pcan_cybergear库的路径
 sys.path.append(os.path.join("..", "cybergear"))
 from pcan_cybergear import CANMotorController
+from can_dispatcher import release_bus
+from commissioning import DEFAULT_PROFILE
+from config_snapshot import warm_start
 
 # 初始化日志系统
 logging.basicConfig(
@@ -17,6 +20,8 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+FULL_COMMISSION = False  # 为 True 时忽略配置快照，完整重新配置所有电机并设置零点
+
 def init_motors():
     """
     初始化CAN总线和电机控制器
@@ -39,22 +44,10 @@ def init_motors():
         motors = [motor1, motor2, motor3, motor4]
         logging.info("电机控制器初始化完成")
 
-        # 配置电机参数（符合CANopen SDO参数配置规范）
-        for motor in motors:
-            motor.write_param_table("limit_cur", 3)  # 电流限制
-            motor.write_param_table("loc_kp", 8)  # 位置环比例增益
-            motor.write_param_table("spd_kp", 2)  # 速度环比例增益
-            motor.write_param_table("spd_ki", 0.03)  # 速度环积分增益
-            motor.write_single_param("limit_spd", value=0.5)  # 最大速度限制
-            motor.disable()  # 进入SWITCH_ON_DISABLED状态
-            motor.set_0_pos()  # 设置机械零点
-        logging.info("电机参数配置完成并设置零点")
-
-        # 设置为位置控制模式（符合DSP402运动控制协议）
-        for motor in motors:
-            motor.set_run_mode(motor.RunModes.POSITION_MODE)
-            motor.enable()  # 进入OPERATION_ENABLED状态
-        logging.info("位置控制模式已启用")
+        # 按调试配置并发配置所有电机（参数表、最大速度、停止、设置零点、位置模式、使能），并读回校验
+        # 电机保持上电且配置与上次一致时只重写有差异的参数，不再停止和重新设置零点
+        warm_start(motors, DEFAULT_PROFILE, full=FULL_COMMISSION)
+        logging.info("电机参数配置完成并设置零点，位置控制模式已启用")
 
         return bus, motors
 
@@ -105,6 +98,7 @@ def main():
     finally:
         # 确保关闭CAN总线连接
         if 'bus' in locals():
+            release_bus(bus)  # 先停止后台接收线程
             bus.shutdown()
             logging.info("CAN总线已关闭")
 
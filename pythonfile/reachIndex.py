@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# 机械臂可达空间索引：离线按当前连杆长度扫描工作空间，保存每个网格点的可行俯仰角区间和参考关节解，
+# 运行时查表即可判断目标是否可达、可行的俯仰角范围以及最近的可达点（微秒级，不调用逆运动学求解）
+# 工作空间绕底座转轴对称（theta1 只决定方位），因此只需在 (r, z) 平面上建立网格，r 为目标到转轴的水平距离
+# 用法: python reachIndex.py build [--resolution 0.5] [--alpha -90 90] [-o 索引.npy]
+#       python reachIndex.py query X Y Z [-i 索引.npy]
+
+import os
+import json
+import time
+import logging
+import argparse
+from math import *
+import numpy as np
+from inverseKinematics import IK
+
+INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cybergear", "reach_index.npy")
+INDEX_VERSION = 1
+MAX_INTERVALS = 3   # 每个网格点最多保存的俯仰角区间数
+# 每个网格点: 可行俯仰角区间(度, 不足的用 NaN 填充)、参考解(俯仰角, theta2, theta3, theta4)、最近可达网格点的下标,
+# 以及以该点为左下角的网格单元的状态(四个角点均不可达/部分可达/均可达)
+CELL_DTYPE = np.dtype([
+    ("pitch", "<f4", (MAX_INTERVALS, 2)),
+    ("seed", "<f4", (4,)),
+    ("nearest", "<i4", (2,)),
+    ("state", "u1"),
+])
+OUTSIDE, BOUNDARY, INSIDE = 0, 1, 2
+
+
+def sidecarPath(path):
+    # 索引的元数据(网格、连杆长度、俯仰角范围)保存在同名的 .json 文件中
+    return os.path.splitext(path)[0] + ".json"
+
+
+def _borderNodes(reachable):
+    # 可达区域边界上的网格点(下标, K×2): 本身可达且上下左右至少有一个不可达
+    padded = np.pad(reachable, 1, constant_values=False)
+    interior = (padded[:-2, 1:-1] & padded[2:, 1:-1] & padded[1:-1, :-2] & padded[1:-1, 2:])
+    return np.argwhere(reachable & ~interior)
+
+
+def _nearestReachable(reachable, chunk=4096):
+    # 对每个网格点求最近的可达网格点(下标)，不可达点的最近可达点一定在可达区域的边界上，只与边界点比较
+    border = _borderNodes(reachable)
+    if len(border) == 0:
+        return np.full(reachable.shape + (2,), -1, dtype=np.int32)
+    # 可达点的最近可达点为自身
+    cells = np.argwhere(np.ones_like(reachable))
+    result = cells.copy()
+    todo = np.flatnonzero(~reachable.ravel())
+    for start in range(0, len(todo), chunk):
+        rows = todo[start:start + chunk]
+        d = ((cells[rows, None, :] - border[None, :, :]) ** 2).sum(axis=2)
+        result[rows] = border[np.argmin(d, axis=1)]
+    return result.reshape(reachable.shape + (2,)).astype(np.int32)
+
+
+def buildIndex(path=INDEX_PATH, ik=None, resolution=0.5, alpha1=-90.0, alpha2=90.0):
+    # 扫描工作空间并保存索引, 返回 ReachIndex
+    # ik: 使用其连杆长度, 默认为 IK()
+    # resolution: 网格间距(cm)
+    # alpha1, alpha2: 俯仰角范围(度), 只在该范围内求可行区间
+    ik = ik if ik is not None else IK()
+    links = ik.getLinkLength()
+    reach = links["L2"] + links["L3"] + links["L4"]
+    # r 从转轴到最大伸展距离, z 从末端最低(俯仰角-90度时低于地面 l4)到最高点, 各留一格余量
+    z0 = -links["L4"] - resolution
+    nr = int(ceil(reach / resolution)) + 2
+    nz = int(ceil((links["L1"] + reach - z0) / resolution)) + 2
+    cells = np.zeros((nr, nz), dtype=CELL_DTYPE)
+    cells["pitch"] = np.nan
+    cells["seed"] = np.nan
+
+    t0 = time.perf_counter()
+    truncated = 0
+    seeds = []
+    for i in range(nr):
+        for j in range(nz):
+            r, z = i * resolution, z0 + j * resolution
+            intervals = ik.getPitchIntervals((r, 0, z), alpha1, alpha2)
+            if not intervals:
+                continue
+            if len(intervals) > MAX_INTERVALS:
+                truncated += 1
+                intervals = intervals[:MAX_INTERVALS - 1] + [(intervals[MAX_INTERVALS - 1][0], intervals[-1][1])]
+            cells["pitch"][i, j, :len(intervals)] = intervals
+            # 参考解取最宽区间的中点, 离边界最远
+            a, b = max(intervals, key=lambda ab: ab[1] - ab[0])
+            seeds.append((i, j, r, z, (a + b) / 2))
+    if seeds:
+        seeds = np.array(seeds)
+        angles, feasible = ik.getRotationAngleBatch(
+            np.column_stack((seeds[:, 2], np.zeros(len(seeds)), seeds[:, 3])), seeds[:, 4])
+        for (i, j, r, z, alpha), theta, ok in zip(seeds, angles, feasible):
+            if not ok:
+                # 区间很窄时中点也可能因舍入无解, 改为求区间内最接近的可行俯仰角
+                found = ik.getClosestPitch((r, 0, z), alpha, alpha1, alpha2)
+                if not found:
+                    cells["pitch"][int(i), int(j)] = np.nan
+                    continue
+                alpha, result = found
+                theta = (0.0, result["theta2"], result["theta3"], result["theta4"])
+            cells["seed"][int(i), int(j)] = (alpha, theta[1], theta[2], theta[3])
+    reachable = ~np.isnan(cells["pitch"][:, :, 0, 0])
+    cells["nearest"] = _nearestReachable(reachable)
+    corners = (reachable[:-1, :-1].astype(np.uint8) + reachable[1:, :-1] + reachable[:-1, 1:] + reachable[1:, 1:])
+    cells["state"][:-1, :-1] = np.where(corners == 4, INSIDE, np.where(corners > 0, BOUNDARY, OUTSIDE))
+    elapsed = time.perf_counter() - t0
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.save(path, cells)
+    meta = {
+        "version": INDEX_VERSION,
+        "links": links,
+        "resolution": resolution,
+        "r0": 0.0,
+        "z0": z0,
+        "shape": [nr, nz],
+        "alpha": [alpha1, alpha2],
+        "reachable": int(reachable.sum()),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "build_seconds": elapsed,
+    }
+    with open(sidecarPath(path), "w") as f:
+        json.dump(meta, f, indent=2)
+    if truncated:
+        logging.warning(f"{truncated} cells had more than {MAX_INTERVALS} pitch intervals, the last ones were merged")
+    logging.info(f"Built reach index {nr}x{nz} ({meta['reachable']} reachable) in {elapsed:.1f} s: {path}")
+    return ReachIndex(path)
+
+
+class ReachIndex:
+    # 查询离线建立的可达空间索引: 目标所在网格单元的四个角点均可达或均不可达时直接查表,
+    # 角点部分可达(可达区域的边界)时用 IK.getPitchIntervals 解析求解, 因此是否可达的判断与求解一致;
+    # 俯仰角范围和参考解取最近的网格点的值(边界单元除外), 是近似值, 精确的解仍用 IK.getClosestPitch 求解
+    def __init__(self, path=INDEX_PATH, ik=None):
+        # 以 memmap 方式打开索引; 给出 ik 时检查其连杆长度与建立索引时一致
+        with open(sidecarPath(path)) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported reach index version: {self.meta.get('version')}")
+        if ik is not None and ik.getLinkLength() != self.meta["links"]:
+            raise ValueError(f"Reach index was built for links {self.meta['links']}, "
+                             f"current links are {ik.getLinkLength()}")
+        # 数据仍在 memmap 中, 字段改为普通 ndarray 视图, 避免按元素索引时 memmap 子类的额外开销
+        self.cells = np.load(path, mmap_mode="r")
+        cells = np.asarray(self.cells)
+        self.pitch = cells["pitch"]
+        self.seed = cells["seed"]
+        self.nearest = cells["nearest"]
+        self.state = cells["state"]
+        self.resolution = self.meta["resolution"]
+        self.z0 = self.meta["z0"]
+        self.nr, self.nz = self.meta["shape"]
+        self.alpha1, self.alpha2 = self.meta["alpha"]
+        # 边界网格点的 (r, z) 坐标, 用于求不可达目标(包括网格范围以外的目标)的最近可达点
+        border = _borderNodes(~np.isnan(self.pitch[:, :, 0, 0]))
+        self.border = np.column_stack((border[:, 0] * self.resolution, self.z0 + border[:, 1] * self.resolution))
+        # 边界单元的解析求解使用建立索引时的连杆长度
+        links = self.meta["links"]
+        self.ik = IK()
+        self.ik.setLinkLength(links["L1"], links["L2"], links["L3"], links["L4"])
+
+    def _cell(self, coordinate_data):
+        # 返回 (网格单元左下角的下标, 最近的网格点下标); 网格四周各留有一格不可达的余量, 超出网格时取边缘即为不可达
+        X, Y, Z = coordinate_data
+        u = sqrt(X * X + Y * Y) / self.resolution
+        v = (Z - self.z0) / self.resolution
+        i = min(int(u), self.nr - 2)
+        j = min(max(int(floor(v)), 0), self.nz - 2)
+        return (i, j), (min(int(u + 0.5), self.nr - 1), min(max(int(floor(v + 0.5)), 0), self.nz - 1))
+
+    def _node(self, coordinate_data):
+        # 目标可达时返回用于查表的网格点下标(最近的网格点不可达时取离它最近的可达点), 不可达时返回None
+        cell, node = self._cell(coordinate_data)
+        state = self.state[cell]
+        if state == BOUNDARY:
+            if not self.ik.getPitchIntervals(coordinate_data, self.alpha1, self.alpha2):
+                return None
+        elif state == OUTSIDE:
+            return None
+        if isnan(self.pitch[node[0], node[1], 0, 0]):
+            node = tuple(self.nearest[node].tolist())
+        return node
+
+    def isReachable(self, coordinate_data):
+        # 目标在建立索引时的俯仰角范围内是否有解
+        return self._node(coordinate_data) is not None
+
+    def getPitchRange(self, coordinate_data):
+        # 返回可行的俯仰角区间 [(起点, 终点), ...](度)，不可达时返回空列表; 边界单元内为解析求出的精确区间
+        cell, _ = self._cell(coordinate_data)
+        if self.state[cell] == BOUNDARY:
+            return self.ik.getPitchIntervals(coordinate_data, self.alpha1, self.alpha2)
+        node = self._node(coordinate_data)
+        if node is None:
+            return []
+        return [(a, b) for a, b in self.pitch[node].tolist() if a == a]
+
+    def getSeed(self, coordinate_data):
+        # 返回参考解 (俯仰角, 与 getRotationAngle 格式相同的关节角度字典)，可作为求解或运动规划的初值，不可达时返回False
+        node = self._node(coordinate_data)
+        if node is None:
+            return False
+        alpha, theta2, theta3, theta4 = self.seed[node].tolist()
+        X, Y, Z = coordinate_data
+        return alpha, {"theta4": theta4, "theta3": theta3, "theta2": theta2,
+                       "theta1": round(degrees(atan2(Y, X)), 4)}
+
+    def getNearestReachable(self, coordinate_data):
+        # 返回最近的可达点坐标 (X, Y, Z)，目标可达时返回目标本身，整个索引都不可达时返回False
+        # 按目标实际的 (r, z) 与各边界网格点比较距离, 不使用截断到网格边缘的网格点
+        if self.isReachable(coordinate_data):
+            return tuple(coordinate_data)
+        if len(self.border) == 0:
+            return False
+        X, Y, Z = coordinate_data
+        d = ((self.border - (sqrt(X * X + Y * Y), Z)) ** 2).sum(axis=1)
+        r, z = self.border[np.argmin(d)].tolist()
+        theta = atan2(Y, X)
+        return r * cos(theta), r * sin(theta), z
+
+
+def main():
+    # 初始化日志系统
+    logging.basicConfig(
+        level=logging.INFO,  # CRITICAL, ERROR, WARNING, INFO, DEBUG
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Arm reachability index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="sweep the workspace with the current link lengths")
+    build.add_argument("-o", "--output", default=INDEX_PATH)
+    build.add_argument("--resolution", type=float, default=0.5, help="grid spacing (cm)")
+    build.add_argument("--alpha", type=float, nargs=2, default=(-90.0, 90.0), help="pitch range (deg)")
+    query = sub.add_parser("query", help="look up a target (cm)")
+    query.add_argument("xyz", type=float, nargs=3)
+    query.add_argument("-i", "--index", default=INDEX_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        buildIndex(args.output, resolution=args.resolution, alpha1=args.alpha[0], alpha2=args.alpha[1])
+    else:
+        index = ReachIndex(args.index, IK())
+        target = tuple(args.xyz)
+        print('可达:', index.isReachable(target))
+        print('俯仰角范围:', index.getPitchRange(target))
+        print('参考解:', index.getSeed(target))
+        print('最近可达点:', index.getNearestReachable(target))
+
+if __name__ == '__main__':
+    main()
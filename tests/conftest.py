@@ -0,0 +1,44 @@
+# 测试公共设置：与脚本相同, 直接导入 cybergear 和 pythonfile 目录下的模块;
+# 需要电机应答的测试在进程内的 virtual 总线上运行 CyberGearSimulator
+import os
+import sys
+import uuid
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ("cybergear", "pythonfile"):
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+import can
+from can_dispatcher import release_bus
+from simulator import CyberGearSimulator
+
+MOTOR_IDS = (101, 102)
+
+
+@pytest.fixture
+def channel():
+    # 每个测试使用独立的 virtual 通道, 互不干扰
+    return f"test_{uuid.uuid4().hex}"
+
+
+@pytest.fixture
+def sim(channel):
+    with CyberGearSimulator(MOTOR_IDS, channel=channel) as simulator:
+        yield simulator
+
+
+@pytest.fixture
+def bus(channel):
+    bus = can.Bus(interface="virtual", channel=channel)
+    yield bus
+    release_bus(bus)
+    bus.shutdown()
+
+
+@pytest.fixture
+def peer(channel):
+    # 同一通道上的另一端, 代替电机发出帧
+    peer = can.Bus(interface="virtual", channel=channel)
+    yield peer
+    peer.shutdown()
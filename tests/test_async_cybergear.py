@@ -0,0 +1,83 @@
+import asyncio
+import can
+from async_cybergear import AsyncBusDispatcher, AsyncCANMotorController
+
+
+def run(bus, coro_fn):
+    # 在新的事件循环中运行, 结束时停止该总线的异步分发器
+    async def main():
+        try:
+            return await coro_fn()
+        finally:
+            AsyncBusDispatcher.for_bus(bus).stop()
+    return asyncio.run(main())
+
+
+def test_enable_and_control(sim, bus):
+    async def main():
+        motor = AsyncCANMotorController(bus, motor_id=101)
+        motor_id, *_ = await motor.enable()
+        feedback = await motor.send_motor_control_command(0.0, 0.5, 0.0, 50.0, 1.0)
+        return motor_id, feedback
+
+    motor_id, feedback = run(bus, main)
+    assert motor_id == 101
+    assert feedback[0] == 101
+    assert sim.motors[101].enabled
+
+
+def test_tx_listener_sees_async_frames(sim, bus):
+    sent = []
+
+    async def main():
+        motor = AsyncCANMotorController(bus, motor_id=102)
+        motor.dispatcher.add_tx_listener(sent.append)
+        await motor.enable()
+        await motor.disable()
+
+    run(bus, main)
+    assert [(m.arbitration_id >> 24) & 0x1F for m in sent] == [
+        AsyncCANMotorController.CmdModes.MOTOR_ENABLE, AsyncCANMotorController.CmdModes.MOTOR_STOP]
+    assert all(isinstance(m, can.Message) for m in sent)
+
+
+def test_async_write_cache_matches_sync(sim, bus):
+    async def main():
+        motor = AsyncCANMotorController(bus, motor_id=101)
+        await motor.write_single_param("limit_spd", 4.0)
+        sent = sim.frames_received
+        skipped = await motor.write_single_param("limit_spd", 4.0)
+        table = await motor.write_param_table("loc_kp", 8.0)
+        table_skipped = await motor.write_param_table("loc_kp", 8.0)
+        counts = [sim.frames_received - sent]
+        await motor.write_single_param("limit_spd", 4.0, force=True)
+        counts.append(sim.frames_received - sent)
+        await motor.disable()
+        before = sim.frames_received
+        await motor.write_single_param("limit_spd", 4.0)
+        await motor.write_param_table("loc_kp", 8.0)
+        counts.append(sim.frames_received - before)
+        return skipped, table, table_skipped, counts
+
+    skipped, table, table_skipped, counts = run(bus, main)
+    assert skipped[0] == table[0] == table_skipped[0] == 101
+    # 跳过的写入不发帧; force 总是写入; disable 后缓存失效
+    assert counts == [1, 2, 2]
+    assert sim.motors[101].param("limit_spd") == 4.0
+
+
+def test_async_read_params(sim, bus):
+    async def main():
+        motor = AsyncCANMotorController(bus, motor_id=102)
+        value = await motor.read_single_param("limit_spd")
+        sent = sim.frames_received
+        cached = await motor.read_single_param("limit_spd")
+        counts = [sim.frames_received - sent]
+        values = await motor.read_params(["limit_spd", "run_mode", "unknown"], max_age=0)
+        counts.append(sim.frames_received - sent)
+        return value, cached, values, counts
+
+    value, cached, values, counts = run(bus, main)
+    assert abs(value - 2.0) < 1e-6 and cached == value
+    assert values == {"limit_spd": value, "run_mode": 0}
+    assert counts == [0, 2]
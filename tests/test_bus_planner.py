@@ -0,0 +1,56 @@
+import pytest
+from bus_planner import BusPlanner, CmdModes, frame_bits
+
+
+def test_frame_bits_match_known_sizes():
+    # 8 字节帧(含3位帧间隔): 标准帧 111 位、扩展帧 131 位; 最坏位填充时 135 / 160 位
+    assert frame_bits(8, extended=False, stuffing=False) == 111
+    assert frame_bits(8, extended=True, stuffing=False) == 131
+    assert frame_bits(8, extended=False) == 135
+    assert frame_bits(8) == 160
+    assert frame_bits(0, extended=False, stuffing=False) == 47
+    assert frame_bits(0) == 80
+
+
+def test_check_rejects_over_budget():
+    planner = BusPlanner(max_load=0.7)
+    planner.add_stream(CmdModes.MOTOR_CONTROL, 500, [101, 102])
+    budget = planner.check()
+    assert budget["utilization"] <= 0.7
+    assert budget["load"] < budget["utilization"]
+    # 4 个电机 1 kHz 运控需要约 168% 的总线时间
+    planner = BusPlanner(max_load=0.7)
+    planner.add_stream(CmdModes.MOTOR_CONTROL, 1000, [101, 102, 103, 104])
+    with pytest.raises(ValueError):
+        planner.check()
+    with pytest.raises(ValueError):
+        planner.schedule()
+
+
+def test_schedule_spreads_slow_streams():
+    planner = BusPlanner(max_load=0.9)
+    control = planner.add_stream(CmdModes.MOTOR_CONTROL, 1000, [101], label="control")
+    poll = planner.add_stream(CmdModes.SINGLE_PARAM_READ, 250, [101, 102, 103, 104], label="poll")
+    schedule = planner.schedule()
+    assert len(schedule.cycles) == 4
+    assert schedule.major_period == pytest.approx(0.004)
+    # 4 个电机的轮询分散到 4 个小周期, 每个小周期一次运控加一次轮询
+    polled = []
+    for cycle in schedule.cycles:
+        assert [slot.stream for slot in cycle].count(control) == 1
+        polled += [slot.motor_id for slot in cycle if slot.stream is poll]
+        assert len(cycle) == 2
+    assert sorted(polled) == [101, 102, 103, 104]
+    assert max(schedule.utilization()) <= 0.9
+    # 时间片首尾相接, 不重叠
+    for cycle in schedule.cycles:
+        for a, b in zip(cycle, cycle[1:]):
+            assert b.offset == pytest.approx(a.offset + a.duration)
+
+
+def test_schedule_rejects_rate_that_does_not_divide():
+    planner = BusPlanner()
+    planner.add_stream(CmdModes.MOTOR_CONTROL, 300, [101])
+    planner.add_stream(CmdModes.SINGLE_PARAM_READ, 200, [102])
+    with pytest.raises(ValueError):
+        planner.schedule()
@@ -0,0 +1,42 @@
+import struct
+import pytest
+from can_codec import FEATURE_STRUCT, INDEX_STRUCT, compile_format
+
+
+@pytest.mark.parametrize("spec, values", [
+    ("f", (1.5,)),
+    ("f", (-0.25,)),
+    ("u8", (200,)),
+    ("s8", (-100,)),
+    ("u16", (60000,)),
+    ("s16", (-30000,)),
+    ("u32", (4000000000,)),
+    ("s32", (-2000000000,)),
+    ("s16 s32", (-5, 123456)),
+])
+def test_round_trip(spec, values):
+    codec = compile_format(spec)
+    data = codec.encode(*values)
+    # 不足4字节的数据区补零到4字节
+    assert len(data) == max(codec.size, 4)
+    assert codec.decode(data) == values
+
+
+def test_encode_matches_struct_and_casts():
+    assert compile_format("f").encode(2) == struct.pack("<f", 2.0)
+    # 非浮点字段打包前转换为整数
+    assert compile_format("u8").encode(3.0) == b"\x03\x00\x00\x00"
+    assert compile_format("s16 s32").decode(b"\x00" * 2 + compile_format("s16 s32").encode(1, 2), 2) == (1, 2)
+
+
+def test_compiled_codecs_are_cached():
+    assert compile_format("u16") is compile_format("u16")
+    with pytest.raises(ValueError):
+        compile_format("f64")
+
+
+def test_index_and_feature_structs():
+    data = INDEX_STRUCT.pack(0x7005) + compile_format("u8").encode(1)
+    assert INDEX_STRUCT.unpack_from(data)[0] == 0x7005
+    assert compile_format("u8").decode(data, INDEX_STRUCT.size) == (1,)
+    assert FEATURE_STRUCT.unpack(FEATURE_STRUCT.pack(0x3EC, 0x06, 0)) == (0x3EC, 0x06, 0)
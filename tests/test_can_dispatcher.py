@@ -0,0 +1,62 @@
+import can
+from can_codec import INDEX_STRUCT
+from pcan_cybergear import CANMotorController
+
+
+def frame(motor, cmd_mode, data=bytes(8)):
+    # 电机发出的帧: 仲裁ID的 bit8~15 为电机CAN ID
+    return can.Message(arbitration_id=(cmd_mode << 24) | (motor.MOTOR_ID << 8) | motor.MAIN_CAN_ID,
+                       data=data, is_extended_id=True)
+
+
+def test_motors_share_one_dispatcher_and_get_their_own_frames(bus):
+    first = CANMotorController(bus, motor_id=101)
+    second = CANMotorController(bus, motor_id=102)
+    assert first.dispatcher is second.dispatcher
+    first.dispatcher.dispatch(frame(second, first.CmdModes.MOTOR_FEEDBACK))
+    assert first._rx_queue.empty()
+    assert second._rx_queue.get_nowait().arbitration_id >> 8 & 0xFF == 102
+
+
+def test_frames_from_the_bus_are_routed_by_motor_id(bus, peer):
+    motors = [CANMotorController(bus, motor_id=m) for m in (101, 102)]
+    feedback = motors[0].CmdModes.MOTOR_FEEDBACK
+    for n in range(20):
+        motor = motors[n % 2]
+        peer.send(frame(motor, feedback, bytes([n] * 8)))
+    for first_n, motor in enumerate(motors):
+        received = [motor._rx_queue.get(timeout=1).data[0] for _ in range(10)]
+        assert received == list(range(first_n, 20, 2))
+        assert motor._rx_queue.empty()
+
+
+def read_reply(motor, name, value):
+    # 单参数读取的应答: 参数索引 + 参数值
+    info = motor.PARAMETERS[name]
+    return frame(motor, motor.CmdModes.SINGLE_PARAM_READ,
+                 INDEX_STRUCT.pack(info["index"]) + info["codec"].encode(value))
+
+
+def test_reply_is_matched_by_type_and_index(bus, peer):
+    motor = CANMotorController(bus, motor_id=101)
+    modes = motor.CmdModes
+    # 期望的应答之前混入的反馈帧和其他参数的读取应答都被跳过
+    peer.send(frame(motor, modes.MOTOR_FEEDBACK))
+    peer.send(read_reply(motor, "loc_ref", 1.0))
+    peer.send(read_reply(motor, "limit_spd", 4.0))
+    index = motor.PARAMETERS["limit_spd"]["index"]
+    data, arbitration_id = motor.receive_can_message(cmd_mode=modes.SINGLE_PARAM_READ, index=index)
+    assert data[0] | (data[1] << 8) == index
+    assert motor.PARAMETERS["limit_spd"]["codec"].decode(data, 4)[0] == 4.0
+    assert (arbitration_id >> 8) & 0xFF == 101
+
+
+def test_reply_type_follows_request(bus, peer):
+    motor = CANMotorController(bus, motor_id=101)
+    modes = motor.CmdModes
+    peer.send(read_reply(motor, "limit_spd", 4.0))
+    peer.send(frame(motor, modes.MOTOR_FEEDBACK, bytes([1] * 8)))
+    # 使能命令的应答是反馈帧
+    data, _ = motor.receive_can_message(cmd_mode=modes.MOTOR_ENABLE)
+    assert bytes(data) == bytes([1] * 8)
+    assert motor.receive_can_message(timeout=0.05, cmd_mode=modes.MOTOR_ENABLE) == (None, None)
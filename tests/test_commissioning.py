@@ -0,0 +1,49 @@
+import struct
+from commissioning import DEFAULT_PROFILE, Commissioner
+from motor_group import MotorGroup
+from pcan_cybergear import CANMotorController
+from simulator import PARAM_INDEX
+
+# 不含停止/设置零点的配置, 重复执行时写直达缓存保持有效
+NO_SEQUENCE = dict(DEFAULT_PROFILE, sequence=[])
+
+
+def make_group(sim, bus):
+    return MotorGroup([CANMotorController(bus, motor_id=m) for m in sim.motors])
+
+
+def test_run_acknowledges_all_frames(sim, bus):
+    report = Commissioner(make_group(sim, bus)).run()
+    # 4 个参数表项、1 个单参数和 4 个启动命令
+    for motor_id, entry in report.items():
+        assert entry == {"sent": 9, "acked": 9, "mismatched": {}, "ok": True}
+        motor = sim.motors[motor_id]
+        assert motor.enabled
+        assert motor.param("limit_spd") == 0.5
+        assert motor.param("run_mode") == CANMotorController.RunModes.POSITION_MODE.value
+        assert motor.param_table[CANMotorController.PARAM_TABLE["loc_kp"]["feature_code"]] == \
+            struct.pack("<f", 8.0)
+
+
+def test_redundant_writes_are_skipped(sim, bus):
+    commissioner = Commissioner(make_group(sim, bus), NO_SEQUENCE)
+    assert all(entry["sent"] == 5 for entry in commissioner.run(verify=False).values())
+    sent = sim.frames_received
+    report = commissioner.run(verify=False)
+    assert all(entry["sent"] == 0 and entry["ok"] for entry in report.values())
+    assert sim.frames_received == sent
+    report = commissioner.run(verify=False, force=True)
+    assert all(entry["sent"] == entry["acked"] == 5 for entry in report.values())
+    assert sim.frames_received == sent + 10
+
+
+def test_verify_flags_mismatch(sim, bus):
+    commissioner = Commissioner(make_group(sim, bus), NO_SEQUENCE)
+    assert all(entry["ok"] for entry in commissioner.run().values())
+    # 电机上的值被改变(如在上位机中修改), 缓存仍认为写入是多余的, 读回校验发现差异
+    sim.motors[101].params[PARAM_INDEX["limit_spd"]] = 1.0
+    report = commissioner.run()
+    assert report[101]["sent"] == 0
+    assert report[101]["mismatched"] == {"limit_spd": (0.5, 1.0)}
+    assert not report[101]["ok"]
+    assert report[102]["ok"]
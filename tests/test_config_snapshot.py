@@ -0,0 +1,100 @@
+import copy
+import uuid
+import can
+from can_dispatcher import release_bus
+from commissioning import DEFAULT_PROFILE
+from config_snapshot import ConfigSnapshot, motor_key, warm_start
+from pcan_cybergear import CANMotorController
+from simulator import CyberGearSimulator, SimulatedMotor
+
+CmdModes = CANMotorController.CmdModes
+
+
+def test_buses_reusing_ids_keep_separate_snapshots(sim, bus, tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    other_channel = f"test_{uuid.uuid4().hex}"
+    with CyberGearSimulator((101,), channel=other_channel):
+        other_bus = can.Bus(interface="virtual", channel=other_channel)
+        try:
+            first = CANMotorController(bus, motor_id=101)
+            second = CANMotorController(other_bus, motor_id=101)
+            warm_start([first], path=path)
+            warm_start([second], path=path)
+            snapshot = ConfigSnapshot(path)
+            assert len(snapshot.motors) == 2
+            assert snapshot.get(motor_key(first)) is not None
+            assert snapshot.get(motor_key(second)) is not None
+            # 另一条总线上的同ID电机不会覆盖本总线的快照, 再次启动为热启动
+            assert warm_start([first], path=path)[101]["start"] == "warm"
+        finally:
+            release_bus(other_bus)
+            other_bus.shutdown()
+
+
+def _sent_commands(bus):
+    sent = []
+    CANMotorController(bus, motor_id=101).dispatcher.add_tx_listener(
+        lambda msg: sent.append((msg.arbitration_id >> 24) & 0x1F))
+    return sent
+
+
+def _controllers(sim, bus):
+    # 每次启动新建控制器, 如同重新运行脚本
+    return [CANMotorController(bus, motor_id=m) for m in sim.motors]
+
+
+def test_warm_start_skips_disable_and_zero(sim, bus, tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    sent = _sent_commands(bus)
+    report = warm_start(_controllers(sim, bus), path=path)
+    assert {entry["start"] for entry in report.values()} == {"cold"}
+    assert CmdModes.MOTOR_STOP in sent and CmdModes.SET_MECHANICAL_ZERO in sent
+
+    sim.motors[101].pos = 0.5
+    sent.clear()
+    report = warm_start(_controllers(sim, bus), path=path)
+    assert {entry["start"] for entry in report.values()} == {"warm"}
+    # 配置未变, 只重新使能
+    assert all(entry["sent"] == 1 for entry in report.values())
+    assert CmdModes.MOTOR_STOP not in sent and CmdModes.SET_MECHANICAL_ZERO not in sent
+    assert abs(sim.motors[101].pos - 0.5) < 0.05
+
+
+def test_changed_params_are_rewritten_warm(sim, bus, tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    warm_start(_controllers(sim, bus), path=path)
+    profile = copy.deepcopy(DEFAULT_PROFILE)
+    profile["defaults"]["params"]["limit_spd"] = 1.0
+    report = warm_start(_controllers(sim, bus), profile, path=path)
+    # 单参数可以读回, 只重写有差异的 limit_spd 并重新使能
+    assert {entry["start"] for entry in report.values()} == {"warm"}
+    assert all(entry["sent"] == 2 for entry in report.values())
+    assert all(motor.param("limit_spd") == 1.0 for motor in sim.motors.values())
+
+
+def test_changed_table_or_power_cycle_is_cold(sim, bus, tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    warm_start(_controllers(sim, bus), path=path)
+    # 参数表无法读回, 修改后完整配置
+    profile = copy.deepcopy(DEFAULT_PROFILE)
+    profile["defaults"]["param_table"]["loc_kp"] = 10
+    report = warm_start(_controllers(sim, bus), profile, path=path)
+    assert {entry["start"] for entry in report.values()} == {"cold"}
+    assert all(entry["sent"] == 9 for entry in report.values())
+    assert warm_start(_controllers(sim, bus), profile, path=path)[101]["start"] == "warm"
+
+    # 电机断电重启后参数恢复默认值, 读回与快照不同
+    sim.motors[102] = SimulatedMotor(102)
+    sent = _sent_commands(bus)
+    report = warm_start(_controllers(sim, bus), profile, path=path)
+    assert report[101]["start"] == "warm"
+    assert report[102]["start"] == "cold"
+    assert sent.count(CmdModes.SET_MECHANICAL_ZERO) == 1
+
+
+def test_full_ignores_snapshot(sim, bus, tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    warm_start(_controllers(sim, bus), path=path)
+    report = warm_start(_controllers(sim, bus), path=path, full=True)
+    assert {entry["start"] for entry in report.values()} == {"full"}
+    assert all(entry["sent"] == 9 for entry in report.values())
@@ -0,0 +1,28 @@
+from control_loop import ControlLoop, LoopStats
+from motor_group import MotorGroup
+from pcan_cybergear import CANMotorController
+
+
+def test_stats_memory_is_bounded():
+    stats = LoopStats(0.001, window=100)
+    for i in range(1000):
+        stats.jitter.append(i * 1e-6)
+        stats.cycle_time.append(1e-4)
+    stats.cycles = 1000
+    assert len(stats.jitter.recent) == 100
+    summary = stats.summary()
+    # 均值和最大值基于全部样本, p99 基于最近的窗口
+    assert abs(summary["jitter_mean_us"] - 499.5) < 1e-6
+    assert abs(summary["jitter_max_us"] - 999.0) < 1e-6
+    assert summary["jitter_p99_us"] >= 900.0
+
+
+def test_loop_runs_against_simulator(sim, bus):
+    group = MotorGroup([CANMotorController(bus, motor_id=m) for m in sim.motors])
+    group.enable_all()
+    setpoints = [[(0.0, 0.1, 0.0, 20.0, 1.0)] * len(group)] * 40
+    # 宽松的应答等待时间, 避免测试机负载导致的偶发超时
+    stats = ControlLoop(group, setpoints, rate_hz=100, reply_timeout=0.05).run()
+    assert stats.cycles == 40
+    assert stats.jitter.count == stats.cycle_time.count == 40
+    assert stats.missed_replies == 0
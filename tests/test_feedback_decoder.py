@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from feedback_decoder import decode_feedback_batch, feedback_limits
+from pcan_cybergear import CANMotorController
+
+
+def make_frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.integers(0, 256, size=(n, 8), dtype=np.uint8)
+    # 覆盖量程两端
+    data[0, :6] = 0
+    data[1, :6] = 0xFF
+    arbitration_ids = (2 << 24) | (rng.integers(0, 4, n) << 22) | (rng.integers(1, 128, n) << 8) | 254
+    return data, arbitration_ids
+
+
+def test_batch_matches_decode_feedback(bus):
+    motor = CANMotorController(bus, motor_id=101)
+    data, arbitration_ids = make_frames(500)
+    decoded = decode_feedback_batch(data, arbitration_ids, **feedback_limits(motor))
+    for i, (row, arbitration_id) in enumerate(zip(data, arbitration_ids)):
+        expected = motor.decode_feedback(bytes(row), int(arbitration_id))
+        # 与逐帧解码逐位一致
+        assert tuple(column[i] for column in decoded) == expected
+    assert decoded[1][0] == motor.P_MIN and decoded[1][1] == motor.P_MAX
+
+
+def test_default_limits_match_controller(bus):
+    motor = CANMotorController(bus, motor_id=101)
+    data, arbitration_ids = make_frames(10, seed=1)
+    for a, b in zip(decode_feedback_batch(data, arbitration_ids),
+                    decode_feedback_batch(data, arbitration_ids, **feedback_limits(motor))):
+        assert np.array_equal(a, b)
+
+
+def test_rejects_short_rows():
+    with pytest.raises(ValueError):
+        decode_feedback_batch(np.zeros((4, 6), dtype=np.uint8), np.zeros(4))
+    with pytest.raises(ValueError):
+        decode_feedback_batch(np.zeros(8, dtype=np.uint8), np.zeros(1))
@@ -0,0 +1,50 @@
+import numpy as np
+from forwardKinematics import FK, jointAngles, motorPositions
+from inverseKinematics import IK
+
+
+def solve(n=5000, seed=2):
+    rng = np.random.default_rng(seed)
+    coordinates = rng.uniform((-40, -40, -10), (40, 40, 50), size=(n, 3))
+    alphas = rng.uniform(-90, 90, size=n)
+    angles, feasible = IK().getRotationAngleBatch(coordinates, alphas)
+    return coordinates[feasible], alphas[feasible], angles[feasible]
+
+
+def test_fk_inverts_ik():
+    coordinates, alphas, angles = solve()
+    assert len(coordinates) > 500
+    positions, pitch = FK().getPositionBatch(angles)
+    assert np.abs(pitch - alphas).max() < 1e-3
+    error = np.linalg.norm(positions - coordinates, axis=1)
+    # IK 中余弦值舍入到4位小数, 肘关节接近伸直时误差最大
+    assert np.median(error) < 0.01
+    assert error.max() < 0.5
+
+
+def test_scalar_matches_batch():
+    fk = FK()
+    _, _, angles = solve(200)
+    positions, pitch = fk.getPositionBatch(angles)
+    for row, position, alpha in zip(angles.tolist(), positions, pitch):
+        xyz, a = fk.getPosition(dict(zip(("theta1", "theta2", "theta3", "theta4"), row)))
+        assert np.allclose(xyz, position) and np.isclose(a, alpha)
+
+
+def test_jacobian_matches_finite_differences():
+    fk = FK()
+    _, _, angles = solve(50)
+    J = fk.getJacobianBatch(angles)
+    h = 1e-6
+    for k in range(4):
+        step = np.zeros(4)
+        step[k] = np.degrees(h)
+        plus, pitch_plus = fk.getPositionBatch(angles + step)
+        minus, pitch_minus = fk.getPositionBatch(angles - step)
+        numeric = np.column_stack((plus - minus, np.radians(pitch_plus - pitch_minus))) / (2 * h)
+        assert np.allclose(J[:, :, k], numeric, atol=1e-5)
+
+
+def test_motor_joint_conversion_round_trip():
+    _, _, angles = solve(50)
+    assert np.allclose(jointAngles(motorPositions(angles)), angles)
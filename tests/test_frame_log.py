@@ -0,0 +1,39 @@
+import time
+import uuid
+import can
+from frame_log import FrameRecorder, FrameReplayer, cmd_modes, open_log, select
+from pcan_cybergear import CANMotorController
+from simulator import CyberGearSimulator
+
+CmdModes = CANMotorController.CmdModes
+
+
+def test_record_select_and_replay(sim, bus, tmp_path):
+    path = str(tmp_path / "frames.bin")
+    with FrameRecorder(path) as recorder:
+        recorder.attach(bus)
+        motor = CANMotorController(bus, motor_id=101)
+        motor.write_single_param("limit_spd", 5.0)
+        motor.enable()
+        motor.disable()
+    log = open_log(path)
+    sent = select(log, motor_id=101, tx=True)
+    assert cmd_modes(sent).tolist() == [CmdModes.SINGLE_PARAM_WRITE, CmdModes.MOTOR_ENABLE, CmdModes.MOTOR_STOP]
+    replies = select(log, motor_id=101, tx=False)
+    assert (cmd_modes(replies) == CmdModes.MOTOR_FEEDBACK).all() and len(replies) == 3
+    assert (log["ts"][1:] >= log["ts"][:-1]).all()
+
+    # 在另一条总线上回放发出的帧, 重新驱动模拟电机
+    channel = f"test_{uuid.uuid4().hex}"
+    with CyberGearSimulator((101,), channel=channel) as replay_sim:
+        replay_bus = can.Bus(interface="virtual", channel=channel)
+        try:
+            assert FrameReplayer(path, replay_bus, speed=0).run() == 3
+            deadline = time.monotonic() + 1.0
+            while replay_sim.frames_received < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            replay_bus.shutdown()
+        assert replay_sim.frames_received == 3
+        assert replay_sim.motors[101].param("limit_spd") == 5.0
+        assert not replay_sim.motors[101].enabled
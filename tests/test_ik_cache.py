@@ -0,0 +1,52 @@
+from inverseKinematics import IK, IKCache
+
+
+def test_lru_eviction():
+    cache = IKCache(maxsize=2)
+    links = (13.7, 14.5, 14.5, 10)
+    a, b, c = (cache.key("angle", (x, 0, 0, 0), links) for x in (1, 2, 3))
+    cache.put(a, "a")
+    cache.put(b, "b")
+    assert cache.get(a) == (True, "a")  # a 成为最近使用的项
+    cache.put(c, "c")
+    assert cache.get(b) == (False, None)
+    assert cache.get(a) == (True, "a")
+    assert cache.get(c) == (True, "c")
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_key_quantization():
+    cache = IKCache(resolution=1e-4)
+    links = (13.7, 14.5, 14.5, 10)
+    assert cache.key("angle", (10.00001, 20, 15, 30), links) == cache.key("angle", (10, 20, 15, 30), links)
+    assert cache.key("angle", (10.001, 20, 15, 30), links) != cache.key("angle", (10, 20, 15, 30), links)
+    assert cache.key("pitch", (10, 20, 15, 30), links) != cache.key("angle", (10, 20, 15, 30), links)
+
+
+def test_set_link_length_clears_cache():
+    ik = IK()
+    ik.setCache()
+    target = (10, 20, 15)
+    before = ik.getRotationAngle(target, 30)
+    assert ik.getCacheStats()["size"] == 1
+    ik.setLinkLength(13.7, 15.0, 14.0, 10)
+    assert ik.getCacheStats()["size"] == 0
+    after = ik.getRotationAngle(target, 30)
+    assert after != before
+    assert after == ik._getRotationAngle(target, 30)
+
+
+def test_cache_stats():
+    ik = IK()
+    assert ik.getCacheStats() is None
+    ik.setCache(maxsize=8)
+    first = ik.getRotationAngle((10, 20, 15), 30)
+    first["theta1"] = 0  # 返回的是副本
+    ik.getRotationAngle((10, 20, 15), 30)
+    assert ik.getRotationAngle((10, 20, 15), 30) == IK().getRotationAngle((10, 20, 15), 30)
+    ik.getClosestPitch((10, 20, 15), 30, -90, 90)
+    stats = ik.getCacheStats()
+    assert stats == {"size": 2, "maxsize": 8, "hits": 2, "misses": 2, "evictions": 0, "hit_rate": 0.5}
+    ik.setCache(0)
+    assert ik.getCacheStats() is None
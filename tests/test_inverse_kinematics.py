@@ -0,0 +1,29 @@
+import numpy as np
+from inverseKinematics import IK
+
+
+def test_batch_matches_scalar():
+    ik = IK()
+    rng = np.random.default_rng(1)
+    coordinates = rng.uniform((-40, -40, -10), (40, 40, 50), size=(2000, 3))
+    alphas = rng.uniform(-90, 90, size=len(coordinates))
+    angles, feasible = ik.getRotationAngleBatch(coordinates, alphas)
+    assert 0 < feasible.sum() < len(coordinates)
+    for coordinate, alpha, row, ok in zip(coordinates.tolist(), alphas.tolist(), angles, feasible):
+        try:
+            result = ik.getRotationAngle(tuple(coordinate), alpha)
+        except (ZeroDivisionError, ValueError):
+            result = False
+        assert bool(result) == ok
+        if ok:
+            assert row.tolist() == [result["theta1"], result["theta2"], result["theta3"], result["theta4"]]
+        else:
+            assert np.isnan(row).all()
+
+
+def test_batch_accepts_scalar_alpha():
+    ik = IK()
+    coordinates = [(0, 33.775, 33.2), (10, 20, 15)]
+    angles, feasible = ik.getRotationAngleBatch(coordinates, 30)
+    expected, _ = ik.getRotationAngleBatch(coordinates, [30, 30])
+    assert np.array_equal(angles, expected, equal_nan=True)
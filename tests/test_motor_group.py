@@ -0,0 +1,65 @@
+import pytest
+from motor_group import MotorGroup
+from pcan_cybergear import CANMotorController
+
+
+def make_group(bus, motor_ids=(101, 102)):
+    return MotorGroup([CANMotorController(bus, motor_id=m) for m in motor_ids])
+
+
+def test_fan_out_collects_replies_in_order(sim, bus):
+    group = make_group(bus, (102, 101))
+    replies = group.enable_all()
+    assert [r.motor_id for r in replies] == [102, 101]
+    assert not any(r.timed_out for r in replies)
+    assert [r.feedback[0] for r in replies] == [102, 101]
+    assert all(motor.enabled for motor in sim.motors.values())
+    # 为 None 的帧跳过, 不发送
+    sent = sim.frames_received
+    frames = [None, (CANMotorController.CmdModes.MOTOR_STOP, 254, [0] * 8)]
+    replies = group.fan_out(frames)
+    assert replies[0] is None and not replies[1].timed_out
+    assert sim.frames_received == sent + 1
+    assert sim.motors[102].enabled and not sim.motors[101].enabled
+    with pytest.raises(ValueError):
+        group.fan_out(frames[:1])
+
+
+def test_fan_out_reports_missing_motor(sim, bus):
+    group = make_group(bus, (101, 103))
+    replies = group.enable_all(timeout=0.05)
+    assert not replies[0].timed_out
+    assert replies[1] == (103, None, True)
+
+
+def test_pipeline_keeps_order_per_motor(sim, bus):
+    group = make_group(bus)
+    names = [["limit_spd", "loc_ref", "run_mode"], ["run_mode"]]
+    frames = [[motor.read_param_frame(name) for name in motor_names]
+              for motor, motor_names in zip(group, names)]
+    replies = group.pipeline(frames)
+    assert [len(r) for r in replies] == [3, 1]
+    for motor, motor_names, motor_replies in zip(group, names, replies):
+        for name, (data, arbitration_id) in zip(motor_names, motor_replies):
+            assert (arbitration_id >> 8) & 0xFF == motor.MOTOR_ID
+            assert data[0] | (data[1] << 8) == motor.PARAMETERS[name]["index"]
+
+
+def test_write_all(sim, bus):
+    group = make_group(bus)
+    replies = group.write_all("spd_ref", [0.5, None])
+    assert replies[1] is None
+    assert replies[0].motor_id == 101 and not replies[0].timed_out
+    assert sim.motors[101].param("spd_ref") == 0.5
+    assert sim.motors[102].param("spd_ref") == 0.0
+    # 与已确认的值相同的写入跳过, 返回缓存的状态
+    sent = sim.frames_received
+    replies = group.write_all("spd_ref", [0.5, -0.5])
+    assert sim.frames_received == sent + 1
+    assert replies[0] == (101, group[0].cached_feedback(), False)
+    assert sim.motors[102].param("spd_ref") == -0.5
+    group.write_all("spd_ref", [0.5, -0.5], force=True)
+    assert sim.frames_received == sent + 3
+    assert group.write_all("no_such_param", [1, 1]) == [None, None]
+    with pytest.raises(ValueError):
+        group.write_all("spd_ref", [0.5])
@@ -0,0 +1,44 @@
+import math
+import time
+from motor_group import MotorGroup
+from motor_state import FAULT_OVERTEMP, FAULT_UNDERVOLTAGE, STATE_FIELDS, MotorState
+from pcan_cybergear import CANMotorController
+
+
+def test_from_feedback_extracts_fault_and_mode():
+    arbitration_id = (2 << 24) | (2 << 22) | ((FAULT_UNDERVOLTAGE | FAULT_OVERTEMP) << 16) | (101 << 8) | 254
+    state = MotorState.from_feedback(arbitration_id, 101, 0.5, -1.0, 0.25, 31.5)
+    assert (state.motor_id, state.pos, state.vel, state.torque, state.temp) == (101, 0.5, -1.0, 0.25, 31.5)
+    assert state.fault == FAULT_UNDERVOLTAGE | FAULT_OVERTEMP
+    assert state.mode == 2
+    assert 0 <= state.age < 1.0
+    assert state.as_row()[:5] == (0.5, -1.0, 0.25, 31.5, float(state.fault))
+
+
+def test_state_before_feedback(bus):
+    motor = CANMotorController(bus, motor_id=101)
+    assert motor.state.motor_id == 101
+    assert motor.state.last_seen is None and motor.state.age is None
+    assert all(math.isnan(v) for i, v in enumerate(motor.state.as_row()) if STATE_FIELDS[i] != "fault")
+
+
+def test_state_follows_feedback(sim, bus):
+    group = MotorGroup([CANMotorController(bus, motor_id=m) for m in sim.motors])
+    sim.motors[102].pos = 1.0
+    t0 = time.monotonic()
+    group.enable_all()
+    first = group[1].state
+    assert first.mode == 2 and first.fault == 0
+    assert abs(first.pos - 1.0) < 1e-3
+    assert abs(first.temp - 30.0) < 1e-9
+    assert first.last_seen >= t0
+    # 每帧生成新的记录, 之前取到的记录不变
+    sim.motors[102].fault = FAULT_OVERTEMP
+    group.disable_all()
+    assert group[1].state is not first
+    assert group[1].state.mode == 0 and group[1].state.fault == FAULT_OVERTEMP
+    assert first.mode == 2 and first.fault == 0
+    snapshot = group.snapshot()
+    assert snapshot.shape == (2, len(STATE_FIELDS))
+    assert snapshot[1, STATE_FIELDS.index("fault")] == FAULT_OVERTEMP
+    assert abs(snapshot[1, STATE_FIELDS.index("pos")] - 1.0) < 1e-3
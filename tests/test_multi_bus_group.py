@@ -0,0 +1,19 @@
+from pcan_cybergear import CANMotorController
+from multi_bus_group import MultiBusGroup
+
+
+def test_skipped_writes_are_not_counted(sim, bus):
+    group = MultiBusGroup([CANMotorController(bus, motor_id=m) for m in (101, 102)])
+    try:
+        group.write_all("limit_spd", [2.0, 3.0])
+        sent = sim.frames_received
+        stats = group.channel_stats()[0]
+        assert stats["tx_frames"] == sent
+        # 第二次写入相同的值全部被缓存跳过, 不产生发送帧
+        group.write_all("limit_spd", [2.0, 3.0])
+        assert sim.frames_received == sent
+        assert group.channel_stats()[0]["tx_frames"] == sent
+        group.write_all("limit_spd", [2.0, 3.0], force=True)
+        assert group.channel_stats()[0]["tx_frames"] == sent + 2
+    finally:
+        group.close()
@@ -0,0 +1,58 @@
+from pcan_cybergear import CANMotorController
+
+
+def test_redundant_single_param_write_is_skipped(sim, bus):
+    motor = CANMotorController(bus, motor_id=101)
+    first = motor.write_single_param("limit_spd", 3.0)
+    sent = sim.frames_received
+    second = motor.write_single_param("limit_spd", 3.0)
+    assert sim.frames_received == sent
+    # 跳过时返回缓存的反馈, 格式与实际写入相同
+    assert len(second) == len(first) == 5
+    assert second[0] == 101
+    motor.write_single_param("limit_spd", 3.0, force=True)
+    assert sim.frames_received == sent + 1
+    assert sim.motors[101].param("limit_spd") == 3.0
+
+
+def test_disable_and_zero_invalidate_cache(sim, bus):
+    motor = CANMotorController(bus, motor_id=101)
+    motor.write_single_param("loc_ref", 0.5)
+    motor.write_param_table("loc_kp", 8.0)
+    for reset in (motor.disable, motor.set_0_pos):
+        reset()
+        sent = sim.frames_received
+        motor.write_single_param("loc_ref", 0.5)
+        motor.write_param_table("loc_kp", 8.0)
+        assert sim.frames_received == sent + 2
+
+
+def test_param_table_write_return_shape(sim, bus):
+    motor = CANMotorController(bus, motor_id=102)
+    written = motor.write_param_table("limit_cur", 1.5)
+    sent = sim.frames_received
+    skipped = motor.write_param_table("limit_cur", 1.5)
+    assert sim.frames_received == sent
+    assert len(written) == len(skipped) == 5
+    assert written[0] == skipped[0] == 102
+    assert motor.write_param_table("no_such_param", 1.0) == (None,) * 5
+
+
+def test_read_uses_shadow_registers(sim, bus):
+    motor = CANMotorController(bus, motor_id=101)
+    assert abs(motor.read_single_param("limit_spd") - 2.0) < 1e-6
+    sent = sim.frames_received
+    assert abs(motor.read_single_param("limit_spd") - 2.0) < 1e-6
+    assert sim.frames_received == sent
+    assert motor.read_params(["limit_spd", "loc_ref"], max_age=0) == {
+        "limit_spd": motor.read_single_param("limit_spd"), "loc_ref": 0.0}
+    assert sim.frames_received == sent + 2
+
+
+def test_skipped_write_before_any_feedback(sim, bus):
+    motor = CANMotorController(bus, motor_id=101)
+    value = motor.read_single_param("limit_spd")
+    sent = sim.frames_received
+    # 读取确认的值不再写入; 此时还没有反馈帧, 缓存状态只有电机ID
+    assert motor.write_single_param("limit_spd", value) == (101, None, None, None, None)
+    assert sim.frames_received == sent
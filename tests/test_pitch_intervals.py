@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from inverseKinematics import IK
+
+SCAN_STEP = 0.005
+SCAN = np.arange(-180.0, 180.0 + SCAN_STEP / 2, SCAN_STEP)
+
+
+def scan_feasible(ik, coordinate):
+    # 以 0.005 度的步长逐个俯仰角求解(批量求解与 getRotationAngle 逐个求解结果相同)
+    _, feasible = ik.getRotationAngleBatch(np.tile(coordinate, (len(SCAN), 1)), SCAN)
+    return feasible
+
+
+def distance_to_intervals(alpha, intervals):
+    return min(0.0 if a <= alpha <= b else min(abs(alpha - a), abs(alpha - b)) for a, b in intervals)
+
+
+def test_intervals_match_scan():
+    ik = IK()
+    rng = np.random.default_rng(3)
+    for coordinate in rng.uniform((-40, -40, -10), (40, 40, 50), size=(20, 3)):
+        feasible = scan_feasible(ik, coordinate)
+        intervals = ik.getPitchIntervals(tuple(coordinate))
+        if not feasible.any():
+            assert intervals == []
+            continue
+        # 扫描到的可行俯仰角都在区间内, 区间内的扫描点都可行(端点的舍入差异约 0.001 度)
+        assert max(distance_to_intervals(a, intervals) for a in SCAN[feasible]) < 0.001
+        inside = np.zeros(len(SCAN), dtype=bool)
+        for a, b in intervals:
+            inside |= (SCAN > a + 0.001) & (SCAN < b - 0.001)
+        assert feasible[inside].all()
+
+
+def test_closest_pitch_matches_scan():
+    ik = IK()
+    rng = np.random.default_rng(4)
+    for coordinate in rng.uniform((-40, -40, -10), (40, 40, 50), size=(20, 3)):
+        alpha = rng.uniform(-90, 90)
+        feasible = scan_feasible(ik, coordinate)
+        result = ik.getClosestPitch(tuple(coordinate), alpha, -180, 180)
+        if not feasible.any():
+            assert result is False
+            continue
+        pitch, angles = result
+        assert angles == ik.getRotationAngle(tuple(coordinate), pitch)
+        # 不比扫描到的最近可行俯仰角更远(二分精度 tol), 也不比它近一个扫描步长以上
+        nearest = np.abs(SCAN[feasible] - alpha).min()
+        assert nearest - SCAN_STEP - 0.001 <= abs(pitch - alpha) <= nearest + 0.001
+
+
+def test_straight_arm_has_single_pitch():
+    # 连杆恰好伸直: 只有俯仰角 30 度可行(舍入使可行范围约为 0.3 度宽)
+    ik = IK()
+    coordinate = (0, 33.775, 33.2)
+    intervals = ik.getPitchIntervals(coordinate, -90, 90)
+    assert len(intervals) == 1
+    a, b = intervals[0]
+    assert a < 30 < b and b - a < 0.5
+    feasible = SCAN[scan_feasible(ik, coordinate)]
+    assert max(distance_to_intervals(x, intervals) for x in feasible) < 0.02
+    pitch, angles = ik.getClosestPitch(coordinate, 30, -90, 90)
+    assert pitch == 30 and angles["theta3"] == angles["theta4"] == 0
+    pitch, _ = ik.getClosestPitch(coordinate, 0, -90, 90)
+    assert pitch == pytest.approx(feasible.min(), abs=0.02)
+    # 范围退化为一点时仍能求出
+    assert ik.getPitchIntervals(coordinate, 30, 30) == [(30, 30)]
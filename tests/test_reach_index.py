@@ -0,0 +1,30 @@
+from math import dist
+import numpy as np
+import pytest
+from inverseKinematics import IK
+from reachIndex import buildIndex
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    return buildIndex(str(tmp_path_factory.mktemp("reach") / "reach_index.npy"), IK())
+
+
+def test_is_reachable_matches_ik(index):
+    ik = IK()
+    rng = np.random.default_rng(0)
+    for X, Y, Z in rng.uniform((-45, -45, -15), (45, 45, 55), size=(300, 3)):
+        target = (float(X), float(Y), float(Z))
+        assert index.isReachable(target) == bool(ik.getPitchIntervals(target, -90, 90)), target
+
+
+@pytest.mark.parametrize("target", [(100, 0, 0), (60, 0, 60), (45, 0, 50), (0, 30, -40), (0, 20, 50), (36, 0, 30)])
+def test_nearest_reachable_is_nearest_node(index, target):
+    assert not index.isReachable(target)
+    nearest = index.getNearestReachable(target)
+    assert index.isReachable(nearest)
+    # 与所有可达网格点逐一比较(网格范围以外的目标也按实际距离)
+    i, j = np.nonzero(~np.isnan(index.pitch[:, :, 0, 0]))
+    r = np.hypot(target[0], target[1])
+    best = np.hypot(i * index.resolution - r, index.z0 + j * index.resolution - target[2]).min()
+    assert dist(target, nearest) == pytest.approx(best)
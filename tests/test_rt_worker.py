@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+import numpy as np
+import pytest
+from motor_state import STATE_FIELDS
+from pcan_cybergear import CANMotorController
+from rt_worker import SETPOINT_WIDTH, RtClient, SharedControlBlock, _H, _worker_main
+
+
+@pytest.fixture
+def block():
+    block = SharedControlBlock(2, create=True)
+    yield block
+    block.close()
+    block.unlink()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_reads_are_consistent_while_writing(block):
+    # 写入方每次发布的所有元素都等于序号, 读取到的数组必须完整属于同一次写入
+    stop = threading.Event()
+
+    def writer():
+        state = np.empty((2, len(STATE_FIELDS)))
+        while not stop.is_set():
+            state[:] = block.counter("state_begin") + 1
+            block.publish_state(state)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        out = np.empty((2, len(STATE_FIELDS)))
+        for _ in range(20000):
+            seq, rows = block.read_state(out)
+            if seq:
+                assert (rows == rows[0, 0]).all()
+                assert seq - 1 <= rows[0, 0] <= seq
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_client_setpoints(block):
+    client = RtClient(block.name, 2)
+    try:
+        assert client.set_setpoints([0.5, None]) == 1
+        seq, sp = block.read_setpoints()
+        assert seq == 1 and sp[0, 0] == 0.5 and np.isnan(sp[1, 0]) and np.isnan(sp[:, 1:]).all()
+        client.set_setpoints(np.ones((2, SETPOINT_WIDTH)))
+        assert (block.read_setpoints()[1] == 1).all()
+        assert client.clear_setpoints() == 3
+        assert np.isnan(block.read_setpoints()[1]).all()
+    finally:
+        client.close()
+
+
+@pytest.fixture
+def worker(sim, channel, block):
+    # 在线程中运行工作进程的主函数, 与模拟器共用进程内的 virtual 总线
+    config = {"bus": {"interface": "virtual", "channel": channel}, "motor_ids": [101, 102],
+              "main_can_id": 254, "rate_hz": 200, "setpoint": "spd_ref", "profile": None,
+              "full": False, "spin": 0.0005}
+    commands, results = queue.Queue(), queue.Queue()
+    thread = threading.Thread(target=_worker_main, args=(block.name, config, commands, results))
+    thread.start()
+    assert results.get(timeout=5) == ("ok", None)
+    client = RtClient(block.name, 2)
+
+    def call(method, *args, **kwargs):
+        commands.put((method, args, kwargs))
+        status, value = results.get(timeout=5)
+        assert status == "ok", value
+        return value
+
+    yield client, call
+    block.header[_H["stop"]] = 1
+    thread.join(5)
+    client.close()
+
+
+def test_setpoints_reach_motors_and_state_is_published(sim, worker):
+    client, call = worker
+    client.set_setpoints([0.2, -0.2])
+    wait_for(lambda: sim.motors[102].param("spd_ref") == pytest.approx(-0.2))
+    assert sim.motors[101].param("spd_ref") == pytest.approx(0.2)
+    call("set_run_mode_all", CANMotorController.RunModes.SPEED_MODE)
+    call("enable_all")
+    wait_for(lambda: client.stats()["cycles"] > 20)
+    seq, state = client.state()
+    assert seq > 0 and state.shape == (2, len(STATE_FIELDS))
+    assert np.isfinite(state[:, :4]).all()
+    wait_for(lambda: client.positions()[0] > 0.001 and client.positions()[1] < -0.001)
+
+
+def test_switching_setpoint_meaning_drops_old_values(sim, worker):
+    client, call = worker
+    client.set_setpoints([0.2, -0.2])
+    wait_for(lambda: sim.motors[101].param("spd_ref") == pytest.approx(0.2))
+    call("set_setpoint", "loc_ref")
+    cycles = client.stats()["cycles"]
+    wait_for(lambda: client.stats()["cycles"] > cycles + 10)
+    # 旧的速度设定值不会被当作位置下发
+    assert sim.motors[101].param("loc_ref") == 0.0 and sim.motors[102].param("loc_ref") == 0.0
+    client.set_setpoints([0.5, 0.6])
+    wait_for(lambda: sim.motors[102].param("loc_ref") == pytest.approx(0.6))
@@ -0,0 +1,98 @@
+import struct
+import can
+from can_codec import INDEX_STRUCT
+from pcan_cybergear import CANMotorController
+from simulator import CyberGearSimulator, SimulatedMotor
+
+CmdModes = CANMotorController.CmdModes
+PARAMETERS = CANMotorController.PARAMETERS
+
+
+def command(motor_id, cmd_mode, data=bytes(8), data2=254):
+    return can.Message(arbitration_id=(cmd_mode << 24) | (data2 << 8) | motor_id,
+                       data=data, is_extended_id=True)
+
+
+def param_data(name, value=0.0):
+    info = PARAMETERS[name]
+    return INDEX_STRUCT.pack(info["index"]) + info["codec"].encode(value)
+
+
+def test_enable_replies_with_feedback(sim, peer):
+    peer.send(command(101, CmdModes.MOTOR_ENABLE))
+    reply = peer.recv(timeout=1)
+    assert (reply.arbitration_id >> 24) & 0x1F == CmdModes.MOTOR_FEEDBACK
+    assert (reply.arbitration_id >> 8) & 0xFF == 101
+    assert (reply.arbitration_id >> 22) & 0x3 == 2  # 运行状态
+    assert reply.arbitration_id & 0xFF == 254
+    assert sim.motors[101].enabled and not sim.motors[102].enabled
+
+
+def test_param_write_then_read(sim, peer):
+    peer.send(command(102, CmdModes.SINGLE_PARAM_WRITE, param_data("limit_spd", 7.5)))
+    assert (peer.recv(timeout=1).arbitration_id >> 24) & 0x1F == CmdModes.MOTOR_FEEDBACK
+    peer.send(command(102, CmdModes.SINGLE_PARAM_READ, param_data("limit_spd")))
+    reply = peer.recv(timeout=1)
+    assert (reply.arbitration_id >> 24) & 0x1F == CmdModes.SINGLE_PARAM_READ
+    assert bytes(reply.data[:2]) == param_data("limit_spd")[:2]
+    assert PARAMETERS["limit_spd"]["codec"].decode(reply.data, 4)[0] == 7.5
+    assert sim.motors[102].param("limit_spd") == 7.5
+
+
+def test_unknown_motor_and_lost_replies(channel, peer):
+    with CyberGearSimulator((101,), channel=channel, loss=1.0) as sim:
+        peer.send(command(103, CmdModes.MOTOR_ENABLE))
+        peer.send(command(101, CmdModes.MOTOR_ENABLE))
+        assert peer.recv(timeout=0.2) is None
+        assert sim.frames_received == 1
+        assert sim.frames_dropped == 1
+        assert sim.motors[101].enabled
+
+
+def test_position_mode_follows_loc_ref():
+    motor = SimulatedMotor(101)
+    motor.handle(command(101, CmdModes.SINGLE_PARAM_WRITE,
+                         param_data("run_mode", CANMotorController.RunModes.POSITION_MODE.value)))
+    motor.handle(command(101, CmdModes.SINGLE_PARAM_WRITE, param_data("loc_ref", 1.0)))
+    motor.handle(command(101, CmdModes.MOTOR_ENABLE))
+    t = motor._last_step
+    motor.advance(t + 0.1)
+    # 速度受 limit_spd(默认 2 rad/s) 限制
+    assert 0.1 < motor.pos < 0.2 + 1e-9
+    motor.advance(t + 2.0)
+    assert abs(motor.pos - 1.0) < 1e-3
+    position = struct.unpack(">H", motor.feedback_frame().data[:2])[0]
+    assert abs(position * 25.0 / 65535 - 12.5 - 1.0) < 1e-3
+
+
+def test_stop_zero_and_param_table():
+    motor = SimulatedMotor(101)
+    motor.handle(command(101, CmdModes.MOTOR_ENABLE))
+    motor.pos, motor.vel = 0.7, 1.0
+    reply = motor.handle(command(101, CmdModes.MOTOR_STOP))
+    assert (reply.arbitration_id >> 22) & 0x3 == 0
+    assert not motor.enabled and motor.vel == 0.0
+    motor.handle(command(101, CmdModes.SET_MECHANICAL_ZERO, bytes([1])))
+    assert motor.pos == 0.0
+    feature_code = CANMotorController.PARAM_TABLE["loc_kp"]["feature_code"]
+    data = struct.pack("<HH", feature_code, 0) + struct.pack("<f", 8.0)
+    reply = motor.handle(command(101, CmdModes.PARAM_TABLE_WRITE, data))
+    assert (reply.arbitration_id >> 24) & 0x1F == CmdModes.MOTOR_FEEDBACK
+    assert motor.param_table[feature_code] == struct.pack("<f", 8.0)
+
+
+def test_control_frame_and_device_id(bus):
+    controller = CANMotorController(bus, motor_id=101)
+    motor = SimulatedMotor(101)
+    cmd_mode, data2, data = controller.motor_control_frame(1.0, 0.5, -0.5, 10.0, 1.0)
+    reply = motor.handle(command(101, cmd_mode, bytes(data), data2))
+    assert (reply.arbitration_id >> 24) & 0x1F == CmdModes.MOTOR_FEEDBACK
+    expected = (1.0, 0.5, -0.5, 10.0, 1.0)
+    # 16 位量化误差
+    assert all(abs(a - b) < 1e-2 for a, b in zip(motor.control, expected))
+    reply = motor.handle(command(101, CmdModes.GET_DEVICE_ID, bytes(8), 0))
+    assert reply.arbitration_id == (CmdModes.GET_DEVICE_ID << 24) | (101 << 8) | 0xFE
+    assert struct.unpack("<Q", reply.data)[0] & 0xFF == 101
+    # 未知参数不应答
+    unknown = struct.pack("<HH", 0x7FFF, 0) + bytes(4)
+    assert motor.handle(command(101, CmdModes.SINGLE_PARAM_READ, unknown)) is None
@@ -0,0 +1,71 @@
+import time
+import numpy as np
+import pytest
+from motor_group import MotorGroup
+from pcan_cybergear import CANMotorController
+from teach import TeachRecorder, TrajectoryPlayer, load_trajectory, resample, time_parameterize, waypoints
+
+
+def test_time_parameterize_respects_limits():
+    t = np.array([0.0, 0.1, 0.2, 1.0])
+    positions = np.array([[0.0, 0.0], [1.0, -0.1], [1.0, 0.5], [0.0, 0.5]])
+    limit = np.array([2.0, 1.0])
+    for speed in (0.5, 1.0, 4.0):
+        times = time_parameterize(t, positions, limit, speed)
+        assert times[0] == 0.0
+        velocity = np.abs(np.diff(positions, axis=0)) / np.diff(times)[:, None]
+        assert (velocity <= limit * (1 + 1e-9)).all()
+    # 不受限制的段按回放速度缩放
+    assert np.isclose(time_parameterize(t, positions, 100.0, 2.0)[-1], 0.5)
+
+
+@pytest.mark.parametrize("speed", [0.0, -1.0])
+def test_time_parameterize_rejects_speed(speed):
+    with pytest.raises(ValueError):
+        time_parameterize(np.array([0.0, 1.0]), np.zeros((2, 1)), 1.0, speed)
+
+
+@pytest.mark.parametrize("limit_spd", [0.0, [1.0, 0.0], [1.0, -1.0]])
+def test_time_parameterize_rejects_limit(limit_spd):
+    with pytest.raises(ValueError):
+        time_parameterize(np.array([0.0, 1.0]), np.ones((2, 2)), limit_spd)
+
+
+def test_waypoints_resample_within_limits():
+    poses = [[0.0, 0.0], [0.5, -1.0], [0.5, 0.2]]
+    t, positions = waypoints(poses, dwell=0.1)
+    times = time_parameterize(t, positions, 2.0)
+    rate_hz = 100
+    trajectory = resample(times, positions, rate_hz)
+    assert np.array_equal(trajectory[0], poses[0])
+    assert np.array_equal(trajectory[-1], poses[-1])
+    # 终点行之前的周期间隔都是 1/rate_hz, 每个周期的位移不超过速度限制
+    assert (np.abs(np.diff(trajectory[:-1], axis=0)) <= 2.0 / rate_hz + 1e-9).all()
+    assert (np.abs(trajectory[-1] - trajectory[-2]) <= 2.0 / rate_hz + 1e-9).all()
+
+
+def test_record_and_play_back(sim, bus, tmp_path):
+    group = MotorGroup([CANMotorController(bus, motor_id=m) for m in sim.motors])
+    pose = [0.3, -0.2]
+    for motor_id, pos in zip(sim.motors, pose):
+        sim.motors[motor_id].pos = pos
+    path = tmp_path / "teach.bin"
+    with TeachRecorder(group, path, rate_hz=100, reply_timeout=0.05) as recorder:
+        recorder.run(cycles=20)
+    t, positions = load_trajectory(path)
+    assert len(t) == 20
+    assert np.allclose(positions, pose, atol=1e-3)
+
+    for motor in sim.motors.values():
+        motor.pos = 0.0
+    group.set_run_mode_all(CANMotorController.RunModes.POSITION_MODE)
+    group.enable_all()
+    # 从当前位置(0)以限速移动到示教的起点
+    player = TrajectoryPlayer(group, t, positions, rate_hz=100, limit_spd=2.0, reply_timeout=0.05)
+    assert player.duration >= 0.3 / (2.0 * 0.9)
+    stats = player.run()
+    assert stats.cycles >= len(player.trajectory)
+    time.sleep(0.3)
+    # 模拟电机收到帧时才积分状态, 用应答中的反馈确认最终位置
+    group.enable_all()
+    assert np.allclose(group.snapshot()[:, 0], pose, atol=0.01)
@@ -0,0 +1,86 @@
+import threading
+import time
+import pytest
+from pcan_cybergear import CANMotorController
+from tx_scheduler import TxScheduler, release_scheduler
+
+
+@pytest.fixture
+def scheduler(bus):
+    scheduler = TxScheduler.for_bus(bus)
+    yield scheduler
+    release_scheduler(bus, drain=False)
+
+
+def hold(scheduler):
+    # 提交一个阻塞的控制命令, 之后提交的内容在 release.set() 之前都留在队列中
+    release, running = threading.Event(), threading.Event()
+
+    def blocker():
+        running.set()
+        release.wait(5)
+
+    scheduler.submit(blocker)
+    running.wait(5)
+    return release
+
+
+def test_newer_setpoint_replaces_older(sim, bus, scheduler):
+    motor = CANMotorController(bus, motor_id=101)
+    release = hold(scheduler)
+    futures = [scheduler.submit_setpoint(motor, "loc_ref", v) for v in (0.1, 0.2, 0.3)]
+    assert futures[0] is futures[1] is futures[2]
+    sent = sim.frames_received
+    release.set()
+    assert futures[0].result(timeout=2).motor_id == 101
+    assert sim.motors[101].param("loc_ref") == pytest.approx(0.3)
+    assert sim.frames_received == sent + 1
+    assert scheduler.stats()["coalesced"] == 2
+
+
+def test_commands_keep_order_and_split_setpoints(sim, bus, scheduler):
+    motor = CANMotorController(bus, motor_id=101)
+    order = []
+    release = hold(scheduler)
+    first = scheduler.submit_setpoint(motor, "loc_ref", 0.1)
+    scheduler.submit(order.append, 1)
+    second = scheduler.submit_setpoint(motor, "loc_ref", 0.2)
+    done = scheduler.submit(order.append, 2)
+    # 控制命令之后的设定值不与之前的合并
+    assert first is not second
+    release.set()
+    done.result(timeout=2)
+    assert order == [1, 2]
+    assert first.result().motor_id == second.result().motor_id == 101
+    assert sim.motors[101].param("loc_ref") == pytest.approx(0.2)
+
+
+def test_release_without_drain_drops_pending_setpoints(sim, bus, scheduler):
+    motors = [CANMotorController(bus, motor_id=m) for m in (101, 102)]
+    release = hold(scheduler)
+    futures = scheduler.submit_setpoints(motors, "loc_ref", [0.5, 0.6])
+    command = scheduler.submit(lambda: "done")
+    stopper = threading.Thread(target=release_scheduler, args=(bus,), kwargs={"drain": False})
+    stopper.start()
+    while not scheduler._stopping:
+        time.sleep(0.001)
+    release.set()
+    stopper.join(5)
+    assert all(f.cancelled() for f in futures)
+    assert command.result(timeout=2) == "done"
+    assert scheduler.stats()["discarded"] == 2
+    assert sim.motors[101].param("loc_ref") == sim.motors[102].param("loc_ref") == 0.0
+    with pytest.raises(RuntimeError):
+        scheduler.submit_setpoint(motors[0], "loc_ref", 0.1)
+
+
+def test_discard_setpoints_keeps_commands(sim, bus, scheduler):
+    motor = CANMotorController(bus, motor_id=101)
+    release = hold(scheduler)
+    stale = scheduler.submit_setpoint(motor, "spd_ref", 0.2)
+    command = scheduler.submit(lambda: "mode")
+    assert scheduler.discard_setpoints() == 1
+    release.set()
+    assert command.result(timeout=2) == "mode"
+    assert stale.cancelled()
+    assert sim.motors[101].param("spd_ref") == 0.0
@@ -3,7 +3,6 @@
 
 from flask import Flask, render_template
 from flask_socketio import SocketIO
-import time
 import os
 import sys
 import logging
@@ -13,13 +12,30 @@ import threading
 # 添加pcan_cybergear库的路径
 sys.path.append(os.path.join("..","cybergear"))
 from pcan_cybergear import CANMotorController
+from can_dispatcher import release_bus
+from motor_group import MotorGroup
+from tx_scheduler import TxScheduler, release_scheduler
+from commissioning import DEFAULT_PROFILE
+from config_snapshot import warm_start
+from rt_worker import RtWorker
 
 # 全局状态
 bus = None
 motors = []
+group = None    # 电机组，批量下发各关节的命令
+tx = None    # 发送调度器，方向/回零按钮的设定值只保留最新的一次
 init_flag = False
 lock = threading.Lock()
 mode_flag = 0    # 0 未启动，1 位置，2 速度
+# 电机调试配置：参数表和最大速度同 DEFAULT_PROFILE，启动时只停止并设置零点
+MOTOR_PROFILE = dict(DEFAULT_PROFILE, sequence=["disable", "set_zero"])
+FULL_COMMISSION = False  # 为 True 时忽略配置快照，完整重新配置所有电机并设置零点
+# 为 True 时总线收发在独立进程中运行，本进程通过共享内存写入设定值，Web 请求不影响控制时序
+RT_WORKER = False
+BUS_CONFIG = dict(interface="pcan", channel="PCAN_USBBUS1", bitrate=1000000)
+MOTOR_IDS = [101, 102, 103, 104]
+rt = None    # 实时控制工作进程(RT_WORKER 为 True 时)
+rt_client = None    # 工作进程的共享内存客户端
 
 # 初始化日志系统
 logging.basicConfig(
@@ -31,38 +47,36 @@ app = Flask(__name__)
 socketio = SocketIO(app)
 
 def init_motors():  # 初始化CAN总线和电机控制器
-    global bus, motors, init_flag
+    global bus, motors, group, tx, rt, rt_client, init_flag
 
     if init_flag:  # 已初始化则跳过
         logging.info("电机已初始化，跳过重复初始化")
         return
     try:
         logging.info("初始化电机测试")
+        if RT_WORKER:
+            # 工作进程打开总线并按调试配置热启动电机
+            rt = RtWorker(BUS_CONFIG, MOTOR_IDS, setpoint="loc_ref",
+                          profile=MOTOR_PROFILE, full=FULL_COMMISSION).start()
+            rt_client = rt.client()
+            motors = list(MOTOR_IDS)
+            logging.info("实时控制工作进程已启动")
+            init_flag = True
+            return
+
         # 连接到CAN总线 (1 Mbps)
-        bus = can.interface.Bus(
-            interface="pcan",
-            channel="PCAN_USBBUS1",
-            bitrate=1000000
-        )
+        bus = can.interface.Bus(**BUS_CONFIG)
         logging.info("CAN总线连接成功")
 
         # 创建电机控制器
-        motor1 = CANMotorController(bus, motor_id=101, main_can_id=254)
-        motor2 = CANMotorController(bus, motor_id=102, main_can_id=254)
-        motor3 = CANMotorController(bus, motor_id=103, main_can_id=254)
-        motor4 = CANMotorController(bus, motor_id=104, main_can_id=254)
-        motors = [motor1, motor2, motor3, motor4]
+        motors = [CANMotorController(bus, motor_id=i, main_can_id=254) for i in MOTOR_IDS]
+        group = MotorGroup(motors)
+        tx = TxScheduler.for_bus(bus)
         logging.info("电机控制器初始化完成")
 
-        # 配置电机参数
-        for motor in motors:
-            motor.write_param_table("limit_cur", 3)  # 电流限制
-            motor.write_param_table("loc_kp", 8)  # 位置环比例增益
-            motor.write_param_table("spd_kp", 2)  # 速度环比例增益
-            motor.write_param_table("spd_ki", 0.03)  # 速度环积分增益
-            motor.write_single_param("limit_spd", value=0.5)  # 最大速度限制
-            motor.disable()  # 进入SWITCH_ON_DISABLED状态
-            motor.set_0_pos()  # 设置机械零点
+        # 按调试配置并发配置所有电机并读回校验，运行模式和使能由按钮设置
+        # 电机保持上电且配置与上次一致时只重写有差异的参数，不再停止和重新设置零点
+        warm_start(group, MOTOR_PROFILE, full=FULL_COMMISSION)
         logging.info("电机参数配置完成并设置零点")
         init_flag = True
 
@@ -71,6 +85,27 @@ def init_motors():  # 初始化CAN总线和电机控制器
         raise
 
 
+def start_mode(mode, param):  # 设置运行模式并使能，param 为方向/回零按钮写入的参数
+    if rt is not None:
+        rt_client.clear_setpoints()  # 旧设定值是上一种模式的含义, 切换前先清除
+        rt.call("set_run_mode_all", mode)
+        rt.call("enable_all")  # 进入OPERATION_ENABLED状态
+        rt.call("set_setpoint", param)
+    else:
+        # 上一种模式未发出的设定值不再下发, 模式切换和使能经调度器按顺序执行, 不会与设定值交错
+        tx.discard_setpoints()
+        tx.submit(group.set_run_mode_all, mode).result()
+        tx.submit(group.enable_all).result()  # 进入OPERATION_ENABLED状态
+
+
+def send_setpoints(param, values):  # 下发各关节的设定值，立即返回
+    if rt_client is not None:
+        rt_client.set_setpoints(values)
+    else:
+        # 交给发送调度器，按钮连按时未发出的旧设定值被新的替换
+        tx.submit_setpoints(motors, param, values)
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -83,9 +118,7 @@ def handle_position():
             # logging.info("位置模式测试")
             init_motors()
             # 设置为位置控制模式
-            for motor in motors:
-                motor.set_run_mode(motor.RunModes.POSITION_MODE)
-                motor.enable()  # 进入OPERATION_ENABLED状态
+            start_mode(CANMotorController.RunModes.POSITION_MODE, "loc_ref")
             mode_flag = 1
             logging.info("位置模式已启用")
         except Exception as e:
@@ -99,11 +132,9 @@ def handle_speed():
     with lock:
         try:
             init_motors()
-            # 设置为位置控制模式
-            for motor in motors:
-                motor.set_run_mode(motor.RunModes.SPEED_MODE)
-                motor.enable()  # 进入OPERATION_ENABLED状态
-                motor.write_single_param("spd_ref", value=0)
+            # 设置为速度控制模式
+            start_mode(CANMotorController.RunModes.SPEED_MODE, "spd_ref")
+            send_setpoints("spd_ref", [0] * len(motors))
             mode_flag = 2
             logging.info("速度模式已启用")
 
@@ -111,82 +142,78 @@ def handle_speed():
             logging.error(f"速度模式启动失败: {str(e)}")
             raise
 
+# 按钮处理在锁内检查 init_flag 并提交设定值, 提交只是入队, 不会长时间占用锁;
+# 这样与 handle_stop 互斥, 不会向已停止或已释放的调度器提交
 @socketio.on('forward')
 def handle_forward():
-    if not init_flag:
-        logging.info("请启动电机！")
-        return
     with lock:
+        if not init_flag:
+            logging.info("请启动电机！")
+            return
         logging.info("开始顺时针运动")
+        values = [-0.2 if i == 2 else 0.2 for i in range(len(motors))]  # motor3反向
         if mode_flag == 1:
-            for i, motor in enumerate(motors):
-                if i == 2:  # motor3反向
-                    motor.write_single_param("loc_ref", value=-0.2)
-                else:
-                    motor.write_single_param("loc_ref", value=0.2)  # 顺时针方向
-            time.sleep(1)
+            send_setpoints("loc_ref", values)  # 顺时针方向
         elif mode_flag == 2:
-            for i, motor in enumerate(motors):
-                if i == 2:  # motor3反向
-                    motor.write_single_param("spd_ref", value=-0.2)
-                else:
-                    motor.write_single_param("spd_ref", value=0.2)  # 逆时针方向
+            send_setpoints("spd_ref", values)
 
 @socketio.on('backward')
 def handle_backward():
-    if not init_flag:
-        logging.info("请启动电机！")
-        return
     with lock:
+        if not init_flag:
+            logging.info("请启动电机！")
+            return
         logging.info("开始逆时针运动")
+        values = [0.2 if i == 2 else -0.2 for i in range(len(motors))]  # motor3反向
         if mode_flag == 1:
-            for i, motor in enumerate(motors):
-                if i == 2:  # motor3反向
-                    motor.write_single_param("loc_ref", value=0.2)
-                else:
-                    motor.write_single_param("loc_ref", value=-0.2)
-            time.sleep(1)
+            send_setpoints("loc_ref", values)
         elif mode_flag == 2:
-            for i, motor in enumerate(motors):
-                if i == 2:  # motor3反向
-                    motor.write_single_param("spd_ref", value=0.2)
-                else:
-                    motor.write_single_param("spd_ref", value=-0.2)
+            send_setpoints("spd_ref", values)
 
 @socketio.on('zero')
 def handle_zero():
-    if not init_flag:
-        logging.info("请启动电机！")
-        return
     with lock:
+        if not init_flag:
+            logging.info("请启动电机！")
+            return
         if mode_flag == 1:
             logging.info("回到零点位置")
-            for motor in motors:
-                motor.write_single_param("loc_ref", value=0)  # 回零
-            time.sleep(1)
+            send_setpoints("loc_ref", [0] * len(motors))  # 回零
         elif mode_flag == 2:
             logging.info("速度回零")
-            for motor in motors:
-                motor.write_single_param("spd_ref", value=0)
+            send_setpoints("spd_ref", [0] * len(motors))
 
 @socketio.on('stop')
 def handle_stop():
-    global bus, motors, init_flag, mode_flag
+    global bus, motors, group, tx, rt, rt_client, init_flag, mode_flag
     with lock:
-        for motor in motors:
-            motor.disable()
+        init_flag = False  # 先标记为未初始化, 再释放调度器和总线
+        mode_flag = 0
+        if rt is not None:
+            rt_client.clear_setpoints()
+            rt.call("disable_all")
+            logging.info(f"实时控制工作进程统计: {rt_client.stats()}")
+            rt_client.close()
+            rt.stop()
+            rt = rt_client = None
+        if tx is not None:
+            release_scheduler(bus, drain=False)  # 丢弃尚未发出的设定值
+            logging.info(f"发送调度器统计: {tx.stats()}")
+            tx = None
+        if group is not None:
+            group.disable_all()
         motors.clear()
+        group = None
         logging.info("电机已停止")
         # if 'bus' in locals():
         if bus is not None:
+            release_bus(bus)  # 先停止后台接收线程
             bus.shutdown()
             if hasattr(bus, '_detach'):  # PCAN接口的特殊方法
                 bus._detach()  # 强制释放驱动级资源
             bus = None
             # os.system('peakcpl -r PCAN_USBBUS1')
             logging.info("CAN总线已关闭")
-        init_flag = False
-        mode_flag = 0
 
 if __name__ == '__main__':
     socketio.run(app, debug=False, host='0.0.0.0', port=5001, allow_unsafe_werkzeug=True)